@@ -33,6 +33,12 @@ class FireworkGame extends GameCore {
         // Real presentation services replace GameCore's inert defaults.
         this.ui = new UIManager(this);
         this.profiler = new GameProfiler();
+        // ?profileCollector=http://127.0.0.1:5001 streams recordings to tools/profile_collector.py
+        const profileCollector = new URLSearchParams(location.search).get('profileCollector');
+        if (profileCollector) {
+            this.profiler.enableCollector(profileCollector);
+        }
+        this.profiler.setCounterSource(() => this.getProfilerCounters());
         this.audioManager = new AudioManager();
         this.cinematicManager = new CinematicManager(this);
         this.grandFinaleManager = new GrandFinaleManager(this);
@@ -304,6 +310,19 @@ class FireworkGame extends GameCore {
         this.profiler.endFrame();
     }
 
+    /** Entity counts recorded with each profiled frame, for per-entity cost models. */
+    getProfilerCounters() {
+        const counters = {
+            crowd: this.crowd ? this.crowd.people.length : 0,
+            drones: this.droneSystem ? this.droneSystem.count : 0
+        };
+        const activeCounts = this.particleSystem ? this.particleSystem.activeCounts : {};
+        for (const shape in activeCounts) {
+            counters[`particles.${shape}`] = activeCounts[shape];
+        }
+        return counters;
+    }
+
     initBackgroundColor() {
         document.body.style.backgroundColor = PROCEDURAL_BACKGROUND_CONFIG.bodyBackgroundColor;
     }
@@ -0,0 +1,39 @@
+/**
+ * Fixed-capacity FIFO of profiled frames.
+ *
+ * Pushing past capacity overwrites the oldest frame in O(1), instead of
+ * shifting the whole array every frame.
+ */
+export default class FrameRingBuffer {
+    constructor(capacity) {
+        this.capacity = Math.max(1, capacity);
+        this.items = new Array(this.capacity);
+        this.start = 0;
+        this.length = 0;
+    }
+
+    push(item) {
+        if (this.length < this.capacity) {
+            this.items[(this.start + this.length) % this.capacity] = item;
+            this.length++;
+        } else {
+            this.items[this.start] = item;
+            this.start = (this.start + 1) % this.capacity;
+        }
+    }
+
+    clear() {
+        this.items = new Array(this.capacity);
+        this.start = 0;
+        this.length = 0;
+    }
+
+    /** Frames from oldest to newest. */
+    toArray() {
+        const result = new Array(this.length);
+        for (let i = 0; i < this.length; i++) {
+            result[i] = this.items[(this.start + i) % this.capacity];
+        }
+        return result;
+    }
+}
@@ -1,3 +1,14 @@
+import FrameRingBuffer from './FrameRingBuffer.js';
+import ProfileCollectorClient from './ProfileCollectorClient.js';
+
+// Call durations are bucketed exactly like tools/profile_sketch.py's
+// LogHistogram (bucket i covers (GAMMA^(i-1), GAMMA^i] ms), so the analyzer
+// can merge the per-frame histograms into per-call latency distributions.
+const RELATIVE_ACCURACY = 0.01;
+const LOG_GAMMA = Math.log((1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY));
+// Calls at or below this (ms) count as taking no measurable time
+const MIN_CALL_TIME_MS = 1e-6;
+
 export default class GameProfiler {
     constructor() {
         this.config = {
@@ -7,7 +18,7 @@ export default class GameProfiler {
             significantDigits: 3
         };
 
-        this.frameData = [];
+        this.frameData = new FrameRingBuffer(this.config.maxFramesToStore);
         this.isRecording = false;
         this.frameThreshold = this.config.minFrameTimeMs;
         this.currentFrame = null;
@@ -17,20 +28,49 @@ export default class GameProfiler {
         
         this.profilerOverhead = 0;
         this.profilerCallCount = 0;
+
+        // Live collector (tools/profile_collector.py); null exports by download
+        this.collector = null;
+
+        // Optional () => ({ name: count }) sampled into every frame's `counters`
+        this.counterSource = null;
+    }
+
+    /**
+     * Record entity counts (particles, crowd, drones, ...) with every frame,
+     * so profile_analyzer can fit how each function's cost scales with load.
+     */
+    setCounterSource(source) {
+        this.counterSource = source;
+    }
+
+    /**
+     * Stream recorded frames to a local collector service instead of
+     * downloading the last `maxFramesToStore` frames when recording stops.
+     */
+    enableCollector(url, options = {}) {
+        this.collector = new ProfileCollectorClient(url, options);
     }
 
     startRecording() {
         this.isRecording = true;
-        this.frameData = [];
+        this.frameData.clear();
         this.memorySnapshots = [];
         this.functionStack = [];
         this.startTime = performance.now();
         this.recordMemorySnapshot();
+        if (this.collector) {
+            this.collector.startSession({ startTime: this.startTime, config: this.config });
+        }
     }
 
     stopRecording() {
         this.isRecording = false;
-        this.exportData();
+        if (this.collector) {
+            this.collector.endSession(this.getOverheadMetadata());
+        } else {
+            this.exportData();
+        }
     }
 
     startFrame() {
@@ -38,7 +78,8 @@ export default class GameProfiler {
             timestamp: performance.now(),
             totalTime: 0,
             functions: new Map(),
-            memory: null
+            memory: null,
+            counters: null
         };
     }
 
@@ -47,20 +88,36 @@ export default class GameProfiler {
 
         this.currentFrame.totalTime = performance.now() - this.currentFrame.timestamp;
 
+        // Heap and entity samples only feed exported traces, so skip them
+        // outside recordings
+        if (this.isRecording) {
+            // One heap sample per frame, so the analyzer can spot GC drops and
+            // line them up with slow frames (performance.memory is Chromium-only)
+            if (performance.memory) {
+                this.currentFrame.memory = {
+                    usedJSHeapSize: performance.memory.usedJSHeapSize,
+                    totalJSHeapSize: performance.memory.totalJSHeapSize
+                };
+            }
+
+            if (this.counterSource) {
+                this.currentFrame.counters = this.counterSource();
+            }
+        }
 
-        this.frameData.push({
+        const frame = {
             timestamp: this.currentFrame.timestamp,
             totalTime: this.currentFrame.totalTime,
             functions: Object.fromEntries(this.currentFrame.functions),
-            memory: this.currentFrame.memory
-        });
-
-        // Trim old frames 
-        while (this.frameData.length > this.config.maxFramesToStore) {
-            this.frameData.shift();
+            memory: this.currentFrame.memory,
+            counters: this.currentFrame.counters
+        };
+        // The ring buffer drops the oldest frame once maxFramesToStore is reached
+        this.frameData.push(frame);
+        if (this.isRecording && this.collector) {
+            this.collector.addFrame(this.processFrame(frame));
         }
 
-
         this.currentFrame = null;
     }
 
@@ -71,10 +128,12 @@ export default class GameProfiler {
 
         const funcData = this.currentFrame.functions.get(name) || {
             totalTime: 0,
-            timePerFrame: 0,
             callCount: 0,
+            callHistogram: new Map(),
+            maxCallTime: 0,
             children: new Set(),
             parents: new Set(),
+            childTimes: new Map(),
             startTime: 0
         };
 
@@ -100,7 +159,11 @@ export default class GameProfiler {
 
         const elapsed = endTime - funcData.startTime;
         funcData.totalTime += elapsed;
-        funcData.timePerFrame = elapsed;
+        if (elapsed > MIN_CALL_TIME_MS) {
+            const bucket = Math.ceil(Math.log(elapsed) / LOG_GAMMA);
+            funcData.callHistogram.set(bucket, (funcData.callHistogram.get(bucket) || 0) + 1);
+        }
+        if (elapsed > funcData.maxCallTime) funcData.maxCallTime = elapsed;
 
         const stackIndex = this.functionStack.lastIndexOf(name);
         if (stackIndex > 0) {
@@ -109,6 +172,9 @@ export default class GameProfiler {
             if (parentData) {
                 parentData.children.add(name);
                 funcData.parents.add(parentName);
+                // Time spent in this child under this particular parent, so the
+                // analyzer can compute exact self time when a child has several parents
+                parentData.childTimes.set(name, (parentData.childTimes.get(name) || 0) + elapsed);
             }
         }
 
@@ -138,8 +204,9 @@ export default class GameProfiler {
     getFunctionStats() {
         const stats = {};
         let frameIndex = 0;
+        const frames = this.frameData.toArray();
 
-        this.frameData.forEach(frame => {
+        frames.forEach(frame => {
             Object.entries(frame.functions).forEach(([funcName, data]) => {
                 if (!stats[funcName]) {
                     stats[funcName] = {
@@ -152,8 +219,8 @@ export default class GameProfiler {
                         percentageOfSelfFrame: 0,
                         minTime: Infinity,
                         maxTime: -Infinity,
-                        timePerFrame: new Array(this.frameData.length).fill(0),
-                        callsPerFrame: new Array(this.frameData.length).fill(0),
+                        timePerFrame: new Array(frames.length).fill(0),
+                        callsPerFrame: new Array(frames.length).fill(0),
                         standardDeviation: 0,
                         children: new Set([...data.children]),
                         parents: new Set([...data.parents]),
@@ -161,7 +228,7 @@ export default class GameProfiler {
                     };
                 }
 
-                const timeThisFrame = data.timePerFrame;
+                const timeThisFrame = data.totalTime;
                 stats[funcName].totalTime += data.totalTime;
                 stats[funcName].selfTime += data.selfTime;
                 stats[funcName].totalCalls += data.callCount;
@@ -182,8 +249,8 @@ export default class GameProfiler {
             frameIndex++;
         });
 
-        const totalFrameTime = this.frameData.reduce((acc, frame) => acc + frame.totalTime, 0);
-        const totalFrames = this.frameData.length;
+        const totalFrameTime = frames.reduce((acc, frame) => acc + frame.totalTime, 0);
+        const totalFrames = frames.length;
 
         Object.keys(stats).forEach(funcName => {
             const funcStats = stats[funcName];
@@ -220,29 +287,54 @@ export default class GameProfiler {
         }
     }
 
-    exportData() {
-        const processedFrameData = this.frameData.map(frame => {
-            const processedFunctions = {};
-
-            for (const [name, data] of Object.entries(frame.functions)) {
-                if (data.totalTime >= this.config.minFunctionTimeMs) {
-                    processedFunctions[name] = {
-                        totalTime: Number(data.totalTime.toFixed(this.config.significantDigits)),
-                        timePerFrame: Number(data.timePerFrame.toFixed(this.config.significantDigits)),
-                        calls: data.callCount || 0,
-                        children: Array.from(data.children || []),
-                        parents: Array.from(data.parents || [])
-                    };
-                }
+    /** Convert a recorded frame to its exported (JSON-ready, rounded) form. */
+    processFrame(frame) {
+        const processedFunctions = {};
+
+        for (const [name, data] of Object.entries(frame.functions)) {
+            if (data.totalTime >= this.config.minFunctionTimeMs) {
+                const calls = data.callCount || 0;
+                processedFunctions[name] = {
+                    totalTime: Number(data.totalTime.toFixed(this.config.significantDigits)),
+                    // Mean time per call; single calls are in callHistogram
+                    timePerFrame: Number((calls ? data.totalTime / calls : 0).toFixed(this.config.significantDigits)),
+                    calls,
+                    callHistogram: Object.fromEntries(data.callHistogram || []),
+                    maxCallTime: Number((data.maxCallTime || 0).toFixed(this.config.significantDigits)),
+                    children: Array.from(data.children || []),
+                    parents: Array.from(data.parents || []),
+                    childTimes: Object.fromEntries(
+                        Array.from(data.childTimes || [], ([child, time]) =>
+                            [child, Number(time.toFixed(this.config.significantDigits))])
+                    )
+                };
             }
+        }
 
-            return {
-                timestamp: frame.timestamp,
-                totalTime: Number(frame.totalTime.toFixed(this.config.significantDigits)),
-                functions: processedFunctions,
-                memory: frame.memory || null
-            };
-        });
+        const processed = {
+            timestamp: frame.timestamp,
+            totalTime: Number(frame.totalTime.toFixed(this.config.significantDigits)),
+            functions: processedFunctions,
+            memory: frame.memory || null
+        };
+        if (frame.counters) {
+            processed.counters = frame.counters;
+        }
+        return processed;
+    }
+
+    getOverheadMetadata() {
+        return {
+            endTime: performance.now(),
+            profilerOverhead: this.profilerOverhead,
+            profilerCallCount: this.profilerCallCount,
+            averageOverheadPerCall: this.profilerOverhead / this.profilerCallCount
+        };
+    }
+
+    exportData() {
+        const frames = this.frameData.toArray();
+        const processedFrameData = frames.map(frame => this.processFrame(frame));
 
         const functionStats = {};
         for (const frame of processedFrameData) {
@@ -276,7 +368,7 @@ export default class GameProfiler {
             };
         }
 
-        const memoryStats = this.frameData.map(frame => ({
+        const memoryStats = frames.map(frame => ({
             timestamp: frame.timestamp,
             used: frame.memory ? frame.memory.usedJSHeapSize : null,
             total: frame.memory ? frame.memory.totalJSHeapSize : null
@@ -285,12 +377,9 @@ export default class GameProfiler {
         const data = {
             metadata: {
                 startTime: this.startTime,
-                endTime: performance.now(),
                 totalFrames: processedFrameData.length,
                 averageFrameTime: processedFrameData.reduce((sum, frame) => sum + frame.totalTime, 0) / processedFrameData.length,
-                profilerOverhead: this.profilerOverhead,
-                profilerCallCount: this.profilerCallCount,
-                averageOverheadPerCall: this.profilerOverhead / this.profilerCallCount,
+                ...this.getOverheadMetadata(),
                 config: this.config
             },
             frameData: processedFrameData,
@@ -313,11 +402,11 @@ export default class GameProfiler {
 
     getAverageFrameTime() {
         if (this.frameData.length === 0) return 0;
-        const sum = this.frameData.reduce((acc, frame) => acc + frame.totalTime, 0);
+        const sum = this.frameData.toArray().reduce((acc, frame) => acc + frame.totalTime, 0);
         return sum / this.frameData.length;
     }
 
     getSlowFrames() {
-        return this.frameData.filter(frame => frame.totalTime > this.config.minFrameTimeMs);
+        return this.frameData.toArray().filter(frame => frame.totalTime > this.config.minFrameTimeMs);
     }
 }
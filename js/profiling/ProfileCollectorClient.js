@@ -0,0 +1,81 @@
+/**
+ * Batched sender for the live profile collector (tools/profile_collector.py).
+ *
+ * Frames are queued and posted in batches of `batchSize`, or at least every
+ * `flushIntervalMs`, so a session can run for hours without keeping frames
+ * in the page. Posts are fire-and-forget: a failed batch is counted in
+ * `droppedFrames` rather than retried, so a missing collector never stalls
+ * the game loop. Several posts can be in flight at once, so every batch
+ * carries its sequence number and the collector restores the order.
+ */
+export default class ProfileCollectorClient {
+    constructor(url, { batchSize = 120, flushIntervalMs = 1000 } = {}) {
+        this.url = url.replace(/\/+$/, '');
+        this.batchSize = batchSize;
+        this.flushIntervalMs = flushIntervalMs;
+        this.sessionId = null;
+        this.pending = [];
+        this.inFlight = new Set();
+        this.lastFlush = 0;
+        this.nextBatch = 0;
+        this.sentFrames = 0;
+        this.droppedFrames = 0;
+    }
+
+    post(path, body, frameCount = 0) {
+        const request = fetch(`${this.url}${path}`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(body)
+        }).then(response => {
+            if (!response.ok) throw new Error(`Collector responded ${response.status}`);
+            this.sentFrames += frameCount;
+        }).catch(error => {
+            this.droppedFrames += frameCount;
+            console.warn('Profile collector:', error.message);
+        }).finally(() => this.inFlight.delete(request));
+        this.inFlight.add(request);
+        return request;
+    }
+
+    startSession(metadata) {
+        this.sessionId = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 8)}`;
+        this.pending = [];
+        this.nextBatch = 0;
+        this.sentFrames = 0;
+        this.droppedFrames = 0;
+        this.lastFlush = performance.now();
+        this.post('/api/profile/session', { session: this.sessionId, metadata });
+    }
+
+    addFrame(frame) {
+        if (!this.sessionId) return;
+        this.pending.push(frame);
+        if (this.pending.length >= this.batchSize ||
+            performance.now() - this.lastFlush >= this.flushIntervalMs) {
+            this.flush();
+        }
+    }
+
+    flush() {
+        this.lastFlush = performance.now();
+        if (!this.sessionId || this.pending.length === 0) return;
+        const frames = this.pending;
+        this.pending = [];
+        const batch = this.nextBatch++;
+        this.post('/api/profile/frames', { session: this.sessionId, batch, frames }, frames.length);
+    }
+
+    /** Send the remaining frames, wait for every batch, then close the session. */
+    async endSession(metadata) {
+        if (!this.sessionId) return;
+        const sessionId = this.sessionId;
+        this.flush();
+        this.sessionId = null;
+        await Promise.allSettled([...this.inFlight]);
+        await this.post(`/api/profile/session/${sessionId}/end`, {
+            metadata: { ...metadata, droppedFrames: this.droppedFrames }
+        });
+        console.log(`Profile collector: sent ${this.sentFrames} frames (${this.droppedFrames} dropped)`);
+    }
+}
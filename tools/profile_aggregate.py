@@ -0,0 +1,142 @@
+"""Pool several GameProfiler sessions into one set of distributions.
+
+Each trace is reduced to a SessionSummary (LogHistogram sketches of its
+frame times and of every function's per-frame time, plus a few counters).
+JSON traces are streamed straight into the sketches without holding their
+frames, so memory does not grow with trace length, and the summaries merge
+exactly. Functions are aligned by name; a function
+missing from a session (not instrumented, or below that session's
+`minFunctionTimeMs`) simply contributes nothing there.
+
+Sessions, not frames, are the independent unit: frames within a session
+are strongly autocorrelated. Means therefore get a Student t interval over
+the per-session means and pooled percentiles a bootstrap interval that
+resamples whole sessions.
+"""
+import numpy as np
+
+from profile_sketch import LogHistogram, quantiles_from_counts
+from profile_stats import mean_ci
+
+AGGREGATE_PERCENTILES = (50, 95, 99)
+DEFAULT_SESSION_BOOTSTRAP = 1000
+
+
+class SessionSummary:
+    """Sketches and counters of one trace"""
+
+    def __init__(self, path, config, frame_count, slow_frames):
+        self.path = path
+        self.config = config
+        self.frame_count = frame_count
+        self.slow_frames = slow_frames
+        self.frame_times = LogHistogram()
+        self.functions = {}
+        self.function_totals = {}
+
+    @classmethod
+    def from_profile(cls, path, data):
+        """Summarize processed profile data (see process_profile_data)"""
+        matrix = data['matrix']
+        summary = cls(path, data['metadata']['config'], matrix.frame_count, data['slowFrameCount'])
+        summary.frame_times.add(matrix.frame_times)
+        valid = matrix.calls > 0
+        totals = matrix.totals()
+        for i, name in enumerate(matrix.names):
+            sketch = LogHistogram()
+            sketch.add(matrix.time[valid[:, i], i])
+            summary.functions[name] = sketch
+            summary.function_totals[name] = float(totals[i])
+        return summary
+
+    @classmethod
+    def from_stream(cls, path, data):
+        """Summarize streamed profile data (see process_profile_stream)"""
+        frames = data['frameSummary']
+        summary = cls(path, data['metadata']['config'], frames.count, data['slowFrameCount'])
+        summary.frame_times.merge(frames.sketch)
+        for name, totals in data['functionTotals'].items():
+            summary.functions[name] = LogHistogram().merge(data['functionHistograms'].get(name))
+            summary.function_totals[name] = totals['totalTime']
+        return summary
+
+    def mean_per_frame(self, name):
+        return self.function_totals[name] / self.frame_count if self.frame_count else 0.0
+
+
+def _pooled(sketches, percentiles, n_boot, confidence, seed):
+    """Pooled percentiles of per-session sketches with a session bootstrap CI"""
+    pooled = LogHistogram()
+    for sketch in sketches:
+        pooled.merge(sketch)
+    point = pooled.quantiles(percentiles)
+    if len(sketches) < 2 or not pooled.count:
+        return pooled, point, np.full((2, len(percentiles)), np.nan)
+
+    keys = np.array(sorted(pooled.buckets), dtype=np.int64)
+    counts = np.stack([sketch.dense(keys) for sketch in sketches])
+    zeros = np.array([sketch.zero_count for sketch in sketches], dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    # How often each session is drawn in each resample
+    draws = rng.integers(0, len(sketches), size=(n_boot, len(sketches)))
+    weights = np.zeros((n_boot, len(sketches)))
+    np.add.at(weights, (np.arange(n_boot)[:, None], draws), 1)
+    boot = quantiles_from_counts(keys, weights @ counts, weights @ zeros, percentiles, pooled.min, pooled.max)
+    tail = (1 - confidence) / 2 * 100
+    ci = np.nanpercentile(boot, [tail, 100 - tail], axis=0)
+    return pooled, point, ci
+
+
+def aggregate_sessions(sessions, percentiles=AGGREGATE_PERCENTILES, n_boot=DEFAULT_SESSION_BOOTSTRAP,
+                       confidence=0.95, seed=0):
+    """Pool SessionSummary objects.
+
+    Returns {'sessions', 'frame', 'functions', 'configs'}: 'frame' and each
+    row of 'functions' hold the pooled 'mean', the per-session 'meanCi',
+    pooled 'percentiles' with their bootstrap 'percentileCi' (2 x len)
+    and the pooled 'sketch'. Function rows also give the number of
+    'sessions' they appear in and their mean time per frame with its CI,
+    and are sorted by that mean. 'configs' lists the distinct
+    GameProfiler config dicts seen.
+    """
+    if not sessions:
+        raise ValueError('No sessions to aggregate')
+
+    frame_sketch, frame_points, frame_ci = _pooled(
+        [s.frame_times for s in sessions], percentiles, n_boot, confidence, seed
+    )
+    total_frames = sum(s.frame_count for s in sessions)
+    frame = {
+        'mean': frame_sketch.mean,
+        'meanCi': mean_ci([s.frame_times.mean for s in sessions], confidence),
+        'percentiles': frame_points,
+        'percentileCi': frame_ci,
+        'sketch': frame_sketch,
+        'slowFrames': sum(s.slow_frames for s in sessions),
+        'frames': total_frames,
+    }
+
+    names = list(dict.fromkeys(name for s in sessions for name in s.functions))
+    functions = []
+    for name in names:
+        present = [s for s in sessions if name in s.functions]
+        sketch, points, ci = _pooled([s.functions[name] for s in present], percentiles, n_boot, confidence, seed)
+        per_frame = [s.mean_per_frame(name) for s in present]
+        functions.append({
+            'name': name,
+            'sessions': len(present),
+            'meanPerFrame': sum(s.function_totals[name] for s in present) / max(sum(s.frame_count for s in present), 1),
+            'meanPerFrameCi': mean_ci(per_frame, confidence),
+            'mean': sketch.mean,
+            'percentiles': points,
+            'percentileCi': ci,
+            'sketch': sketch,
+        })
+    functions.sort(key=lambda row: row['meanPerFrame'], reverse=True)
+
+    configs = []
+    for s in sessions:
+        if s.config not in configs:
+            configs.append(s.config)
+
+    return {'sessions': sessions, 'frame': frame, 'functions': functions, 'configs': configs}
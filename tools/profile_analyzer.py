@@ -1,52 +1,223 @@
+import argparse
 import json
 import sys
 from datetime import datetime
 import plotly.graph_objects as go
+import plotly.offline
 from plotly.subplots import make_subplots
 import os
 import glob
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from profile_aggregate import AGGREGATE_PERCENTILES, SessionSummary, aggregate_sessions
+from profile_budget import check_budgets, load_budgets
+from profile_binary import BINARY_TRACE_SUFFIX, load_binary_frame_times, load_binary_trace
+from profile_calltree import call_tree_totals
+from profile_costmodel import entity_cost_models
+from profile_compare import DEFAULT_ALPHA, DEFAULT_MIN_DELTA_MS, DEFAULT_THRESHOLD_PCT, compare_matrices
+from profile_cache import DEFAULT_CACHE_DIRNAME, DEFAULT_MAX_BYTES, REPORT_KEY_MARKER, ReportCache, report_is_current
+from profile_export import CHROME_TRACE_SUFFIX
+from profile_matrix import FrameMatrix
+from profile_memory import DEFAULT_MIN_DROP_BYTES, MB, analyze_heap, gc_frame_correlation, heap_samples, memory_arrays
+from profile_overhead import corrected_frame_times, corrected_totals, overhead_per_call
+from profile_periodic import periodic_hitches
+from profile_phases import gameplay_phases
+from profile_sketch import RELATIVE_ACCURACY, bucket_value
+from profile_spikes import UNPROFILED, spike_contributors
+from profile_whatif import simulate_speedups, speedup_label
+from profile_store import DEFAULT_STORE_NAME, connect as connect_store, ingest_profile, is_ingested
+from profile_stats import column_percentiles, downsample_minmax
+from profile_stream import FrameTimeAccumulator, iter_profile_events, process_profile_stream
+
+ANALYZER_VERSION = '1.14'
+
+# Tail-latency percentiles reported for frames and per function
+PERCENTILES = (50, 95, 99, 99.9)
+
+# Default cap on points per plotted series, so report size does not grow with trace length
+DEFAULT_MAX_POINTS = 2000
+HISTOGRAM_BINS = 50
+
+DEFAULT_REPORT_OPTIONS = {
+    'maxPoints': DEFAULT_MAX_POINTS,
+    'offline': False,
+    'overheadCorrection': False,
+    # Section keys to render, in REPORT_SECTIONS order; None renders all
+    'sections': None,
+    # Parsed budget config (see profile_budget.py); None skips the budget section
+    'budgets': None,
+}
 
 def process_profile_data(data):
-    """Process raw profile data into statistics and metrics"""
+    """Process raw profile data into statistics and metrics
+
+    Frames are converted once into a FrameMatrix and the raw frame dicts are
+    not kept; every report section reads the matrix instead. Data loaded from
+    a .ptrace file already carries its `matrix`.
+    """
+    matrix = data['matrix'] if 'matrix' in data else FrameMatrix.from_frames(data['frameData'])
+    function_stats = data['functionStats']
+    for func_stats in function_stats.values():
+        func_stats.pop('timePerFrame', None)
+    
     processed_data = {
         'metadata': data['metadata'],
-        'frameData': data['frameData'],
-        'functionStats': data['functionStats'],
+        'matrix': matrix,
+        'functionStats': function_stats,
         'memoryStats': data['memoryStats'],
-        'slowFrames': [
-            frame for frame in data['frameData'] 
-            if frame['totalTime'] > data['metadata']['config']['minFrameTimeMs']
-        ]
+        'slowFrameCount': int(np.count_nonzero(
+            matrix.frame_times > data['metadata']['config']['minFrameTimeMs']
+        ))
     }
     
-    total_time = processed_data['metadata']['totalFrames'] * processed_data['metadata']['averageFrameTime']
-    if total_time > 0:
-        for func_stats in processed_data['functionStats'].values():
-            func_stats['percentOfTotal'] = (func_stats['totalTime'] / total_time) * 100
-    
     return processed_data
 
+def _frame_totals(data):
+    """Return (frame count, summed frame time) for in-memory or streamed data"""
+    if 'matrix' in data:
+        matrix = data['matrix']
+        return matrix.frame_count, float(matrix.frame_times.sum())
+    summary = data['frameSummary']
+    return summary.count, summary.total
+
+def _function_table(data):
+    """Return (names, total time, total calls, % of total frame time) per function"""
+    if 'matrix' in data:
+        matrix = data['matrix']
+        names = matrix.names
+        total_time = matrix.totals()
+        calls = matrix.call_totals()
+    else:
+        # Running sums over the streamed frames
+        stats = data['functionTotals']
+        names = list(stats)
+        total_time = np.array([stats[name]['totalTime'] for name in names], dtype=np.float64)
+        calls = np.array([stats[name]['calls'] for name in names], dtype=np.float64)
+    
+    _, total_frame_time = _frame_totals(data)
+    if total_frame_time > 0:
+        percent = total_time / total_frame_time * 100
+    else:
+        percent = np.zeros_like(total_time)
+    return names, total_time, calls, percent
+
+def _figure_html(fig):
+    """Render a figure as a div; the page loads plotly.js once via plotly_script_tag"""
+    return fig.to_html(full_html=False, include_plotlyjs=False)
+
+def plotly_script_tag(offline=False):
+    """Script tag loading plotly.js: inlined for offline reports, else from the CDN
+
+    The CDN URL is pinned to the plotly.js version bundled with the installed
+    plotly package, so figures always render with the library they were
+    serialized for.
+    """
+    if offline:
+        return f'<script type="text/javascript">{plotly.offline.get_plotlyjs()}</script>'
+    version = plotly.offline.get_plotlyjs_version()
+    return f'<script src="https://cdn.plot.ly/plotly-{version}.min.js"></script>'
+
+def _max_points(data):
+    return data.get('reportOptions', {}).get('maxPoints', DEFAULT_MAX_POINTS)
+
+def _histogram_bars(values, weights=None, bins=HISTOGRAM_BINS):
+    """Pre-bin values into a Bar trace so the report stores bin counts, not samples"""
+    counts, edges = np.histogram(values, bins=bins, weights=weights)
+    return go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges))
+
+def _percentile_label(q):
+    return f'p{q:g}'
+
+def _frame_times(data):
+    """Per-frame times, or None for streamed data, which keeps only a sketch"""
+    if 'matrix' in data:
+        return data['matrix'].frame_times
+    return data.get('frameTimes')
+
+def _frame_percentiles(data):
+    """Frame-time percentiles for PERCENTILES (sketch-based when streamed)"""
+    frame_times = _frame_times(data)
+    if frame_times is not None:
+        if not len(frame_times):
+            return [float('nan')] * len(PERCENTILES)
+        return [float(v) for v in np.percentile(frame_times, PERCENTILES)]
+    return data['frameSummary'].percentiles(PERCENTILES)
+
+def _function_percentiles(data):
+    """Per-function percentiles of per-frame time over the frames each function ran
+
+    Returns an array of shape (len(PERCENTILES), functions) aligned with
+    _function_table names; streamed data answers from its per-function
+    sketches.
+    """
+    if 'matrix' not in data:
+        histograms = data['functionHistograms']
+        names, _, _, _ = _function_table(data)
+        if not names:
+            return np.zeros((len(PERCENTILES), 0))
+        return np.column_stack([histograms.get(name).quantiles(PERCENTILES) for name in names])
+    matrix = data['matrix']
+    return column_percentiles(matrix.time, matrix.calls > 0, PERCENTILES)
+
+def _sampled_matrix(data):
+    """(FrameMatrix, note) for sections that treat frames as independent samples
+
+    Streamed data substitutes its uniform frame sample, and the note (else
+    empty) says the section is estimated from it.
+    """
+    if 'matrix' in data:
+        return data['matrix'], ''
+    sample = data['frameSample']
+    return sample, (f'<p>Estimated from a uniform random sample of {sample.frame_count} of '
+                    f'{data["frameSummary"].count} frames.</p>')
+
 def generate_frame_histogram(data):
     """Generate a histogram of frame times
     Expected data format:
     data = {
-        'frameData': [{'totalTime': number, ...}, ...],
+        'matrix': FrameMatrix,
         'metadata': {'config': {'minFrameTimeMs': number}}
     }
     """
-    frame_times = [frame['totalTime'] for frame in data['frameData']]
+    if 'matrix' in data:
+        histogram = _histogram_bars(data['matrix'].frame_times)
+    else:
+        # Streamed data only keeps fine-grained bin counts; re-bin those
+        centers, counts = data['frameSummary'].histogram()
+        histogram = _histogram_bars(centers, weights=counts)
     
-    fig = go.Figure(data=[
-        go.Histogram(x=frame_times, nbinsx=50)
-    ])
+    fig = go.Figure(data=[histogram])
     
+    threshold = data['metadata']['config']['minFrameTimeMs']
     fig.add_vline(
-        x=data['metadata']['config']['minFrameTimeMs'],
+        x=threshold,
         line_dash="dash", 
         line_color="red",
-        annotation_text="60 FPS",
+        annotation_text=f"{threshold:g}ms ({1000 / threshold:.0f} FPS)",
         annotation_position="top right"
     )
+    budgets = data.get('reportOptions', {}).get('budgets')
+    target = budgets and budgets['frameTargetMs']
+    if target and target != threshold:
+        fig.add_vline(
+            x=target,
+            line_dash="dash",
+            line_color="orange",
+            annotation_text=f"target {target:g}ms ({1000 / target:.0f} FPS)",
+            annotation_position="bottom right"
+        )
+    
+    p99 = _frame_percentiles(data)[PERCENTILES.index(99)]
+    if not np.isnan(p99):
+        fig.add_vline(
+            x=p99,
+            line_dash="dot",
+            line_color="purple",
+            annotation_text="p99",
+            annotation_position="top left"
+        )
     
     fig.update_layout(
         title='Frame Time Distribution',
@@ -55,39 +226,23 @@ def generate_frame_histogram(data):
         height=400
     )
     
-    return fig.to_html(full_html=False)
+    return _figure_html(fig)
 
 def generate_combined_timings_plot(data):
     """Generate a combined timings plot showing function execution times
     Expected data format:
     data = {
-        'functionStats': {
-            'functionName': {
-                'totalTime': number,
-                'calls': number,
-                'averageTimePerFrame': number,
-                ...
-            },
-            ...
-        }
+        'matrix': FrameMatrix,
+        ...
     }
     """
-    sorted_functions = sorted(
-        data['functionStats'].items(),
-        key=lambda x: x[1]['totalTime'],
-        reverse=True
-    )[:10]  
+    names, total_time, _, _ = _function_table(data)
+    frame_count, _ = _frame_totals(data)
+    top = np.argsort(-total_time, kind='stable')[:10]
 
-    func_names = []
-    total_times = []
-    avg_times = []
-    call_counts = []
-    
-    for func_name, func_data in sorted_functions:
-        func_names.append(func_name)
-        total_times.append(func_data['totalTime'])
-        avg_times.append(func_data['averageTimePerFrame'])
-        call_counts.append(func_data['calls'])
+    func_names = [names[i] for i in top]
+    total_times = total_time[top]
+    avg_times = total_times / frame_count if frame_count > 0 else np.zeros_like(total_times)
 
     fig = go.Figure(data=[
         go.Bar(name='Total Time (ms)', x=func_names, y=total_times),
@@ -102,35 +257,21 @@ def generate_combined_timings_plot(data):
         height=400
     )
 
-    return fig.to_html(full_html=False)
+    return _figure_html(fig)
 
 def generate_function_percentage_histogram(data):
     """Generate a histogram showing function time distribution
     Expected data format:
     data = {
-        'functionStats': {
-            'functionName': {
-                'percentOfTotal': number,
-                ...
-            },
-            ...
-        }
+        'matrix': FrameMatrix,
+        ...
     }
     """
-    stats = data['functionStats']
-    
-    sorted_stats = sorted(
-        [(name, stats[name]) for name in stats],
-        key=lambda x: x[1]['percentOfTotal'],
-        reverse=True
-    )[:10]  
+    func_names, _, _, percent = _function_table(data)
+    top = np.argsort(-percent, kind='stable')[:10]
     
-    names = []
-    percentages = []
-    
-    for name, func_data in sorted_stats:
-        names.append(name)
-        percentages.append(func_data['percentOfTotal'])
+    names = [func_names[i] for i in top]
+    percentages = percent[top]
     
     fig = go.Figure([
         go.Bar(
@@ -150,19 +291,66 @@ def generate_function_percentage_histogram(data):
         margin=dict(l=200) 
     )
     
-    return fig.to_html(full_html=False)
+    return _figure_html(fig)
 
-def generate_function_breakdown(data):
-    """Generate an interactive function breakdown visualization"""
-    stats = data['functionStats']
-    total_frames = len(data['frameData'])
+def _call_tree_totals(data):
+    """Return CallTreeTotals (self, root and per-edge time) for either data kind"""
+    if 'matrix' in data:
+        return call_tree_totals(data['matrix'])
+    return data['callTree']
+
+def _self_times(data, names):
+    """Total exclusive (self) time per function, aligned with `names`"""
+    if 'matrix' in data:
+        return data['matrix'].exclusive().sum(axis=0, dtype=np.float64)
+    self_time = data['callTree'].self_time
+    return np.array([self_time.get(name, 0.0) for name in names], dtype=np.float64)
+
+def _breakdown_entries(data):
+    """Precompute pie slices for the full frame and for every function
+
+    The full frame is split into root functions plus unprofiled time; each
+    function is split into its own exclusive time plus the time each callee
+    spent under it specifically, so slices always add up to the total.
+    """
+    names, total_time, _, _ = _function_table(data)
+    _, total_frame_time = _frame_totals(data)
+    tree = _call_tree_totals(data)
     
-    total_frame_time = sum(frame['totalTime'] for frame in data['frameData'])
-    avg_frame_time = total_frame_time / total_frames if total_frames > 0 else 0
+    callees = {}
+    for (parent, child), time in tree.edge_time.items():
+        callees.setdefault(parent, []).append((child, time))
+    
+    roots = sorted(tree.root_time.items(), key=lambda x: x[1], reverse=True)
+    unprofiled = max(total_frame_time - sum(time for _, time in roots), 0.0)
+    entries = {
+        '__frame__': {
+            'total': round(total_frame_time, 3),
+            'labels': [name for name, _ in roots] + ['Unprofiled'],
+            'values': [round(time, 3) for _, time in roots] + [round(unprofiled, 3)],
+        }
+    }
+    for name, total in zip(names, total_time):
+        children = sorted(callees.get(name, []), key=lambda x: x[1], reverse=True)
+        entries[name] = {
+            'total': round(float(total), 3),
+            'labels': ['Self Time'] + [child for child, _ in children],
+            'values': [round(tree.self_time.get(name, 0.0), 3)] + [round(time, 3) for _, time in children],
+        }
+    return entries
+
+def generate_function_breakdown(data):
+    """Generate an interactive function breakdown visualization
+
+    Self and callee times are computed here from the per-frame call graph;
+    the page only selects and plots the precomputed slices.
+    """
+    entries = _breakdown_entries(data)
+    total_frames, _ = _frame_totals(data)
     
     function_options = ['<option value="__frame__">Full Frame</option>'] + [
         f'<option value="{name}">{name}</option>'
-        for name in sorted(stats.keys())
+        for name in sorted(name for name in entries if name != '__frame__')
     ]
     
     breakdown_div = f"""
@@ -182,55 +370,19 @@ def generate_function_breakdown(data):
     
     script = """
     <script>
+    const functionBreakdownData = """ + json.dumps(entries, separators=(',', ':')) + """;
+    
     function updateFunctionBreakdown() {
-        const functionStats = """ + json.dumps(stats) + """;
         const totalFrames = """ + str(total_frames) + """;
-        const totalFrameTime = """ + str(total_frame_time) + """;
         const functionName = document.getElementById('function-selector').value;
         const showAverages = document.getElementById('show-averages').checked;
         
-        let values, labels, totalTime;
+        const entry = functionBreakdownData[functionName];
+        if (!entry) return;
         
-        if (functionName === '__frame__') {
-            const rootFunctions = Object.entries(functionStats)
-                .filter(([_, data]) => data.parents.length === 0)
-                .sort((a, b) => b[1].totalTime - a[1].totalTime);
-                
-            totalTime = totalFrameTime;
-            if (showAverages) {
-                values = rootFunctions.map(([_, data]) => data.totalTime / totalFrames);
-            } else {
-                values = rootFunctions.map(([_, data]) => data.totalTime);
-            }
-            labels = rootFunctions.map(([name, _]) => name);
-            
-        } else {
-            const func = functionStats[functionName];
-            if (!func) return;
-            
-            totalTime = func.totalTime;
-            const childTimes = new Map();
-            
-            func.children.forEach(childName => {
-                const childStats = functionStats[childName];
-                if (childStats) {
-                    childTimes.set(childName, childStats.totalTime);
-                }
-            });
-            
-            const childTimeSum = Array.from(childTimes.values()).reduce((a, b) => a + b, 0);
-            const selfTime = Math.max(0, totalTime - childTimeSum);
-            
-            const sortedChildren = Array.from(childTimes.entries())
-                .sort((a, b) => b[1] - a[1]);
-            
-            if (showAverages) {
-                values = [selfTime / totalFrames, ...sortedChildren.map(([_, time]) => time / totalFrames)];
-            } else {
-                values = [selfTime, ...sortedChildren.map(([_, time]) => time)];
-            }
-            labels = ['Self Time', ...sortedChildren.map(([name, _]) => name)];
-        }
+        const totalTime = entry.total;
+        const labels = entry.labels;
+        const values = showAverages ? entry.values.map(v => v / totalFrames) : entry.values;
         
         const timeUnit = showAverages ? 'ms/frame' : 'ms total';
         const percentages = values.map(v => ((v * (showAverages ? totalFrames : 1)) / totalTime * 100).toFixed(1));
@@ -299,100 +451,156 @@ def generate_function_stats_table(data):
     """Generate an HTML table of function statistics
     Expected data format:
     data = {
-        'functionStats': {
-            'functionName': {
-                'totalTime': number,
-                'calls': number,
-                'timePerFrame': number[],
-                'percentOfTotal': number
-            },
-            ...
-        }
+        'matrix': FrameMatrix,
+        ...
     }
     """
-    stats = data['functionStats']
-    total_frames = len(data['frameData'])
+    names, total_time, total_calls, percent = _function_table(data)
+    self_time = _self_times(data, names)
+    percentiles = _function_percentiles(data)
+    total_frames, _ = _frame_totals(data)
+    
+    # Per-call and per-frame averages for every function at once
+    avg_time_per_call = np.divide(total_time, total_calls, out=total_time.copy(), where=total_calls > 0)
+    if total_frames > 0:
+        avg_time_per_frame = total_time / total_frames
+        calls_per_frame = total_calls / total_frames
+    else:
+        avg_time_per_frame = np.zeros_like(total_time)
+        calls_per_frame = np.zeros_like(total_calls)
     
     # Sort functions by total time percentage
-    sorted_funcs = sorted(
-        stats.items(),
-        key=lambda x: x[1]['percentOfTotal'],
-        reverse=True
-    )
+    order = np.argsort(-percent, kind='stable')
+    
+    def cell(value, fmt):
+        # Functions that never ran in a frame have no percentiles
+        if np.isnan(value):
+            return '<td data-value="-1">-</td>'
+        return f'<td data-value="{value:.6g}">{value:{fmt}}ms</td>'
     
     table_rows = []
-    for name, func_data in sorted_funcs:
-        # Calculate total calls by summing calls across all frames
-        total_calls = func_data['calls']
-        
-        # Calculate average time per call
-        avg_time_per_call = func_data['totalTime'] / total_calls if total_calls > 0 else func_data['totalTime']
-        
-        # Calculate average time per frame
-        avg_time_per_frame = func_data['totalTime'] / total_frames if total_frames > 0 else 0
-        
-        # Calculate calls per frame
-        calls_per_frame = total_calls / total_frames if total_frames > 0 else 0
-        
+    for i in order:
+        percentile_cells = ''.join(
+            cell(percentiles[j, i], '.2f')
+            for j in range(len(PERCENTILES))
+        )
         row = f"""
         <tr>
-            <td>{name}</td>
-            <td>{func_data['totalTime']:.2f}ms</td>
-            <td>{avg_time_per_call:.2f}ms</td>
-            <td>{avg_time_per_frame:.2f}ms</td>
-            <td>{total_calls}</td>
-            <td>{calls_per_frame:.1f}</td>
-            <td>{func_data['percentOfTotal']:.1f}%</td>
+            <td data-value="{names[i]}">{names[i]}</td>
+            <td data-value="{total_time[i]:.6g}">{total_time[i]:.2f}ms</td>
+            <td data-value="{self_time[i]:.6g}">{self_time[i]:.2f}ms</td>
+            <td data-value="{avg_time_per_call[i]:.6g}">{avg_time_per_call[i]:.2f}ms</td>
+            <td data-value="{avg_time_per_frame[i]:.6g}">{avg_time_per_frame[i]:.2f}ms</td>
+            {percentile_cells}
+            <td data-value="{int(total_calls[i])}">{int(total_calls[i])}</td>
+            <td data-value="{calls_per_frame[i]:.6g}">{calls_per_frame[i]:.1f}</td>
+            <td data-value="{percent[i]:.6g}">{percent[i]:.1f}%</td>
         </tr>
         """
         table_rows.append(row)
     
+    percentile_headers = ''.join(
+        f'<th class="sortable" onclick="sortStatsTable(this)">{_percentile_label(q)}/Frame</th>'
+        for q in PERCENTILES
+    )
+    
     table = f"""
     <div class="stats-table">
         <h3>Function Statistics</h3>
-        <table>
+        <p>Percentiles are over the frames in which each function ran. Click a column to sort.</p>
+        <table id="function-stats-table">
             <tr>
-                <th>Function</th>
-                <th>Total Time</th>
-                <th>Avg Time/Call</th>
-                <th>Avg Time/Frame</th>
-                <th>Total Calls</th>
-                <th>Calls/Frame</th>
-                <th>% of Total</th>
+                <th class="sortable" onclick="sortStatsTable(this)">Function</th>
+                <th class="sortable" onclick="sortStatsTable(this)">Total Time</th>
+                <th class="sortable" onclick="sortStatsTable(this)">Self Time</th>
+                <th class="sortable" onclick="sortStatsTable(this)">Avg Time/Call</th>
+                <th class="sortable" onclick="sortStatsTable(this)">Avg Time/Frame</th>
+                {percentile_headers}
+                <th class="sortable" onclick="sortStatsTable(this)">Total Calls</th>
+                <th class="sortable" onclick="sortStatsTable(this)">Calls/Frame</th>
+                <th class="sortable" onclick="sortStatsTable(this)">% of Total</th>
             </tr>
             {''.join(table_rows)}
         </table>
     </div>
+    <script>
+    function sortStatsTable(header) {{
+        const table = document.getElementById('function-stats-table');
+        const column = Array.from(header.parentNode.children).indexOf(header);
+        const descending = header.dataset.order !== 'desc';
+        header.dataset.order = descending ? 'desc' : 'asc';
+        const rows = Array.from(table.rows).slice(1);
+        rows.sort((a, b) => {{
+            const x = a.cells[column].dataset.value;
+            const y = b.cells[column].dataset.value;
+            const cmp = column === 0 ? x.localeCompare(y) : parseFloat(x) - parseFloat(y);
+            return descending ? -cmp : cmp;
+        }});
+        rows.forEach(row => table.tBodies[0].appendChild(row));
+    }}
+    </script>
     """
     
     return table
 
+def _memory_arrays(data):
+    """Return (timestamps in ms, used bytes, total bytes, after_gap) of the samples with a heap size"""
+    return heap_samples(*memory_arrays(data['memoryStats']))
+
 def generate_memory_chart(data):
-    """Generate a line chart showing memory usage over time"""
-    if not data['memoryStats']:
+    """Generate a line chart showing memory usage over time, with GC events and the leak trend"""
+    timestamps, used, total, after_gap = _memory_arrays(data)
+    if not len(timestamps):
         return "<div>No memory data available</div>"
         
-    snapshots = data['memoryStats']
-    timestamps = [(s['timestamp'] - data['metadata']['startTime']) / 1000 for s in snapshots]
-    used_memory = [s['used'] / (1024 * 1024) for s in snapshots]  # Convert to MB
-    total_memory = [s['total'] / (1024 * 1024) for s in snapshots]  # Convert to MB
+    heap = analyze_heap(timestamps, used, after_gap=after_gap)
+    seconds = (timestamps - data['metadata']['startTime']) / 1000
+    used_memory = used / MB
+    total_memory = total / MB
+    
+    max_points = _max_points(data)
+    used_x, used_y = downsample_minmax(seconds, used_memory, max_points)
+    total_x, total_y = downsample_minmax(seconds, total_memory, max_points)
     
     fig = go.Figure()
     
     fig.add_trace(go.Scatter(
-        x=timestamps,
-        y=used_memory,
+        x=used_x,
+        y=used_y,
         name='Used Memory (MB)',
         line=dict(color='blue')
     ))
     
     fig.add_trace(go.Scatter(
-        x=timestamps,
-        y=total_memory,
+        x=total_x,
+        y=total_y,
         name='Total Memory (MB)',
         line=dict(color='red', dash='dash')
     ))
     
+    gc = heap['gcIndices']
+    if len(gc):
+        fig.add_trace(go.Scatter(
+            x=seconds[gc],
+            y=used_memory[gc],
+            mode='markers',
+            name='GC Event',
+            marker=dict(color='orange', size=6),
+            text=[f'Freed {drop:.2f} MB' for drop in heap['gcDropsMB']],
+        ))
+    
+    fit = heap['leakFitIndices']
+    if len(fit) >= 2:
+        ends = seconds[fit[[0, -1]]]
+        start_level = float(np.polyval(np.polyfit(seconds[fit], used_memory[fit], 1), ends[0]))
+        fig.add_trace(go.Scatter(
+            x=ends,
+            y=[start_level, start_level + heap['leakSlope'] * (ends[1] - ends[0]) / 60],
+            mode='lines',
+            name=f"Heap Trend ({heap['leakSlope']:+.2f} MB/min)",
+            line=dict(color='green', dash='dot')
+        ))
+    
     fig.update_layout(
         title='Memory Usage Over Time',
         xaxis_title='Time (seconds)',
@@ -400,41 +608,89 @@ def generate_memory_chart(data):
         height=400
     )
     
-    return fig.to_html(full_html=False)
+    return _figure_html(fig)
+
+def generate_memory_analysis(data):
+    """Allocation rate, GC events, leak slope and GC/slow-frame correlation"""
+    timestamps, used, _, after_gap = _memory_arrays(data)
+    if not len(timestamps):
+        return "<div>No memory data available</div>"
+    
+    heap = analyze_heap(timestamps, used, after_gap=after_gap)
+    rates = heap['allocationRates']
+    drops = heap['gcDropsMB']
+    trend_basis = 'post-GC heap floors' if heap['leakFitOnFloors'] else 'all samples (fewer than two GC events)'
+    rows = [
+        ('GC events', f"{len(heap['gcIndices'])}"),
+        ('Heap freed per GC (median / max)',
+         f'{np.median(drops):.2f} MB / {drops.max():.2f} MB' if len(drops) else '-'),
+        ('Allocation rate (overall)', f"{heap['allocationRate']:.2f} MB/s ({heap['allocatedMB']:.1f} MB total)"),
+        ('Allocation rate between GCs (median / max)',
+         f'{np.median(rates):.2f} MB/s / {rates.max():.2f} MB/s' if len(rates) else '-'),
+        ('Heap trend', f"{heap['leakSlope']:+.3f} MB/min (R&sup2; {heap['leakR2']:.2f}, fitted to {trend_basis})"),
+    ]
+    
+    if 'matrix' in data:
+        matrix = data['matrix']
+        unprofiled = matrix.frame_times - matrix.exclusive().sum(axis=1, dtype=np.float64)
+        correlation = gc_frame_correlation(
+            timestamps[heap['gcIndices']], matrix.timestamps, matrix.frame_times, unprofiled,
+            data['metadata']['config']['minFrameTimeMs']
+        )
+        rows += [
+            ('Slow frames next to a GC event',
+             f"{correlation['slowWithGc']} of {correlation['slowFrames']}"),
+            ('Slow-frame rate: GC frames vs. others',
+             f"{correlation['slowRateGc']:.1f}% vs. {correlation['slowRateOther']:.1f}%"),
+            ('Avg frame time: GC frames vs. others',
+             f"{correlation['frameTimeGc']:.2f}ms vs. {correlation['frameTimeOther']:.2f}ms"),
+            ('Avg unprofiled time: GC frames vs. others',
+             f"{correlation['unprofiledGc']:.2f}ms vs. {correlation['unprofiledOther']:.2f}ms"),
+        ]
+    
+    table_rows = ''.join(f'<tr><td>{label}</td><td>{value}</td></tr>' for label, value in rows)
+    return f"""
+    <div class="stats-table">
+        <p>A GC event is a drop of at least {DEFAULT_MIN_DROP_BYTES // 1024} KB in used heap between two frames;
+        frames within one frame of it count as GC frames. Collector pauses are not instrumented, so a
+        hitch caused by garbage churn shows up as extra unprofiled time in GC frames, while a compute
+        hitch shows up in the functions' own times.</p>
+        <table>
+            <tr><th>Metric</th><th>Value</th></tr>
+            {table_rows}
+        </table>
+    </div>
+    """
+
+def _top_function_series(data, top_n=10):
+    """Return [(name, frame indices, times)] for the top functions by total time
+
+    Long in-memory series are reduced to a min/max envelope of at most
+    reportOptions['maxPoints'] points; streamed series are already bucketed.
+    """
+    if 'matrix' in data:
+        matrix = data['matrix']
+        frame_indices = np.arange(matrix.frame_count)
+        max_points = _max_points(data)
+        return [
+            (matrix.names[i], *downsample_minmax(frame_indices, matrix.time[:, i], max_points))
+            for i in matrix.top(top_n)
+        ]
+
+    series = data['functionSeries']
+    frame_count = data['frameSummary'].count
+    top_functions = sorted(series.sums, key=series.total, reverse=True)[:top_n]
+    result = []
+    for func_name in top_functions:
+        x, means, _ = series.points(func_name, frame_count)
+        result.append((func_name, x, means))
+    return result
 
 def generate_function_timeline(data):
     """Generate a line graph showing function times across frames"""
-    frames = data['frameData']
-    
-    # Get the top functions by total time
-    total_time_by_func = {}
-    for frame in frames:
-        for func_name, func_data in frame['functions'].items():
-            if func_name not in total_time_by_func:
-                total_time_by_func[func_name] = 0
-            total_time_by_func[func_name] += func_data['totalTime']
-    
-    # Sort and get top 10 functions
-    top_functions = sorted(
-        total_time_by_func.items(),
-        key=lambda x: x[1],
-        reverse=True
-    )[:10]
-    
     # Create traces for each function
     traces = []
-    for func_name, _ in top_functions:
-        x = []  # Frame indices
-        y = []  # Function times
-        
-        for i, frame in enumerate(frames):
-            if func_name in frame['functions']:
-                x.append(i)
-                y.append(frame['functions'][func_name]['totalTime']);
-            else:
-                x.append(i);
-                y.append(0);
-        
+    for func_name, x, y in _top_function_series(data):
         traces.append(go.Scatter(
             name=func_name,
             x=x,
@@ -447,8 +703,14 @@ def generate_function_timeline(data):
     
     fig = go.Figure(data=traces)
     
+    title = 'Function Times per Frame'
+    if 'functionSeries' in data and data['functionSeries'].width > 1:
+        title += f" (mean of every {data['functionSeries'].width} frames)"
+    elif 'matrix' in data and data['matrix'].frame_count > _max_points(data):
+        title += ' (min/max envelope)'
+    
     fig.update_layout(
-        title='Function Times per Frame',
+        title=title,
         xaxis_title='Frame Number',
         yaxis_title='Time (ms)',
         height=500,
@@ -462,121 +724,707 @@ def generate_function_timeline(data):
         hovermode='x unified'
     )
     
-    return fig.to_html(full_html=False)
+    return _figure_html(fig)
 
-def generate_html_report(data):
-    """Generate an HTML report with all visualizations"""
-    combined_timings = generate_combined_timings_plot(data)
-    frame_histogram = generate_frame_histogram(data)
-    function_percentages = generate_function_percentage_histogram(data)
-    function_breakdown = generate_function_breakdown(data)
-    function_stats_table = generate_function_stats_table(data)
-    memory_chart = generate_memory_chart(data)
-    function_timeline = generate_function_timeline(data)
+REPORT_STYLE = """
+body {
+    font-family: Arial, sans-serif;
+    margin: 0;
+    padding: 20px;
+    background-color: #f5f5f5;
+}
+
+.container {
+    max-width: 1200px;
+    margin: 0 auto;
+    background-color: white;
+    padding: 20px;
+    border-radius: 5px;
+    box-shadow: 0 2px 5px rgba(0,0,0,0.1);
+}
+
+.header {
+    text-align: center;
+    margin-bottom: 30px;
+}
+
+.summary {
+    display: flex;
+    justify-content: space-around;
+    margin-bottom: 30px;
+    flex-wrap: wrap;
+}
+
+.summary-item {
+    text-align: center;
+    padding: 15px;
+    background-color: #f8f9fa;
+    border-radius: 5px;
+    margin: 10px;
+    flex: 1;
+    min-width: 200px;
+}
+
+.summary-item h3 {
+    margin: 0;
+    color: #666;
+}
+
+.summary-item p {
+    margin: 10px 0 0 0;
+    font-size: 24px;
+    font-weight: bold;
+    color: #333;
+}
+
+.chart-container {
+    margin-bottom: 30px;
+    padding: 20px;
+    background-color: white;
+    border-radius: 5px;
+    box-shadow: 0 2px 5px rgba(0,0,0,0.1);
+}
+
+.section {
+    margin-bottom: 40px;
+}
+
+table {
+    width: 100%;
+    border-collapse: collapse;
+    margin-top: 20px;
+}
+
+th, td {
+    padding: 12px;
+    text-align: left;
+    border-bottom: 1px solid #ddd;
+}
+
+th {
+    background-color: #f8f9fa;
+    font-weight: bold;
+}
+
+tr:hover {
+    background-color: #f5f5f5;
+}
+
+th.sortable {
+    cursor: pointer;
+}
+
+.regression {
+    color: #b00020;
+    font-weight: bold;
+}
+
+.improvement {
+    color: #1b7f3b;
+}
+
+.warning {
+    color: #856404;
+    background-color: #fff3cd;
+    border: 1px solid #ffeeba;
+    padding: 12px;
+    border-radius: 4px;
+    margin-bottom: 20px;
+}
+"""
+
+def generate_spike_table(data):
+    """Table of the functions that explain the slow frames' excess time"""
+    if 'matrix' not in data:
+        return '<p>Spike attribution needs every frame in order and is not available for streamed traces.</p>'
+    threshold = data['metadata']['config']['minFrameTimeMs']
+    result = spike_contributors(data['matrix'], threshold)
+    if not result['rows']:
+        return f'<p>No frames exceeded {threshold}ms above their local baseline.</p>'
+    
+    slow_frames = result['slowFrames']
+    rows = ''.join(f"""
+        <tr>
+            <td>{row['name']}</td>
+            <td>{row['excess']:.2f}ms</td>
+            <td>{row['excess'] / slow_frames:.3f}ms</td>
+            <td>{row['share']:.1f}%</td>
+            <td>{row['frames']}</td>
+            <td>{row['topFrames']}</td>
+        </tr>
+        """ for row in result['rows'])
+    return f"""
+    <div class="stats-table">
+        <p>{slow_frames} frames exceeded {threshold}ms, on average by {result['frameExcess'] / slow_frames:.2f}ms
+        over the rolling median of the surrounding {result['window']} frames. That excess is attributed to the
+        functions whose self time rose above their own rolling median; "{UNPROFILED}" is the remainder the
+        instrumented functions do not explain.</p>
+        <table>
+            <tr>
+                <th>Function</th>
+                <th>Total Excess</th>
+                <th>Excess/Slow Frame</th>
+                <th>% of Excess</th>
+                <th>Slow Frames Involved</th>
+                <th>Top Contributor In</th>
+            </tr>
+            {rows}
+        </table>
+    </div>
+    """
+
+def _format_delta(delta, before):
+    relative = f" ({delta / before * 100:+.0f}%)" if before > 0 else ''
+    return f"{delta:+.3f}ms{relative}"
+
+def generate_phase_analysis(data):
+    """Phases found by change-point segmentation, and what changed between them"""
+    if 'matrix' not in data:
+        return '<p>Phase segmentation needs every frame in order and is not available for streamed traces.</p>'
+    matrix = data['matrix']
+    threshold = data['metadata']['config']['minFrameTimeMs']
+    result = gameplay_phases(matrix, threshold)
+    if len(result['phases']) < 2:
+        return '<p>No change in frame cost was found; the trace is a single phase.</p>'
+    
+    x, y = downsample_minmax(np.arange(matrix.frame_count), matrix.frame_times, _max_points(data))
+    fig = go.Figure(data=[go.Scatter(name='Frame time', x=x, y=y, mode='lines', line=dict(color='lightgray'))])
+    fig.add_trace(go.Scatter(
+        name='Phase mean',
+        x=[edge for phase in result['phases'] for edge in (phase['start'], phase['end'] - 1)],
+        y=[phase['mean'] for phase in result['phases'] for _ in range(2)],
+        mode='lines',
+        line=dict(color='crimson', width=3)
+    ))
+    for boundary in result['boundaries']:
+        fig.add_vline(x=boundary['frame'], line_dash='dash', line_color='gray')
+    fig.update_layout(
+        title='Frame Time by Phase',
+        xaxis_title='Frame Number',
+        yaxis_title='Time (ms)',
+        height=400,
+        hovermode='x unified'
+    )
+    
+    phase_rows = ''.join(f"""
+        <tr>
+            <td>{i + 1}</td>
+            <td>{phase['start']}&ndash;{phase['end'] - 1}</td>
+            <td>{phase['startTime']:.1f}s&ndash;{phase['endTime']:.1f}s</td>
+            <td>{phase['mean']:.2f}ms</td>
+            <td>{phase['p95']:.2f}ms</td>
+            <td>{phase['slowPercent']:.1f}%</td>
+        </tr>
+        """ for i, phase in enumerate(result['phases']))
+    boundary_rows = ''.join(f"""
+        <tr>
+            <td>{boundary['frame']} ({boundary['time']:.1f}s)</td>
+            <td>{_format_delta(boundary['after'] - boundary['before'], boundary['before'])}</td>
+            <td>{'<br>'.join(f"{change['name']}: {_format_delta(change['delta'], change['before'])}"
+                             for change in boundary['changes'])}</td>
+        </tr>
+        """ for boundary in result['boundaries'])
+    return f"""
+    {_figure_html(fig)}
+    <div class="stats-table">
+        <p>Phases are split where the mean of the frame time and of the top {len(result['series']) - 1}
+        functions' times jointly shifts; isolated spikes are clipped so they do not open phases of their own.</p>
+        <table>
+            <tr>
+                <th>Phase</th>
+                <th>Frames</th>
+                <th>Time</th>
+                <th>Mean Frame Time</th>
+                <th>p95 Frame Time</th>
+                <th>Slow Frames</th>
+            </tr>
+            {phase_rows}
+        </table>
+        <table>
+            <tr>
+                <th>Boundary</th>
+                <th>Frame Time Change</th>
+                <th>Largest Function Changes (per frame)</th>
+            </tr>
+            {boundary_rows}
+        </table>
+    </div>
+    """
+
+def generate_cost_models(data):
+    """Marginal cost per entity from the frames' entity counters, or None without counters"""
+    matrix, note = _sampled_matrix(data)
+    if not matrix.counter_names:
+        return None
+    result = entity_cost_models(matrix)
+    if result is None:
+        return '<p>Entity counters were recorded but did not vary enough to fit cost models.</p>'
+    counters = ', '.join(
+        f"{c['name']} (mean {c['mean']:.0f}, p95 {c['p95']:.0f}, max {c['max']:.0f})" for c in result['counters']
+    )
+    if not result['rows']:
+        return f'<p>No function cost depends measurably on the entity counters: {counters}.</p>'
+    rows = ''.join(f"""
+        <tr>
+            <td>{row['name']}</td>
+            <td>{row['counter']}</td>
+            <td>{row['msPerEntity'] * 1000:.3f}&micro;s</td>
+            <td>{row['loadCost']:.3f}ms</td>
+            <td>{row['exponent']:.2f}</td>
+            <td>{'<span class="regression">superlinear</span>' if row['superlinear'] else ''}</td>
+            <td>{row['tStat']:.1f}</td>
+            <td>{row['r2']:.2f}</td>
+        </tr>
+        """ for row in result['rows'])
+    return f"""
+    {note}
+    <div class="stats-table">
+        <p>Per-frame times of the whole frame and the top functions, regressed on every entity counter at once
+        over {result['frames']} frames. Counters: {counters}. "Cost at p95 Load" is the marginal cost times the
+        counter's p95 value; a scaling exponent near 2 marks quadratic (e.g. pairwise interaction) cost.</p>
+        <table>
+            <tr>
+                <th>Function</th>
+                <th>Counter</th>
+                <th>Cost per Entity</th>
+                <th>Cost at p95 Load</th>
+                <th>Scaling Exponent</th>
+                <th>Scaling</th>
+                <th>t</th>
+                <th>R&sup2;</th>
+            </tr>
+            {rows}
+        </table>
+    </div>
+    """
+
+def _call_histograms(data):
+    """Per-call duration histograms (a CallHistogramSet), empty for traces without them"""
+    if 'matrix' in data:
+        return data['matrix'].call_histograms
+    return data.get('callHistograms') or {}
+
+def generate_call_latency(data, top_n=8):
+    """Per-call latency distributions from GameProfiler's per-frame call histograms, or None"""
+    call_histograms = _call_histograms(data)
+    if not call_histograms:
+        return None
+    frame_count, _ = _frame_totals(data)
+    entries = sorted(call_histograms.histograms.items(), key=lambda item: item[1].max, reverse=True)
+    
+    traces = []
+    for name, histogram in entries[:top_n]:
+        keys = np.array(sorted(histogram.buckets), dtype=np.int64)
+        if not len(keys):
+            continue
+        traces.append(go.Scatter(
+            name=name,
+            x=bucket_value(keys),
+            y=histogram.dense(keys) / histogram.count * 100,
+            mode='lines+markers',
+            hovertemplate='%{x:.3f} ms<br>%{y:.2f}% of calls<extra>%{fullData.name}</extra>'
+        ))
+    fig = go.Figure(data=traces)
+    fig.update_layout(
+        title=f'Single-Call Durations (slowest {len(traces)} functions)',
+        xaxis_title='Call Duration (ms)',
+        xaxis_type='log',
+        yaxis_title='% of Calls',
+        height=400
+    )
     
+    rows = []
+    for name, histogram in entries:
+        p50, p95, p99 = histogram.quantiles([50, 95, 99])
+        mean = histogram.mean
+        worst_frame = call_histograms.worst_frames.get(name)
+        rows.append(f"""
+        <tr>
+            <td>{name}</td>
+            <td>{histogram.count}</td>
+            <td>{histogram.count / frame_count if frame_count else 0:.1f}</td>
+            <td>{mean:.3f}ms</td>
+            <td>{p50:.3f}ms</td>
+            <td>{p95:.3f}ms</td>
+            <td>{p99:.3f}ms</td>
+            <td>{histogram.max:.3f}ms</td>
+            <td>{histogram.max / mean if mean > 0 else 0:.1f}x</td>
+            <td>{worst_frame if worst_frame is not None else ''}</td>
+        </tr>
+        """)
+    return f"""
+    {_figure_html(fig)}
+    <div class="stats-table">
+        <p>Durations of individual calls, merged from each frame's log-bucketed call histogram (percentiles are
+        within {RELATIVE_ACCURACY:.0%} of the true value). A large worst-to-mean ratio marks occasional expensive
+        calls hidden inside a cheap average.</p>
+        <table>
+            <tr>
+                <th>Function</th>
+                <th>Calls</th>
+                <th>Calls/Frame</th>
+                <th>Mean/Call</th>
+                <th>p50/Call</th>
+                <th>p95/Call</th>
+                <th>p99/Call</th>
+                <th>Slowest Call</th>
+                <th>Slowest/Mean</th>
+                <th>Slowest In Frame</th>
+            </tr>
+            {''.join(rows)}
+        </table>
+    </div>
+    """
+
+def generate_whatif_table(data):
+    """Ranked optimization targets: frame stats if each function were 1.5x, 2x faster or gone"""
+    matrix, note = _sampled_matrix(data)
+    threshold = data['metadata']['config']['minFrameTimeMs']
+    result = simulate_speedups(matrix, threshold)
+    baseline = result['baseline']
+    if baseline is None or not result['rows']:
+        return '<p>No frames with function self time to simulate.</p>'
+    
+    def cells(stats):
+        return ''.join(
+            f"<td>{s['slowPercent']:.1f}%</td><td>{s['p99']:.2f}ms</td>" for s in stats
+        )
+    
+    factor_headers = ''.join(
+        f'<th colspan="2">{speedup_label(factor)}</th>' for factor in result['factors']
+    )
+    sub_headers = '<th>Slow Frames</th><th>p99</th>' * len(result['factors'])
+    baseline_row = f"""
+        <tr>
+            <td><em>As recorded</em></td>
+            <td></td>
+            {cells([baseline] * len(result['factors']))}
+        </tr>
+        """
+    rows = ''.join(f"""
+        <tr>
+            <td>{row['name']}</td>
+            <td>{row['selfPerFrame']:.3f}ms</td>
+            {cells(row['results'])}
+        </tr>
+        """ for row in result['rows'])
+    return f"""
+    {note}
+    <div class="stats-table">
+        <p>Frame statistics re-simulated from every recorded frame as if one function's self time were 1.5x or 2x
+        faster, or removed entirely (the upper bound on what optimizing it alone can gain). Every function with
+        self time is simulated, ranked by slow frames (over {threshold}ms) remaining at 2x; as recorded, {baseline['slowPercent']:.1f}%
+        of frames are slow and p99 is {baseline['p99']:.2f}ms.</p>
+        <table>
+            <tr>
+                <th rowspan="2">Function</th>
+                <th rowspan="2">Self/Frame</th>
+                {factor_headers}
+            </tr>
+            <tr>{sub_headers}</tr>
+            {baseline_row}
+            {rows}
+        </table>
+    </div>
+    """
+
+def generate_budget_table(data):
+    """Budget overrun frequency and severity of the frame and each system, or None without budgets"""
+    budgets = data['reportOptions'].get('budgets')
+    if not budgets:
+        return None
+    matrix, note = _sampled_matrix(data)
+    result = check_budgets(matrix, budgets, data['metadata']['config']['minFrameTimeMs'])
+    
+    def row(stats, functions):
+        status = 'pass' if stats['pass'] else '<strong>FAIL</strong>'
+        return f"""
+        <tr>
+            <td>{stats['name']}</td>
+            <td>{functions}</td>
+            <td>{stats['budgetMs']:g}ms</td>
+            <td>{stats['meanMs']:.3f}ms</td>
+            <td>{stats['p95Ms']:.3f}ms</td>
+            <td>{stats['overrunPercent']:.1f}% ({stats['overrunFrames']})</td>
+            <td>{stats['meanOverrunMs']:.3f}ms ({stats['meanOverrunMs'] / stats['budgetMs'] * 100:.0f}%)</td>
+            <td>{stats['worstOverrunMs']:.3f}ms</td>
+            <td>{stats['maxOverrunPercent']:g}%</td>
+            <td>{status}</td>
+        </tr>
+        """
+    
+    rows = [row(result['frame'], '')]
+    for system in result['systems']:
+        functions = ', '.join(system['functions']) if system['functions'] else '<em>no matching functions</em>'
+        rows.append(row(system, functions))
+    verdict = 'within budget' if result['pass'] else '<strong>over budget</strong>'
+    return f"""
+    {note}
+    <div class="stats-table">
+        <p>Overall: {verdict}. A system's time per frame is the inclusive time of the functions its prefixes
+        match, with matches nested in each other (even through other functions) counted once; it overruns in frames where that exceeds its budget, and fails when it overruns in more frames
+        than allowed. Overrun size is averaged over the overrunning frames, also as a share of the budget.</p>
+        <table>
+            <tr>
+                <th>System</th>
+                <th>Functions</th>
+                <th>Budget</th>
+                <th>Mean</th>
+                <th>p95</th>
+                <th>Frames Over</th>
+                <th>Mean Overrun</th>
+                <th>Worst Overrun</th>
+                <th>Allowed Over</th>
+                <th>Status</th>
+            </tr>
+            {''.join(rows)}
+        </table>
+    </div>
+    """
+
+def generate_periodic_hitches(data):
+    """Dominant repeat periods of frame and function times, from their autocorrelation"""
+    if 'matrix' not in data:
+        return '<p>Periodicity analysis needs every frame in order and is not available for streamed traces.</p>'
+    result = periodic_hitches(data['matrix'])
+    if not result['series']:
+        return '<p>No periodic pattern found in frame or function times.</p>'
+    
+    acf = result['frameAutocorrelation']
+    x, y = downsample_minmax(np.arange(len(acf)) * result['step'] / 1000, acf, _max_points(data))
+    fig = go.Figure(data=[go.Scatter(name='Frame time', x=x, y=y, mode='lines')])
+    frame_period = next((s for s in result['series'] if s['name'] == 'Frame'), None)
+    if frame_period:
+        fig.add_vline(
+            x=frame_period['periodSeconds'],
+            line_dash='dash',
+            line_color='red',
+            annotation_text=f"{frame_period['periodSeconds']:.2f}s",
+            annotation_position='top right'
+        )
+    fig.update_layout(
+        title='Frame Time Autocorrelation',
+        xaxis_title='Lag (s)',
+        yaxis_title='Autocorrelation',
+        height=350
+    )
+    
+    series_rows = ''.join(f"""
+        <tr>
+            <td>{s['name']}</td>
+            <td>{s['periodSeconds']:.2f}s</td>
+            <td>~{s['period']}</td>
+            <td>{s['strength']:.2f}</td>
+        </tr>
+        """ for s in result['series'])
+    carriers = ''
+    if frame_period and result['carriers']:
+        carrier_rows = ''.join(f"""
+            <tr>
+                <td>{c['name']}</td>
+                <td>{c['strength']:.2f}</td>
+                <td>{c['share']:.1f}%</td>
+            </tr>
+            """ for c in result['carriers'])
+        carriers = f"""
+        <p>Functions repeating at the frame-time period of {frame_period['periodSeconds']:.2f}s, with their inclusive
+        share of the frame-time excess in the periodic peak frames:</p>
+        <table>
+            <tr>
+                <th>Function</th>
+                <th>Autocorrelation at Period</th>
+                <th>Share of Peak Excess</th>
+            </tr>
+            {carrier_rows}
+        </table>
+        """
+    return f"""
+    {_figure_html(fig)}
+    <div class="stats-table">
+        <p>Series are resampled onto a {result['step']:.2f}ms time grid (keeping each step's slowest frame),
+        detrended and autocorrelated; a period is the lag of the strongest repeat (1 = perfectly periodic).</p>
+        <table>
+            <tr>
+                <th>Series</th>
+                <th>Period</th>
+                <th>Period (frames)</th>
+                <th>Strength</th>
+            </tr>
+            {series_rows}
+        </table>
+        {carriers}
+    </div>
+    """
+
+def generate_overhead_table(data):
+    """Raw vs. overhead-corrected timings, or None unless the option is enabled"""
+    if not data['reportOptions'].get('overheadCorrection'):
+        return None
+    per_call = overhead_per_call(data['metadata'])
+    names, total_time, total_calls, _ = _function_table(data)
+    self_time = _self_times(data, names)
+    corrected = corrected_totals(
+        names, total_time, self_time, total_calls, _call_tree_totals(data).edge_time, per_call
+    )
+    total_frames, total_frame_time = _frame_totals(data)
+    frames = max(total_frames, 1)
+    
+    raw_frame = total_frame_time / frames
+    corrected_frame = max(raw_frame - 2 * per_call * total_calls.sum() / frames, 0)
+    frame_rows = [('Avg Frame Time', raw_frame, corrected_frame)]
+    if 'matrix' in data:
+        matrix = data['matrix']
+        frame_times = corrected_frame_times(
+            matrix.frame_times, matrix.calls.sum(axis=1, dtype=np.float64), per_call
+        )
+        raw_p95, corrected_p95 = (
+            np.percentile(times, 95) if len(times) else 0.0 for times in (matrix.frame_times, frame_times)
+        )
+        frame_rows.append(('p95 Frame Time', raw_p95, corrected_p95))
+    frame_summary = ''.join(
+        f'<tr><td>{label}</td><td>{raw:.3f}ms</td><td>{fixed:.3f}ms</td><td>{fixed - raw:+.3f}ms</td></tr>'
+        for label, raw, fixed in frame_rows
+    )
+    
+    order = np.argsort(-corrected['exclusive'], kind='stable')
+    rows = []
+    for i in order:
+        overhead_share = (
+            corrected['exclusiveOverhead'][i] / self_time[i] * 100 if self_time[i] > 0 else 0.0
+        )
+        rows.append(f"""
+        <tr>
+            <td>{names[i]}</td>
+            <td>{total_calls[i] / frames:.1f}</td>
+            <td>{total_time[i] / frames:.3f}ms</td>
+            <td>{corrected['inclusive'][i] / frames:.3f}ms</td>
+            <td>{self_time[i] / frames:.3f}ms</td>
+            <td>{corrected['exclusive'][i] / frames:.3f}ms</td>
+            <td>{min(overhead_share, 100):.1f}%</td>
+        </tr>
+        """)
+    
+    return f"""
+    <div class="stats-table">
+        <p>Estimated instrumentation cost: {per_call * 1000:.2f}&micro;s per startFunction/endFunction
+        ({per_call * 2000:.2f}&micro;s per instrumented call). Child calls are attributed to callers
+        in proportion to the time spent under each.</p>
+        <table>
+            <tr><th>Frame</th><th>Raw</th><th>Corrected</th><th>Change</th></tr>
+            {frame_summary}
+        </table>
+        <table>
+            <tr>
+                <th>Function</th>
+                <th>Calls/Frame</th>
+                <th>Raw Total/Frame</th>
+                <th>Corrected Total/Frame</th>
+                <th>Raw Self/Frame</th>
+                <th>Corrected Self/Frame</th>
+                <th>Overhead % of Self</th>
+            </tr>
+            {''.join(rows)}
+        </table>
+    </div>
+    """
+
+REPORT_SECTIONS = [
+    ('frame_histogram', 'Frame Time Distribution', generate_frame_histogram),
+    ('budgets', 'Frame Budgets', generate_budget_table),
+    ('spikes', 'Slow Frame Spike Contributors', generate_spike_table),
+    ('phases', 'Gameplay Phases', generate_phase_analysis),
+    ('cost_models', 'Per-Entity Cost Models', generate_cost_models),
+    ('call_latency', 'Per-Call Latency', generate_call_latency),
+    ('whatif', 'Optimization Targets (What-If)', generate_whatif_table),
+    ('periodic', 'Periodic Hitches', generate_periodic_hitches),
+    ('memory', 'Memory Usage', generate_memory_chart),
+    ('memory_analysis', 'Memory Analysis', generate_memory_analysis),
+    ('timings', 'Function Timing Overview', generate_combined_timings_plot),
+    ('percentages', 'Function Time Distribution', generate_function_percentage_histogram),
+    ('breakdown', 'Function Breakdown', generate_function_breakdown),
+    ('timeline', 'Function Timeline', generate_function_timeline),
+    ('stats_table', 'Function Statistics', generate_function_stats_table),
+    ('overhead', 'Profiler Overhead Correction', generate_overhead_table),
+]
+
+def compute_summary(data):
+    """Compute the headline numbers shown in the report's summary cards"""
     avg_frame_time = data['metadata']['averageFrameTime']
     total_frames = data['metadata']['totalFrames']
-    slow_frames = len(data['slowFrames'])
-    slow_frame_percentage = (slow_frames / total_frames) * 100 if total_frames > 0 else 0
+    slow_frames = data['slowFrameCount']
+    frame_percentiles = _frame_percentiles(data)
+    return {
+        'averageFrameTime': avg_frame_time,
+        'averageFps': 1000 / avg_frame_time,
+        'totalFrames': total_frames,
+        'slowFrames': slow_frames,
+        'slowFramePercent': (slow_frames / total_frames) * 100 if total_frames > 0 else 0,
+        'frameTimePercentiles': {
+            _percentile_label(q): value for q, value in zip(PERCENTILES, frame_percentiles)
+        },
+    }
+
+def render_report_sections(data):
+    """Render the selected report sections to HTML fragments, keyed by section name
+
+    Only the sections listed in the `sections` report option are computed.
+    Generators return None for sections disabled by the other options or
+    lacking the data they need.
+    """
+    selected = data.get('reportOptions', {}).get('sections')
+    sections = {}
+    for key, _, generator in REPORT_SECTIONS:
+        if selected is not None and key not in selected:
+            continue
+        html = generator(data)
+        if html is not None:
+            sections[key] = html
+    return sections
+
+def generate_html_report(data):
+    """Generate an HTML report with all visualizations"""
+    return assemble_html_report(render_report_sections(data), compute_summary(data))
+
+def assemble_html_report(sections, summary, cache_key=None, offline=False):
+    """Wrap rendered sections and summary stats into a complete HTML page
+
+    With `offline` the plotly.js bundle is inlined once so the page works
+    without network access.
+    """
+    avg_frame_time = summary['averageFrameTime']
+    avg_fps = summary['averageFps']
+    total_frames = summary['totalFrames']
+    slow_frames = summary['slowFrames']
+    slow_frame_percentage = summary['slowFramePercent']
+    
+    section_html = ''.join(
+        f"""
+                    <div class="chart-container">
+                        <h3>{title}</h3>
+                        {sections[key]}
+                    </div>
+                    """
+        for key, title, _ in REPORT_SECTIONS if key in sections
+    )
+    percentile_cards = ''.join(
+        f"""
+                    <div class="summary-item">
+                        <h3>{label} Frame Time</h3>
+                        <p>{value:.2f}ms</p>
+                    </div>"""
+        for label, value in summary['frameTimePercentiles'].items()
+    )
+    cache_meta = REPORT_KEY_MARKER.format(cache_key) if cache_key else ''
     
     html = f"""
     <!DOCTYPE html>
     <html>
         <head>
             <title>Performance Profile Report</title>
-            <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
+            {cache_meta}
+            {plotly_script_tag(offline)}
             <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    margin: 0;
-                    padding: 20px;
-                    background-color: #f5f5f5;
-                }}
-                
-                .container {{
-                    max-width: 1200px;
-                    margin: 0 auto;
-                    background-color: white;
-                    padding: 20px;
-                    border-radius: 5px;
-                    box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-                }}
-                
-                .header {{
-                    text-align: center;
-                    margin-bottom: 30px;
-                }}
-                
-                .summary {{
-                    display: flex;
-                    justify-content: space-around;
-                    margin-bottom: 30px;
-                    flex-wrap: wrap;
-                }}
-                
-                .summary-item {{
-                    text-align: center;
-                    padding: 15px;
-                    background-color: #f8f9fa;
-                    border-radius: 5px;
-                    margin: 10px;
-                    flex: 1;
-                    min-width: 200px;
-                }}
-                
-                .summary-item h3 {{
-                    margin: 0;
-                    color: #666;
-                }}
-                
-                .summary-item p {{
-                    margin: 10px 0 0 0;
-                    font-size: 24px;
-                    font-weight: bold;
-                    color: #333;
-                }}
-                
-                .chart-container {{
-                    margin-bottom: 30px;
-                    padding: 20px;
-                    background-color: white;
-                    border-radius: 5px;
-                    box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-                }}
-                
-                .section {{
-                    margin-bottom: 40px;
-                }}
-                
-                table {{
-                    width: 100%;
-                    border-collapse: collapse;
-                    margin-top: 20px;
-                }}
-                
-                th, td {{
-                    padding: 12px;
-                    text-align: left;
-                    border-bottom: 1px solid #ddd;
-                }}
-                
-                th {{
-                    background-color: #f8f9fa;
-                    font-weight: bold;
-                }}
-                
-                tr:hover {{
-                    background-color: #f5f5f5;
-                }}
-                
-                .warning {{
-                    color: #856404;
-                    background-color: #fff3cd;
-                    border: 1px solid #ffeeba;
-                    padding: 12px;
-                    border-radius: 4px;
-                    margin-bottom: 20px;
-                }}
+                {REPORT_STYLE}
             </style>
         </head>
         <body>
@@ -592,7 +1440,7 @@ def generate_html_report(data):
                     </div>
                     <div class="summary-item">
                         <h3>Average FPS</h3>
-                        <p>{1000/avg_frame_time:.2f}</p>
+                        <p>{avg_fps:.2f}</p>
                     </div>
                     <div class="summary-item">
                         <h3>Total Frames</h3>
@@ -602,99 +1450,805 @@ def generate_html_report(data):
                         <h3>Slow Frames</h3>
                         <p>{slow_frames} ({slow_frame_percentage:.1f}%)</p>
                     </div>
+                    {percentile_cards}
                 </div>
                 
                 {f'<div class="warning">Warning: {slow_frame_percentage:.1f}% of frames exceeded the target frame time.</div>' if slow_frame_percentage > 5 else ''}
                 
+                <div class="section">
+                    {section_html}
+                </div>
+            </div>
+        </body>
+    </html>
+    """
+    
+    return html
+
+def _format_change(delta, relative):
+    relative_text = 'new' if relative == float('inf') else f'{relative:+.1f}%'
+    css = 'regression' if delta > 0 else 'improvement' if delta < 0 else ''
+    return f'<span class="{css}">{delta:+.3f}ms ({relative_text})</span>'
+
+def _format_test(row):
+    if row['p'] is None:
+        return '<td>-</td><td>-</td>'
+    low, high = row['ci']
+    return f"<td>{row['p']:.2g}</td><td>[{low:+.3f}, {high:+.3f}]ms</td>"
+
+def generate_comparison_report(result, base_matrix, cand_matrix, base_file, cand_file, offline=False):
+    """Generate an HTML delta report for a baseline/candidate comparison"""
+    frame = result['frame']
+    settings = result['settings']
+    regressed = bool(result['regressions'])
+    
+    fig = go.Figure()
+    edges = np.histogram_bin_edges(
+        np.concatenate([base_matrix.frame_times, cand_matrix.frame_times]), bins=HISTOGRAM_BINS
+    )
+    for label, frame_times in (('Baseline', base_matrix.frame_times), ('Candidate', cand_matrix.frame_times)):
+        counts, _ = np.histogram(frame_times, bins=edges)
+        fig.add_trace(go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=counts / len(frame_times),
+            width=np.diff(edges),
+            name=label,
+            opacity=0.6
+        ))
+    fig.update_layout(
+        title='Frame Time Distribution',
+        xaxis_title='Frame Time (ms)',
+        yaxis_title='Fraction of Frames',
+        barmode='overlay',
+        height=400
+    )
+    frame_histogram = _figure_html(fig)
+    
+    top = sorted(result['functions'], key=lambda row: abs(row['delta']), reverse=True)[:15]
+    fig = go.Figure([
+        go.Bar(
+            x=[row['delta'] for row in top],
+            y=[row['name'] for row in top],
+            orientation='h',
+            marker_color=['#b00020' if row['regression'] else '#888' for row in top],
+        )
+    ])
+    fig.update_layout(
+        title='Largest Changes in Time per Frame',
+        xaxis_title='Candidate - Baseline (ms/frame)',
+        yaxis=dict(autorange='reversed'),
+        height=500,
+        margin=dict(l=200)
+    )
+    function_deltas = _figure_html(fig)
+    
+    frame_rows = ''.join(
+        f"""
+            <tr>
+                <td>{label}</td>
+                <td>{frame['base'][key]:.2f}ms</td>
+                <td>{frame['cand'][key]:.2f}ms</td>
+                <td>{frame['cand'][key] - frame['base'][key]:+.2f}ms</td>
+            </tr>"""
+        for key, label in [('mean', 'Mean'), ('p50', 'p50'), ('p95', 'p95'), ('p99', 'p99')]
+    )
+    
+    function_rows = ''.join(
+        f"""
+            <tr>
+                <td>{row['name']}</td>
+                <td>{row['base']['mean']:.3f}ms</td>
+                <td>{row['cand']['mean']:.3f}ms</td>
+                <td>{_format_change(row['delta'], row['relative'])}</td>
+                {_format_test(row)}
+                <td>{'<span class="regression">REGRESSION</span>' if row['regression'] else ''}</td>
+            </tr>"""
+        for row in result['functions']
+    )
+    
+    verdict = f'<span class="regression">REGRESSION ({len(result["regressions"])})</span>' if regressed else 'PASS'
+    
+    return f"""
+    <!DOCTYPE html>
+    <html>
+        <head>
+            <title>Performance Comparison Report</title>
+            {plotly_script_tag(offline)}
+            <style>
+                {REPORT_STYLE}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>Performance Comparison Report</h1>
+                    <p>Baseline: {os.path.basename(base_file)}<br>Candidate: {os.path.basename(cand_file)}</p>
+                </div>
+                
+                <div class="summary">
+                    <div class="summary-item">
+                        <h3>Baseline Frame Time</h3>
+                        <p>{frame['base']['mean']:.2f}ms</p>
+                    </div>
+                    <div class="summary-item">
+                        <h3>Candidate Frame Time</h3>
+                        <p>{frame['cand']['mean']:.2f}ms</p>
+                    </div>
+                    <div class="summary-item">
+                        <h3>Change</h3>
+                        <p>{_format_change(frame['delta'], frame['relative'])}</p>
+                    </div>
+                    <div class="summary-item">
+                        <h3>Verdict</h3>
+                        <p>{verdict}</p>
+                    </div>
+                </div>
+                
+                <p>A change is a regression when it exceeds {settings['thresholdPct']:g}% and {settings['minDeltaMs']:g}ms per frame,
+                is significant under a Mann-Whitney U test at alpha={settings['alpha']:g} (Holm-corrected across functions)
+                and the {settings['bootstrap']}-resample bootstrap CI of the mean change excludes zero.</p>
+                
                 <div class="section">
                     <div class="chart-container">
-                        <h3>Frame Time Distribution</h3>
+                        <h3>Frame Time</h3>
+                        <table>
+                            <tr><th>Statistic</th><th>Baseline</th><th>Candidate</th><th>Change</th></tr>
+                            {frame_rows}
+                        </table>
+                        <p>Mann-Whitney p = {frame['p']:.2g}, 95% CI of mean change [{frame['ci'][0]:+.3f}, {frame['ci'][1]:+.3f}]ms</p>
                         {frame_histogram}
                     </div>
                     
                     <div class="chart-container">
-                        <h3>Memory Usage</h3>
-                        {memory_chart}
+                        <h3>Function Changes</h3>
+                        {function_deltas}
                     </div>
                     
                     <div class="chart-container">
-                        <h3>Function Timing Overview</h3>
-                        {combined_timings}
+                        <h3>Function Comparison (inclusive ms/frame)</h3>
+                        <table>
+                            <tr>
+                                <th>Function</th>
+                                <th>Baseline</th>
+                                <th>Candidate</th>
+                                <th>Change</th>
+                                <th>p-value</th>
+                                <th>95% CI</th>
+                                <th>Status</th>
+                            </tr>
+                            {function_rows}
+                        </table>
                     </div>
-                    
-                    <div class="chart-container">
-                        <h3>Function Time Distribution</h3>
-                        {function_percentages}
+                </div>
+            </div>
+        </body>
+    </html>
+    """
+
+def run_comparison(base_file, cand_file, threshold_pct, alpha, min_delta_ms, offline=False):
+    """Compare two traces, write the delta report and return the exit code
+
+    Exit codes: 0 no regression, 1 regression detected, 2 traces unreadable.
+    """
+    try:
+        base = load_profile(base_file)
+        cand = load_profile(cand_file)
+        result = compare_matrices(
+            base['matrix'], cand['matrix'],
+            threshold_pct=threshold_pct, alpha=alpha, min_delta_ms=min_delta_ms
+        )
+    except Exception as e:
+        print(f"An error occurred while comparing {base_file} and {cand_file}: {e}")
+        return 2
+    
+    output_file = (
+        os.path.splitext(cand_file)[0] + '_vs_' +
+        os.path.splitext(os.path.basename(base_file))[0] + '_compare.html'
+    )
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(generate_comparison_report(result, base['matrix'], cand['matrix'], base_file, cand_file, offline))
+    
+    frame = result['frame']
+    print(f"Frame time: {frame['base']['mean']:.2f}ms -> {frame['cand']['mean']:.2f}ms "
+          f"({frame['delta']:+.2f}ms, p={frame['p']:.2g})")
+    if result['regressions']:
+        print(f"Regressions ({len(result['regressions'])}):")
+        for row in [frame] + result['functions']:
+            if row['regression']:
+                print(f"  {row['name']}: {row['base']['mean']:.3f}ms -> {row['cand']['mean']:.3f}ms per frame")
+    else:
+        print("No significant regressions.")
+    print(f"Comparison report generated: {output_file}")
+    return 1 if result['regressions'] else 0
+
+def _format_ci(ci, fmt='.2f'):
+    low, high = ci
+    if np.isnan(low) or np.isnan(high):
+        return '-'
+    return f'[{low:{fmt}}, {high:{fmt}}]'
+
+def generate_aggregate_report(result, offline=False):
+    """Generate an HTML report of pooled distributions across sessions"""
+    frame = result['frame']
+    sessions = result['sessions']
+    
+    sketch = frame['sketch']
+    keys = np.array(sorted(sketch.buckets), dtype=np.int64)
+    fig = go.Figure(go.Bar(
+        x=bucket_value(keys),
+        y=sketch.dense(keys) / max(sketch.count, 1),
+        name='Pooled frame times'
+    ))
+    threshold_lines = sorted({config['minFrameTimeMs'] for config in result['configs']})
+    for threshold in threshold_lines:
+        fig.add_vline(x=threshold, line_dash='dash', line_color='red',
+                      annotation_text=f'{threshold}ms threshold')
+    fig.update_layout(
+        title='Pooled Frame Time Distribution',
+        xaxis_title='Frame Time (ms, log buckets)',
+        yaxis_title='Fraction of Frames',
+        xaxis_type='log',
+        height=400
+    )
+    frame_histogram = _figure_html(fig)
+    
+    percentile_headers = ''.join(
+        f'<th>{_percentile_label(q)}</th><th>{_percentile_label(q)} 95% CI</th>' for q in AGGREGATE_PERCENTILES
+    )
+    
+    def percentile_cells(row):
+        return ''.join(
+            f"<td>{row['percentiles'][j]:.3f}ms</td><td>{_format_ci(row['percentileCi'][:, j], '.3f')}</td>"
+            for j in range(len(AGGREGATE_PERCENTILES))
+        )
+    
+    session_rows = ''.join(
+        f"""
+            <tr>
+                <td>{os.path.basename(s.path)}</td>
+                <td>{s.frame_count}</td>
+                <td>{s.frame_times.mean:.2f}ms</td>
+                <td>{s.slow_frames}</td>
+                <td>{s.config.get('minFrameTimeMs')}ms</td>
+                <td>{s.config.get('minFunctionTimeMs')}ms</td>
+                <td>{len(s.functions)}</td>
+            </tr>"""
+        for s in sessions
+    )
+    function_rows = ''.join(
+        f"""
+            <tr>
+                <td>{row['name']}</td>
+                <td>{row['sessions']}</td>
+                <td>{row['meanPerFrame']:.3f}ms</td>
+                <td>{_format_ci(row['meanPerFrameCi'], '.3f')}</td>
+                {percentile_cells(row)}
+            </tr>"""
+        for row in result['functions']
+    )
+    config_note = ''
+    if len(result['configs']) > 1:
+        config_note = (
+            f'<div class="warning">Sessions were recorded with {len(result["configs"])} different profiler configs. '
+            'Slow frames are counted against each session\'s own minFrameTimeMs, and functions below a '
+            'session\'s minFunctionTimeMs are missing from that session.</div>'
+        )
+    
+    return f"""
+    <!DOCTYPE html>
+    <html>
+        <head>
+            <title>Aggregate Performance Report</title>
+            {plotly_script_tag(offline)}
+            <style>
+                {REPORT_STYLE}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>Aggregate Performance Report</h1>
+                    <p>{len(sessions)} sessions, {frame['frames']} frames</p>
+                </div>
+                
+                <div class="summary">
+                    <div class="summary-item">
+                        <h3>Mean Frame Time</h3>
+                        <p>{frame['mean']:.2f}ms</p>
                     </div>
-                    
+                    <div class="summary-item">
+                        <h3>95% CI (across sessions)</h3>
+                        <p>{_format_ci(frame['meanCi'])}</p>
+                    </div>
+                    <div class="summary-item">
+                        <h3>Slow Frames</h3>
+                        <p>{frame['slowFrames']} ({frame['slowFrames'] / max(frame['frames'], 1) * 100:.1f}%)</p>
+                    </div>
+                </div>
+                
+                {config_note}
+                <p>Sessions are the independent unit: mean CIs are Student t intervals over per-session means, and
+                percentile CIs come from a bootstrap that resamples whole sessions. Pooled percentiles come from
+                log-bucketed sketches and are accurate to {RELATIVE_ACCURACY:.0%}. Function percentiles are over
+                the frames in which the function ran.</p>
+                
+                <div class="section">
                     <div class="chart-container">
-                        <h3>Function Breakdown</h3>
-                        {function_breakdown}
+                        <h3>Frame Time</h3>
+                        <table>
+                            <tr>{percentile_headers}</tr>
+                            <tr>{percentile_cells(frame)}</tr>
+                        </table>
+                        {frame_histogram}
                     </div>
                     
                     <div class="chart-container">
-                        <h3>Function Timeline</h3>
-                        {function_timeline}
+                        <h3>Functions (inclusive time)</h3>
+                        <table>
+                            <tr>
+                                <th>Function</th>
+                                <th>Sessions</th>
+                                <th>Mean/Frame</th>
+                                <th>Mean/Frame 95% CI</th>
+                                {percentile_headers}
+                            </tr>
+                            {function_rows}
+                        </table>
                     </div>
                     
                     <div class="chart-container">
-                        <h3>Function Statistics</h3>
-                        {function_stats_table}
+                        <h3>Sessions</h3>
+                        <table>
+                            <tr>
+                                <th>Trace</th>
+                                <th>Frames</th>
+                                <th>Mean Frame Time</th>
+                                <th>Slow Frames</th>
+                                <th>minFrameTimeMs</th>
+                                <th>minFunctionTimeMs</th>
+                                <th>Functions</th>
+                            </tr>
+                            {session_rows}
+                        </table>
                     </div>
                 </div>
             </div>
         </body>
     </html>
     """
+
+def run_aggregate(input_files, offline=False):
+    """Pool several traces into one report; returns the exit code
+
+    Traces are reduced to sketches one at a time: JSON traces are streamed
+    into them and .ptrace traces memory-mapped, so memory stays bounded
+    however long the traces are. Exit code 1 if any trace could not be read.
+    """
+    sessions = []
+    failed = []
+    for input_file in input_files:
+        print(f"Summarizing {input_file}...")
+        try:
+            if input_file.endswith(BINARY_TRACE_SUFFIX):
+                session = SessionSummary.from_profile(input_file, load_profile(input_file))
+            else:
+                session = SessionSummary.from_stream(input_file, process_profile_stream(input_file, sample_frames=0))
+            sessions.append(session)
+        except Exception as e:
+            print(f"An error occurred while processing {input_file}: {e}")
+            failed.append(input_file)
+    if not sessions:
+        print("No traces could be aggregated.")
+        return 1
     
-    return html
+    result = aggregate_sessions(sessions)
+    output_dir = os.path.commonpath([os.path.dirname(os.path.abspath(f)) for f in input_files])
+    output_file = os.path.join(output_dir, 'aggregate_report.html')
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(generate_aggregate_report(result, offline))
+    
+    frame = result['frame']
+    print(f"Pooled frame time over {len(sessions)} sessions: {frame['mean']:.2f}ms "
+          f"(95% CI {_format_ci(frame['meanCi'])}ms)")
+    print(f"Aggregate report generated: {output_file}")
+    return 1 if failed else 0
+
+def load_profile(input_file, stream=False, options=None):
+    """Load and process a trace, either whole or incrementally
+
+    `options` (see DEFAULT_REPORT_OPTIONS) is stored on the result as
+    `reportOptions` for the section generators. Binary .ptrace traces are
+    memory-mapped, so `stream` does not apply to them.
+    """
+    options = dict(DEFAULT_REPORT_OPTIONS, **(options or {}))
+    if input_file.endswith(BINARY_TRACE_SUFFIX):
+        profile_data = process_profile_data(load_binary_trace(input_file))
+    elif stream:
+        profile_data = process_profile_stream(input_file, max_points=options['maxPoints'])
+    else:
+        with open(input_file, 'r') as f:
+            profile_data = process_profile_data(json.load(f))
+    profile_data['reportOptions'] = options
+    return profile_data
+
+def load_frame_summary(input_file, stream=False):
+    """Load only what compute_summary needs: metadata and per-frame times
+
+    Skips building the frame x function matrix, so a summary of a large
+    trace costs little more than parsing it; .ptrace traces only map their
+    frame-time column. Streamed traces keep only a frame-time sketch.
+    """
+    if input_file.endswith(BINARY_TRACE_SUFFIX):
+        metadata, frame_times = load_binary_frame_times(input_file)
+    elif stream:
+        metadata = None
+        frames = None
+        for section, _, value in iter_profile_events(input_file):
+            if section == 'frameData':
+                if frames is None:
+                    if metadata is None:
+                        raise ValueError('Streaming requires metadata to precede frameData')
+                    frames = FrameTimeAccumulator(metadata['config']['minFrameTimeMs'])
+                frames.add(value['totalTime'])
+            elif section == 'metadata':
+                metadata = value
+        if metadata is None:
+            raise ValueError('Profile data has no metadata')
+        if frames is None:
+            frames = FrameTimeAccumulator(metadata['config']['minFrameTimeMs'])
+        return {'metadata': metadata, 'frameSummary': frames, 'slowFrameCount': frames.slow}
+    else:
+        with open(input_file, 'r') as f:
+            raw = json.load(f)
+        metadata = raw['metadata']
+        frame_times = np.array([frame['totalTime'] for frame in raw['frameData']], dtype=np.float64)
+    return {
+        'metadata': metadata,
+        'frameTimes': frame_times,
+        'slowFrameCount': int(np.count_nonzero(frame_times > metadata['config']['minFrameTimeMs'])),
+    }
+
+def trace_summary(input_file, stream=False):
+    """Headline frame-time statistics of a trace as a JSON-ready dict"""
+    data = load_frame_summary(input_file, stream)
+    summary = compute_summary(data)
+    summary['frameTimePercentiles'] = {
+        label: value if np.isfinite(value) else None for label, value in summary['frameTimePercentiles'].items()
+    }
+    return {
+        'trace': input_file,
+        'analyzerVersion': ANALYZER_VERSION,
+        'slowFrameThresholdMs': data['metadata']['config']['minFrameTimeMs'],
+        **summary,
+    }
+
+def format_summary_text(summary):
+    """One trace summary as a few lines of plain text"""
+    percentiles = '  '.join(
+        f"{label} {value:.2f}ms" if value is not None else f"{label} n/a"
+        for label, value in summary['frameTimePercentiles'].items()
+    )
+    return (
+        f"{summary['trace']}: {summary['totalFrames']} frames, "
+        f"avg {summary['averageFrameTime']:.2f}ms ({summary['averageFps']:.1f} FPS), "
+        f"slow {summary['slowFrames']} ({summary['slowFramePercent']:.1f}% > {summary['slowFrameThresholdMs']}ms)\n"
+        f"  {percentiles}"
+    )
+
+def print_summaries(input_files, fmt, stream=False):
+    """Print text or JSON summaries without building report sections
+
+    JSON is one object per line. Returns the exit code: 1 if any trace failed.
+    """
+    failed = False
+    for input_file in input_files:
+        try:
+            summary = trace_summary(input_file, stream)
+        except Exception as e:
+            print(f"An error occurred while summarizing {input_file}: {e}", file=sys.stderr)
+            failed = True
+            continue
+        print(json.dumps(summary) if fmt == 'json' else format_summary_text(summary))
+    return 1 if failed else 0
+
+def check_trace_budgets(input_files, budgets, stream=False):
+    """Print each trace's budget check as one JSON object per line, for CI
+
+    With `stream` the checks run on the streamed frame sample, in bounded
+    memory, and `sampledFrames` gives the sample size. Returns the exit
+    code: 0 all traces within budget, 1 any over budget, 2 any trace
+    unreadable.
+    """
+    exit_code = 0
+    for input_file in input_files:
+        try:
+            data = load_profile(input_file, stream)
+            matrix, _ = _sampled_matrix(data)
+            result = check_budgets(matrix, budgets, data['metadata']['config']['minFrameTimeMs'])
+            if 'matrix' not in data:
+                result['sampledFrames'] = matrix.frame_count
+        except Exception as e:
+            print(f"An error occurred while checking budgets of {input_file}: {e}", file=sys.stderr)
+            exit_code = 2
+            continue
+        print(json.dumps({'trace': input_file, 'analyzerVersion': ANALYZER_VERSION, **result}))
+        if not result['pass'] and exit_code == 0:
+            exit_code = 1
+    return exit_code
+
+def analyze_and_generate_report(input_file, stream=False, cache=None, options=None):
+    """Analyzes a single profile data file and generates a report.
 
-def analyze_and_generate_report(input_file):
-    """Analyzes a single profile data file and generates a report."""
+    With `stream` the trace is read in a single pass into bounded sketches
+    instead of being loaded whole, trading exact per-frame data for flat
+    memory use on very long traces. With a ReportCache, traces whose
+    report is already current are skipped and cached sections are reused.
+    `options` overrides DEFAULT_REPORT_OPTIONS. Returns True if the report
+    is up to date, False if the trace could not be analyzed.
+    """
+    options = dict(DEFAULT_REPORT_OPTIONS, **(options or {}))
     print(f"Analyzing {input_file}...")
+    output_file = os.path.splitext(input_file)[0] + '_report.html'
     try:
-        with open(input_file, 'r') as f:
-            profile_data = json.load(f)
-    
-        profile_data = process_profile_data(profile_data)
+        cache_key = None
+        entry = None
+        if cache is not None:
+            cache_key = cache.key_for(input_file, options=json.dumps(dict(options, stream=stream), sort_keys=True))
+            if report_is_current(output_file, cache_key):
+                print(f"Report up to date: {output_file}")
+                return True
+            entry = cache.get(cache_key)
+        
+        if entry is None:
+            profile_data = load_profile(input_file, stream, options)
+            entry = {
+                'summary': compute_summary(profile_data),
+                'sections': render_report_sections(profile_data),
+            }
+            if cache is not None:
+                cache.put(cache_key, entry)
     
-        html_report = generate_html_report(profile_data)
-        output_file = os.path.splitext(input_file)[0] + '_report.html'
+        html_report = assemble_html_report(entry['sections'], entry['summary'], cache_key, options['offline'])
     
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write(html_report)
     
         print(f"Report generated: {output_file}")
+        return True
     except json.JSONDecodeError as e:
         print(f"Error decoding JSON from {input_file}: {e}")
     except Exception as e:
         print(f"An error occurred while processing {input_file}: {e}")
+    return False
+
+def analyze_traces(input_files, jobs=1, stream=False, cache=None, options=None):
+    """Analyze several traces, optionally across a process pool.
+
+    Returns a dict mapping each input file to True (report written) or False.
+    """
+    if jobs == 1 or len(input_files) == 1:
+        return {f: analyze_and_generate_report(f, stream, cache, options) for f in input_files}
+
+    results = {}
+    crashed = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(analyze_and_generate_report, f, stream, cache, options): f for f in input_files}
+        for future in as_completed(futures):
+            input_file = futures[future]
+            try:
+                results[input_file] = future.result()
+            except BrokenProcessPool:
+                crashed.append(input_file)
+
+    # A dying worker (e.g. killed for running out of memory) takes every
+    # in-flight trace down with it; rerun those one per process so only the
+    # trace that actually crashes is reported as failed.
+    for input_file in crashed:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            try:
+                results[input_file] = pool.submit(analyze_and_generate_report, input_file, stream, cache, options).result()
+            except BrokenProcessPool:
+                print(f"Worker process crashed while processing {input_file}")
+                results[input_file] = False
+    return results
+
+def print_batch_summary(results):
+    """Print succeeded/failed counts and list failed traces"""
+    failed = sorted(f for f, ok in results.items() if not ok)
+    print(f"\n{len(results) - len(failed)} of {len(results)} traces analyzed successfully.")
+    if failed:
+        print(f"{len(failed)} failed:")
+        for input_file in failed:
+            print(f"  {input_file}")
+
+def ingest_traces(paths, store_path, force=False):
+    """Load traces (files or directories) into the SQLite trace store
+
+    Traces whose content is already stored are skipped unless `force`.
+    Returns the exit code: 1 if any trace failed.
+    """
+    input_files = []
+    for path in paths:
+        input_files.extend(find_traces(path) if os.path.isdir(path) else [path])
+    os.makedirs(os.path.dirname(os.path.abspath(store_path)), exist_ok=True)
+    conn = connect_store(store_path)
+    ingested = skipped = 0
+    failed = []
+    for input_file in input_files:
+        try:
+            if not force and is_ingested(conn, input_file):
+                skipped += 1
+                continue
+            print(f"Ingesting {input_file}...")
+            ingest_profile(conn, input_file, load_profile(input_file))
+            ingested += 1
+        except Exception as e:
+            print(f"An error occurred while ingesting {input_file}: {e}")
+            failed.append(input_file)
+    conn.close()
+    print(f"{ingested} traces ingested, {skipped} already up to date, {len(failed)} failed ({store_path})")
+    return 1 if failed else 0
+
+def _section_list(value):
+    keys = [key.strip() for key in value.split(',') if key.strip()]
+    known = [key for key, _, _ in REPORT_SECTIONS]
+    unknown = [key for key in keys if key not in known]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown section(s) {', '.join(unknown)}; choose from {', '.join(known)}")
+    return keys
+
+def _budget_file(path):
+    try:
+        return load_budgets(path)
+    except (OSError, ValueError) as e:
+        raise argparse.ArgumentTypeError(f"cannot read budgets from {path}: {e}")
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description='Generate HTML reports from GameProfiler traces')
+    p.add_argument('input', nargs='?', help=f'Profile data JSON exported by GameProfiler, or a {BINARY_TRACE_SUFFIX} file')
+    p.add_argument('--all-traces', nargs='?', const='traces', metavar='DIR',
+                   help=f'Analyze every .json or {BINARY_TRACE_SUFFIX} trace in DIR (default: traces)')
+    p.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'),
+                   help='Compare two traces and exit non-zero on a significant regression')
+    p.add_argument('--aggregate', nargs='+', metavar='TRACE',
+                   help='Pool several sessions (traces or directories of traces) into one report with confidence intervals')
+    p.add_argument('--ingest', nargs='*', metavar='PATH',
+                   help='Add traces (files or directories, default: traces) to the SQLite store queried by profile_store.py')
+    p.add_argument('--store', metavar='FILE',
+                   help=f'Trace store for --ingest (default: {DEFAULT_STORE_NAME} in the first directory ingested)')
+    p.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD_PCT, metavar='PCT',
+                   help='Minimum relative slowdown counted as a regression (default: %(default)s%%)')
+    p.add_argument('--alpha', type=float, default=DEFAULT_ALPHA,
+                   help='Significance level for --compare (default: %(default)s)')
+    p.add_argument('--min-delta-ms', type=float, default=DEFAULT_MIN_DELTA_MS, metavar='MS',
+                   help='Ignore slowdowns smaller than this many ms per frame (default: %(default)s)')
+    p.add_argument('--stream', action='store_true',
+                   help='Read traces in one pass into bounded-memory sketches (for very long traces)')
+    p.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                   help='Analyze --all-traces with N worker processes (0 = one per CPU)')
+    p.add_argument('--offline', action='store_true',
+                   help='Inline plotly.js so reports open without network access')
+    p.add_argument('--sections', type=_section_list, metavar='KEY[,KEY...]',
+                   help='Only compute these report sections: ' + ', '.join(key for key, _, _ in REPORT_SECTIONS))
+    p.add_argument('--summary', choices=('text', 'json'),
+                   help='Print frame-time summary statistics instead of writing HTML reports')
+    p.add_argument('--budgets', type=_budget_file, metavar='FILE',
+                   help='JSON frame target and per-system budgets; adds a budget overrun section to reports')
+    p.add_argument('--check-budgets', action='store_true',
+                   help='Print a JSON budget pass/fail per trace instead of writing reports, and exit 1 '
+                        'if any trace is over budget (requires --budgets; with --stream, checks a frame sample)')
+    p.add_argument('--overhead-correction', action='store_true',
+                   help='Add raw vs. profiler-overhead-corrected timings to the report')
+    p.add_argument('--max-points', type=int, default=DEFAULT_MAX_POINTS, metavar='N',
+                   help='Downsample plotted per-frame series to at most N points (default: %(default)s)')
+    p.add_argument('--no-cache', action='store_true',
+                   help='Always re-analyze traces instead of reusing cached reports')
+    p.add_argument('--cache-dir', metavar='DIR',
+                   help=f'Report cache directory (default: {DEFAULT_CACHE_DIRNAME} next to the traces)')
+    p.add_argument('--cache-max-mb', type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024), metavar='MB',
+                   help='Evict least recently used cache entries beyond this size')
+    return p.parse_args(argv)
+
+def find_traces(traces_dir):
+    """Trace files in traces_dir, preferring a .ptrace over a .json of the same name
+
+    Chrome Trace Event files written by profile_export.py are skipped.
+    """
+    traces = {}
+    for path in sorted(glob.glob(os.path.join(traces_dir, '*.json'))):
+        if not path.endswith(CHROME_TRACE_SUFFIX):
+            traces[os.path.splitext(path)[0]] = path
+    for path in sorted(glob.glob(os.path.join(traces_dir, '*' + BINARY_TRACE_SUFFIX))):
+        traces[os.path.splitext(path)[0]] = path
+    return sorted(traces.values())
+
+def make_cache(args, traces_dir):
+    """Build the ReportCache selected by the command line, or None"""
+    if args.no_cache:
+        return None
+    cache_dir = args.cache_dir or os.path.join(traces_dir, DEFAULT_CACHE_DIRNAME)
+    return ReportCache(cache_dir, ANALYZER_VERSION, int(args.cache_max_mb * 1024 * 1024))
+
+def report_options(args):
+    """Collect the report options selected on the command line"""
+    return {
+        'maxPoints': args.max_points,
+        'offline': args.offline,
+        'overheadCorrection': args.overhead_correction,
+        'sections': args.sections,
+        'budgets': args.budgets,
+    }
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python profile_analyzer.py <profile_data.json> | --all-traces [directory]")
+    args = parse_args()
+    if args.check_budgets and not args.budgets:
+        print("Error: --check-budgets requires --budgets FILE.")
+        sys.exit(2)
+    if args.compare:
+        for path in args.compare:
+            if not os.path.isfile(path):
+                print(f"Error: file '{path}' not found.")
+                sys.exit(2)
+        sys.exit(run_comparison(*args.compare, args.threshold, args.alpha, args.min_delta_ms, args.offline))
+    
+    if args.ingest is not None:
+        paths = args.ingest or ['traces']
+        first_dir = paths[0] if os.path.isdir(paths[0]) else os.path.dirname(paths[0]) or '.'
+        sys.exit(ingest_traces(paths, args.store or os.path.join(first_dir, DEFAULT_STORE_NAME)))
+    
+    if args.aggregate:
+        input_files = []
+        for path in args.aggregate:
+            input_files.extend(find_traces(path) if os.path.isdir(path) else [path])
+        missing = [path for path in input_files if not os.path.isfile(path)]
+        for path in missing:
+            print(f"Error: file '{path}' not found.")
+        if missing or not input_files:
+            sys.exit(1)
+        sys.exit(run_aggregate(input_files, args.offline))
+    
+    if args.input is None and args.all_traces is None:
+        print("Usage: python profile_analyzer.py <profile_data.json> | --all-traces [directory] [--jobs N] [--stream]"
+              " [--sections KEY,...] [--summary text|json] [--budgets FILE [--check-budgets]]"
+              " | --compare <baseline.json> <candidate.json> | --aggregate <trace.json> ...")
         sys.exit(1)
     
-    if sys.argv[1] == '--all-traces':
-        traces_dir = sys.argv[2] if len(sys.argv) > 2 else 'traces'
+    if args.all_traces is not None:
+        traces_dir = args.all_traces
         if not os.path.isdir(traces_dir):
             print(f"Error: Traces directory '{traces_dir}' not found.")
             sys.exit(1)
         
-        json_files = glob.glob(os.path.join(traces_dir, '*.json'))
+        trace_files = find_traces(traces_dir)
         
-        if not json_files:
-            print(f"No .json profile data found in '{traces_dir}'.")
+        if not trace_files:
+            print(f"No .json or {BINARY_TRACE_SUFFIX} profile data found in '{traces_dir}'.")
             sys.exit(0)
+        if args.summary:
+            sys.exit(print_summaries(trace_files, args.summary, args.stream))
+        if args.check_budgets:
+            sys.exit(check_trace_budgets(trace_files, args.budgets, args.stream))
 
-        for input_file in json_files:
-            analyze_and_generate_report(input_file)
+        jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+        cache = make_cache(args, traces_dir)
+        results = analyze_traces(trace_files, jobs=jobs, stream=args.stream, cache=cache,
+                                 options=report_options(args))
+        print_batch_summary(results)
+        if not all(results.values()):
+            sys.exit(1)
     else:
-        input_file = sys.argv[1]
+        input_file = args.input
         if not os.path.isfile(input_file):
             print(f"Error: file '{input_file}' not found.")
             sys.exit(1)
-        analyze_and_generate_report(input_file)
+        if args.summary:
+            sys.exit(print_summaries([input_file], args.summary, args.stream))
+        if args.check_budgets:
+            sys.exit(check_trace_budgets([input_file], args.budgets, args.stream))
+        cache = make_cache(args, os.path.dirname(input_file) or '.')
+        if not analyze_and_generate_report(input_file, stream=args.stream, cache=cache,
+                                           options=report_options(args)):
+            sys.exit(1)
 
 if __name__ == "__main__":
-    main()
+    main()
\ No newline at end of file
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""Benchmark profile_analyzer.py on synthetic traces.
+
+For each requested trace size a synthetic trace is written with
+profile_synth.py (kept for later runs with --work-dir), then every analyzer stage is
+timed separately: JSON parsing, process_profile_data, each section
+generator in REPORT_SECTIONS, the summary, and assembling and writing the
+HTML page. With --stream the incremental loader is timed as well. Each
+stage reports the best of --repeat runs.
+
+Results are appended as one JSON line per trace size to a results file,
+tagged with ANALYZER_VERSION and the git commit, so a slowdown can be traced
+to the change that introduced it. The summary table shows the previous
+recorded run of the same configuration next to the current one.
+
+Usage:
+    python profile_bench.py [--frames 1000 10000 100000] [--depth 2] [--width 3] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import plotly
+
+from profile_analyzer import (
+    ANALYZER_VERSION, DEFAULT_REPORT_OPTIONS, REPORT_SECTIONS, assemble_html_report, compute_summary,
+    process_profile_data,
+)
+from profile_stream import process_profile_stream
+from profile_synth import DEFAULT_DEPTH, DEFAULT_WIDTH, build_call_tree, generate_trace
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_FRAMES = (1000, 10000)
+DEFAULT_REPEAT = 3
+DEFAULT_RESULTS_FILE = 'profile_bench_results.jsonl'
+_TRACE_CONFIG = ('frames', 'depth', 'width', 'seed')
+
+
+def git_commit():
+    """Short hash of the checked-out commit, with '+' if the tree is dirty, or None"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=here, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no', '--', '.'], cwd=here,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('+' if dirty else '')
+
+
+def max_rss_mb():
+    """Peak resident set size of this process in MB, or None where unsupported"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def synthetic_trace(work_dir, frames, depth, width, seed):
+    """Path of a synthetic trace with these parameters, generating it if needed"""
+    path = os.path.join(work_dir, f'synth_f{frames}_d{depth}_w{width}_s{seed}.json')
+    if not os.path.isfile(path):
+        print(f"Generating {path}...")
+        generate_trace(path, frames, depth, width, seed)
+    return path
+
+
+def _timed(timings, stage, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    timings[stage] = min(timings.get(stage, elapsed), elapsed)
+    return result
+
+
+def bench_trace(path, repeat=DEFAULT_REPEAT, stream=False):
+    """Best-of-`repeat` seconds for each analyzer stage on one trace"""
+    # Time every optional section too
+    options = dict(DEFAULT_REPORT_OPTIONS, overheadCorrection=True)
+    timings = {}
+    output_file = os.path.splitext(path)[0] + '_bench_report.html'
+    for _ in range(repeat):
+        with open(path, 'r') as f:
+            raw = _timed(timings, 'json_load', json.load, f)
+        data = _timed(timings, 'process_profile_data', process_profile_data, raw)
+        del raw
+        data['reportOptions'] = options
+        sections = {}
+        for key, _, generator in REPORT_SECTIONS:
+            html = _timed(timings, f'section:{key}', generator, data)
+            if html is not None:
+                sections[key] = html
+        summary = _timed(timings, 'compute_summary', compute_summary, data)
+
+        def write_report():
+            with open(output_file, 'w', encoding='utf-8') as f:
+                f.write(assemble_html_report(sections, summary, None, options['offline']))
+        _timed(timings, 'write_html', write_report)
+        if stream:
+            _timed(timings, 'stream_load', process_profile_stream, path, options['maxPoints'])
+    os.remove(output_file)
+    timings['total'] = sum(t for stage, t in timings.items() if stage != 'stream_load')
+    return timings
+
+
+def load_results(results_file):
+    if not os.path.isfile(results_file):
+        return []
+    with open(results_file, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def previous_result(results, record):
+    """Most recent earlier result for the same trace configuration, or None"""
+    config = {key: record['trace'][key] for key in _TRACE_CONFIG}
+    for result in reversed(results):
+        if {key: result.get('trace', {}).get(key) for key in _TRACE_CONFIG} == config:
+            return result
+    return None
+
+
+def print_table(record, previous):
+    print(f"\n{record['trace']['frames']} frames x {record['trace']['functions']} functions "
+          f"({record['trace']['sizeMB']:.1f} MB), peak RSS {record['maxRssMB'] or 0:.0f} MB")
+    header = f"  {'stage':<28}{'seconds':>10}"
+    if previous:
+        header += f"{'previous':>10}{'change':>9}  ({previous['analyzerVersion']} @ {previous['commit']})"
+    print(header)
+    for stage, seconds in record['timings'].items():
+        line = f"  {stage:<28}{seconds:>10.3f}"
+        before = previous['timings'].get(stage) if previous else None
+        if before:
+            line += f"{before:>10.3f}{(seconds / before - 1) * 100:>+8.0f}%"
+        print(line)
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description='Time profile_analyzer stages on synthetic traces')
+    p.add_argument('--frames', type=int, nargs='+', default=list(DEFAULT_FRAMES), metavar='N',
+                   help='Trace sizes to benchmark (default: %(default)s)')
+    p.add_argument('--depth', type=int, default=DEFAULT_DEPTH, help='Call tree depth (default: %(default)s)')
+    p.add_argument('--width', type=int, default=DEFAULT_WIDTH,
+                   help='Root systems and children per function (default: %(default)s)')
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, metavar='N',
+                   help='Runs per stage; the fastest is recorded (default: %(default)s)')
+    p.add_argument('--stream', action='store_true', help='Also time the incremental --stream loader')
+    p.add_argument('--work-dir', metavar='DIR',
+                   help='Where synthetic traces are kept between runs (default: a temporary directory)')
+    p.add_argument('--results', default=DEFAULT_RESULTS_FILE, metavar='FILE',
+                   help='JSON lines file the results are appended to (default: %(default)s)')
+    return p.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    temp_dir = None
+    work_dir = args.work_dir
+    if work_dir is None:
+        temp_dir = tempfile.TemporaryDirectory(prefix='profile_bench_')
+        work_dir = temp_dir.name
+    os.makedirs(work_dir, exist_ok=True)
+
+    results = load_results(args.results)
+    environment = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'plotly': plotly.__version__,
+        'platform': platform.platform(),
+    }
+    commit = git_commit()
+    try:
+        for frames in args.frames:
+            path = synthetic_trace(work_dir, frames, args.depth, args.width, args.seed)
+            print(f"Benchmarking {path}...")
+            timings = bench_trace(path, max(1, args.repeat), args.stream)
+            functions = len(build_call_tree(args.depth, args.width)[0])
+            record = {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'analyzerVersion': ANALYZER_VERSION,
+                'commit': commit,
+                'environment': environment,
+                'trace': {'frames': frames, 'depth': args.depth, 'width': args.width, 'seed': args.seed,
+                          'functions': functions, 'sizeMB': os.path.getsize(path) / (1024 * 1024)},
+                'repeat': args.repeat,
+                'timings': timings,
+                'maxRssMB': max_rss_mb(),
+            }
+            previous = previous_result(results, record)
+            with open(args.results, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+            results.append(record)
+            print_table(record, previous)
+    finally:
+        if temp_dir is not None:
+            temp_dir.cleanup()
+    print(f"\nResults appended to {args.results}")
+
+
+if __name__ == '__main__':
+    main()
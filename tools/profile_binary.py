@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""Convert GameProfiler JSON traces to a compact, memory-mappable binary format.
+
+The JSON export repeats every function name in every frame. A `.ptrace` file
+stores the names once and the frame x function data as fixed-width columns,
+so the analyzer can memory-map it and skip JSON parsing entirely.
+
+Layout (all integers little-endian):
+    8 bytes   magic b'PTRACE1\\n'
+    8 bytes   uint64 header length
+    header    UTF-8 JSON: metadata, function and entity counter names,
+              per-function export stats (without timePerFrame), per-call
+              duration histograms and the column table
+    padding   to a 64-byte boundary
+    columns   raw arrays, each starting on a 64-byte boundary; offsets in the
+              column table are relative to the first column
+
+Format versions: 1 is the original layout; 2 adds the `counters` column
+and the `counterNames` and `callHistograms` header keys. Version 1 files
+still load, without counters or call histograms.
+
+Usage:
+    python profile_binary.py trace.json [more.json ...] [-o out.ptrace]
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+from profile_calltree import CallEdges
+from profile_matrix import FrameMatrix, FrameMatrixBuilder
+from profile_memory import MemorySamples, memory_arrays
+from profile_sketch import CallHistogramSet
+from profile_stream import iter_profile_events
+
+MAGIC = b'PTRACE1\n'
+BINARY_TRACE_SUFFIX = '.ptrace'
+# Bump whenever the column layout or the header grows
+FORMAT_VERSION = 2
+_READABLE_VERSIONS = (1, 2)
+_ALIGNMENT = 64
+
+
+def _align(offset):
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def _matrix_columns(matrix, memory_stats):
+    edges = matrix.edges
+    memory_timestamps, memory_used, memory_total = memory_arrays(memory_stats)
+    return {
+        'frame_times': matrix.frame_times.astype('<f8'),
+        'timestamps': matrix.timestamps.astype('<f8'),
+        'time': matrix.time.astype('<f4'),
+        'calls': matrix.calls.astype('<f4'),
+        'edge_frame': edges.frame.astype('<i4'),
+        'edge_parent': edges.parent.astype('<i4'),
+        'edge_child': edges.child.astype('<i4'),
+        'edge_time': edges.time.astype('<f4'),
+        'memory_timestamp': memory_timestamps.astype('<f8'),
+        'memory_used': memory_used.astype('<f8'),
+        'memory_total': memory_total.astype('<f8'),
+        'counters': matrix.counters.astype('<f8'),
+    }
+
+
+def write_binary_trace(path, metadata, matrix, function_stats, memory_stats):
+    """Write a FrameMatrix and its trace metadata to a .ptrace file"""
+    columns = _matrix_columns(matrix, memory_stats)
+    table = {}
+    offset = 0
+    for name, array in columns.items():
+        table[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _align(offset + array.nbytes)
+
+    stats = {
+        name: {key: value for key, value in func_stats.items() if key != 'timePerFrame'}
+        for name, func_stats in function_stats.items()
+    }
+    header = json.dumps({
+        'formatVersion': FORMAT_VERSION,
+        'metadata': metadata,
+        'names': matrix.names,
+        'counterNames': matrix.counter_names,
+        'callHistograms': matrix.call_histograms.to_dict(),
+        'functionStats': stats,
+        'columns': table,
+    }).encode('utf-8')
+
+    data_start = _align(len(MAGIC) + 8 + len(header))
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for name, array in columns.items():
+            f.seek(data_start + table[name]['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(data_start + offset)
+
+
+def _read_header(f):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError('Not a .ptrace file')
+    (header_length,) = struct.unpack('<Q', f.read(8))
+    header = json.loads(f.read(header_length).decode('utf-8'))
+    if header.get('formatVersion') not in _READABLE_VERSIONS:
+        raise ValueError(f"Unsupported .ptrace format version {header.get('formatVersion')}")
+    return header, _align(len(MAGIC) + 8 + header_length)
+
+
+def _column(path, header, data_start, name):
+    spec = header['columns'][name]
+    shape = tuple(spec['shape'])
+    if 0 in shape:
+        return np.zeros(shape, dtype=spec['dtype'])
+    return np.memmap(path, dtype=spec['dtype'], mode='r', offset=data_start + spec['offset'], shape=shape)
+
+
+def load_binary_trace(path):
+    """Memory-map a .ptrace file.
+
+    Returns {'metadata', 'matrix', 'functionStats', 'memoryStats'}; the
+    matrix columns and the memoryStats MemorySamples are read-only memory
+    maps, so opening costs only the header parse and pages are read on
+    first access.
+    """
+    with open(path, 'rb') as f:
+        header, data_start = _read_header(f)
+
+    def column(name):
+        return _column(path, header, data_start, name)
+
+    edges = CallEdges(column('edge_frame'), column('edge_parent'), column('edge_child'), column('edge_time'))
+    # Entity counters were added after the first .ptrace files were written
+    counter_names = header.get('counterNames', [])
+    counters = column('counters') if 'counters' in header['columns'] else None
+    matrix = FrameMatrix(
+        header['names'], column('frame_times'), column('timestamps'),
+        column('time'), column('calls'), edges, counter_names, counters,
+        CallHistogramSet.from_dict(header.get('callHistograms', {}))
+    )
+    memory_stats = MemorySamples(column('memory_timestamp'), column('memory_used'), column('memory_total'))
+    return {
+        'metadata': header['metadata'],
+        'matrix': matrix,
+        'functionStats': header['functionStats'],
+        'memoryStats': memory_stats,
+    }
+
+
+def load_binary_frame_times(path):
+    """Return (metadata, memory-mapped frame times) of a .ptrace file"""
+    with open(path, 'rb') as f:
+        header, data_start = _read_header(f)
+    return header['metadata'], _column(path, header, data_start, 'frame_times')
+
+
+def convert_json_trace(input_file, output_file=None):
+    """Convert a GameProfiler JSON export to .ptrace, streaming the frames"""
+    output_file = output_file or os.path.splitext(input_file)[0] + BINARY_TRACE_SUFFIX
+    metadata = None
+    builder = FrameMatrixBuilder()
+    function_stats = {}
+    memory_stats = []
+    for section, key, value in iter_profile_events(input_file):
+        if section == 'frameData':
+            builder.add_frame(value)
+        elif section == 'functionStats':
+            value.pop('timePerFrame', None)
+            function_stats[key] = value
+        elif section == 'memoryStats':
+            memory_stats.append(value)
+        elif section == 'metadata':
+            metadata = value
+    if metadata is None:
+        raise ValueError('Profile data has no metadata')
+
+    write_binary_trace(output_file, metadata, builder.build(), function_stats, memory_stats)
+    return output_file
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description='Convert GameProfiler JSON traces to .ptrace')
+    p.add_argument('inputs', nargs='+', help='JSON traces exported by GameProfiler')
+    p.add_argument('-o', '--output', help='Output path (only with a single input)')
+    return p.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    if args.output and len(args.inputs) > 1:
+        print('Error: --output can only be used with a single input file.')
+        sys.exit(1)
+
+    failed = 0
+    for input_file in args.inputs:
+        try:
+            output_file = convert_json_trace(input_file, args.output)
+        except Exception as e:
+            print(f'Error converting {input_file}: {e}')
+            failed += 1
+            continue
+        in_size = os.path.getsize(input_file) / (1024 * 1024)
+        out_size = os.path.getsize(output_file) / (1024 * 1024)
+        print(f'{input_file} ({in_size:.1f} MB) -> {output_file} ({out_size:.1f} MB)')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""Check frame time and per-system time against a frame budget.
+
+A budget file is JSON with a frame target and a time budget per system:
+
+    {
+        "frameTargetMs": 16.67,
+        "maxOverrunPercent": 5,
+        "systems": {
+            "particles": {"budgetMs": 2.0, "match": ["particleSystem"]},
+            "rendering": {"budgetMs": 6.0, "match": ["drawFrame"], "maxOverrunPercent": 1},
+            "buildingsUpdate": 1.5
+        }
+    }
+
+A system covers every function whose name starts with one of its `match`
+prefixes (default: the system's own name). Its time in a frame is the
+inclusive time of those functions, minus the time they spend in each
+other, directly or through unmatched functions, so nested matches are not
+counted twice. A frame overruns when
+that time exceeds the budget. A system passes when it overruns in no more
+than `maxOverrunPercent` of the frames. `frameTargetMs` defaults to the
+trace's minFrameTimeMs, and the frame itself is checked the same way.
+"""
+import json
+
+import numpy as np
+
+from profile_calltree import edge_totals
+
+DEFAULT_MAX_OVERRUN_PERCENT = 5.0
+FRAME = 'Frame'
+MAX_NESTING_DEPTH = 64
+
+
+def _positive(value, what):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not value > 0:
+        raise ValueError(f"{what} must be a positive number, got {value!r}")
+    return float(value)
+
+
+def _overrun_limit(value, what):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 100:
+        raise ValueError(f"{what} must be a percentage between 0 and 100, got {value!r}")
+    return float(value)
+
+
+def parse_budgets(config):
+    """Validate a budget config dict and fill in defaults
+
+    Returns {'frameTargetMs' (None means the trace's minFrameTimeMs),
+    'maxOverrunPercent', 'systems'}, with systems as a list of dicts (name,
+    budgetMs, match, maxOverrunPercent) in config order. Raises ValueError on
+    a malformed config.
+    """
+    if not isinstance(config, dict):
+        raise ValueError("budget config must be a JSON object")
+    unknown = set(config) - {'frameTargetMs', 'maxOverrunPercent', 'systems'}
+    if unknown:
+        raise ValueError(f"unknown budget config key(s): {', '.join(sorted(unknown))}")
+    target = config.get('frameTargetMs')
+    max_overrun = _overrun_limit(config.get('maxOverrunPercent', DEFAULT_MAX_OVERRUN_PERCENT), 'maxOverrunPercent')
+    systems = config.get('systems', {})
+    if not isinstance(systems, dict):
+        raise ValueError("'systems' must map system names to budgets")
+
+    parsed = []
+    for name, budget in systems.items():
+        if not isinstance(budget, dict):
+            budget = {'budgetMs': budget}
+        match = budget.get('match', [name])
+        if isinstance(match, str):
+            match = [match]
+        if not match or not all(isinstance(prefix, str) and prefix for prefix in match):
+            raise ValueError(f"system '{name}': 'match' must be a non-empty list of name prefixes")
+        parsed.append({
+            'name': name,
+            'budgetMs': _positive(budget.get('budgetMs'), f"system '{name}' budgetMs"),
+            'match': list(match),
+            'maxOverrunPercent': _overrun_limit(budget.get('maxOverrunPercent', max_overrun),
+                                                f"system '{name}' maxOverrunPercent"),
+        })
+    return {
+        'frameTargetMs': None if target is None else _positive(target, 'frameTargetMs'),
+        'maxOverrunPercent': max_overrun,
+        'systems': parsed,
+    }
+
+
+def load_budgets(path):
+    """Read and validate a budget file (see parse_budgets)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_budgets(json.load(f))
+
+
+def _reachable(columns, edges, function_count):
+    """Columns called, at any depth, from the given ones (included)"""
+    parents, children, _ = edge_totals(edges, function_count)
+    reached = np.zeros(function_count, dtype=bool)
+    reached[columns] = True
+    while True:
+        new = reached[parents] & ~reached[children]
+        if not new.any():
+            return np.flatnonzero(reached)
+        reached[children[new]] = True
+
+
+def system_frame_times(matrix, columns):
+    """Per-frame time of a set of function columns, not counting nested calls twice
+
+    A matched function called from another one, directly or through
+    unmatched functions, is already part of its caller's time. The share of
+    each function's time spent inside the system is passed down its call
+    edges in proportion to their time, so calls from outside the system
+    still count.
+    """
+    times = matrix.time[:, columns].sum(axis=1, dtype=np.float64)
+    edges = matrix.edges
+    if not len(edges):
+        return times
+    # Work on the part of the call graph below the system only
+    reached = _reachable(columns, edges, matrix.function_count)
+    local = np.full(matrix.function_count, -1, dtype=np.int64)
+    local[reached] = np.arange(len(reached))
+    below = local[edges.parent] >= 0
+    frame, parent, child = edges.frame[below], local[edges.parent[below]], local[edges.child[below]]
+    edge_time = edges.time[below].astype(np.float64)
+    time = matrix.time[:, reached].astype(np.float64)
+    selected = np.zeros(len(reached), dtype=bool)
+    selected[local[columns]] = True
+
+    inside = np.where(selected, time, 0.0)
+    for _ in range(MAX_NESTING_DEPTH):
+        share = np.divide(inside, time, out=np.zeros_like(inside), where=time > 0)
+        nested = np.zeros_like(inside)
+        np.add.at(nested, (frame, child), edge_time * share[frame, parent])
+        updated = np.where(selected, time, np.minimum(nested, time))
+        if np.array_equal(updated, inside):
+            break
+        inside = updated
+    times -= nested[:, selected].sum(axis=1)
+    return np.maximum(times, 0.0)
+
+
+def _overrun_stats(times, budget, max_overrun_percent):
+    over = times > budget
+    excess = times[over] - budget
+    overrun_percent = float(np.mean(over) * 100) if len(times) else 0.0
+    return {
+        'budgetMs': budget,
+        'meanMs': float(times.mean()) if len(times) else 0.0,
+        'p95Ms': float(np.percentile(times, 95)) if len(times) else 0.0,
+        'maxMs': float(times.max()) if len(times) else 0.0,
+        'overrunFrames': int(over.sum()),
+        'overrunPercent': overrun_percent,
+        'meanOverrunMs': float(excess.mean()) if len(excess) else 0.0,
+        'worstOverrunMs': float(excess.max()) if len(excess) else 0.0,
+        'maxOverrunPercent': max_overrun_percent,
+        'pass': overrun_percent <= max_overrun_percent,
+    }
+
+
+def check_budgets(matrix, budgets, default_target_ms):
+    """Overrun frequency and severity of the frame and every budgeted system
+
+    `budgets` comes from parse_budgets. Returns {'pass', 'frame', 'systems'}:
+    frame and each system are dicts (budgetMs, meanMs, p95Ms, maxMs,
+    overrunFrames, overrunPercent, meanOverrunMs, worstOverrunMs,
+    maxOverrunPercent, pass). Overrun ms are averaged over the overrunning
+    frames only. Systems also carry name, match and `functions`, the names
+    their prefixes matched. A system matching no function never overruns.
+    """
+    target = budgets['frameTargetMs'] or default_target_ms
+    frame = _overrun_stats(np.asarray(matrix.frame_times, dtype=np.float64), target,
+                           budgets['maxOverrunPercent'])
+    frame['name'] = FRAME
+    systems = []
+    for system in budgets['systems']:
+        prefixes = tuple(system['match'])
+        columns = [i for i, name in enumerate(matrix.names) if name.startswith(prefixes)]
+        times = system_frame_times(matrix, columns) if columns else np.zeros(matrix.frame_count)
+        stats = _overrun_stats(times, system['budgetMs'], system['maxOverrunPercent'])
+        stats.update(name=system['name'], match=system['match'], functions=[matrix.names[i] for i in columns])
+        systems.append(stats)
+    return {
+        'pass': frame['pass'] and all(system['pass'] for system in systems),
+        'frame': frame,
+        'systems': systems,
+    }
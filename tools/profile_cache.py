@@ -0,0 +1,121 @@
+"""On-disk cache of analyzed trace reports, keyed by trace content.
+
+Each entry is one JSON file holding the summary stats and the rendered HTML
+sections of a report. Keys combine the SHA-256 of the trace file with the
+analyzer version and a fingerprint of the analyzer sources, so editing the
+analyzer invalidates old entries without anyone having to bump a number.
+Entries are evicted least-recently-used first once the cache exceeds its
+size limit.
+"""
+import glob
+import hashlib
+import json
+import os
+import tempfile
+
+DEFAULT_CACHE_DIRNAME = '.profile_cache'
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+REPORT_KEY_MARKER = '<meta name="profile-cache-key" content="{}">'
+
+_HASH_CHUNK_SIZE = 1 << 20
+_REPORT_HEAD_SIZE = 4096
+
+
+def file_digest(path):
+    """SHA-256 hex digest of a file, read in chunks"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def source_fingerprint():
+    """Short digest of the analyzer modules (profile_*.py next to this file)"""
+    h = hashlib.sha256()
+    tools_dir = os.path.dirname(os.path.abspath(__file__))
+    for path in sorted(glob.glob(os.path.join(tools_dir, 'profile_*.py'))):
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+def report_is_current(report_path, key):
+    """True if report_path exists and was rendered from the entry `key`"""
+    try:
+        with open(report_path, 'r', encoding='utf-8') as f:
+            head = f.read(_REPORT_HEAD_SIZE)
+    except OSError:
+        return False
+    return REPORT_KEY_MARKER.format(key) in head
+
+
+class ReportCache:
+    """Directory of cached report entries with a total size limit"""
+
+    def __init__(self, cache_dir, version, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.version = f'{version}:{source_fingerprint()}'
+        self.max_bytes = max_bytes
+
+    def key_for(self, trace_path, options=''):
+        """Cache key for a trace file analyzed with the given option string"""
+        h = hashlib.sha256()
+        h.update(self.version.encode('utf-8'))
+        h.update(options.encode('utf-8'))
+        h.update(file_digest(trace_path).encode('ascii'))
+        return h.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + '.json')
+
+    def get(self, key):
+        """Return the cached entry for key, or None on a miss"""
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('version') != self.version:
+            return None
+        try:
+            os.utime(path)  # mark as recently used for eviction
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key, entry):
+        """Store an entry atomically, then evict old entries over the size limit"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = dict(entry, version=self.version)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._entry_path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Delete least-recently-used entries until the cache fits max_bytes"""
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, '*.json')):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # removed by a concurrent worker
+            entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
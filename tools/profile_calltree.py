@@ -0,0 +1,128 @@
+"""Per-frame call graph reconstruction and exclusive (self) time.
+
+GameProfiler aggregates each function per frame by name, recording its
+inclusive time plus the names of its children and parents. Newer exports
+also record `childTimes`, the time each child spent under that specific
+parent, which makes exclusive time exact even when a child has several
+parents. For older exports a multi-parent child's time is split evenly
+between the parents seen in that frame.
+"""
+import numpy as np
+
+
+def frame_call_edges(functions):
+    """Yield (parent, child, time) call edges for one frame's `functions` dict.
+
+    Self-recursive edges are skipped, as are edges to functions that were
+    dropped from the export (below `minFunctionTimeMs`).
+    """
+    if any('childTimes' in func_data for func_data in functions.values()):
+        for parent, func_data in functions.items():
+            for child, time in func_data.get('childTimes', {}).items():
+                if child != parent and child in functions:
+                    yield parent, child, time
+        return
+
+    for child, func_data in functions.items():
+        parents = [p for p in func_data['parents'] if p != child and p in functions]
+        if parents:
+            share = func_data['totalTime'] / len(parents)
+            for parent in parents:
+                yield parent, child, share
+
+
+class CallEdges:
+    """Call edges of every frame as parallel columns (COO layout).
+
+    Attributes:
+        frame: int32 frame index of each edge
+        parent: int32 column of the calling function
+        child: int32 column of the called function
+        time: float32 ms spent in child under parent in that frame
+    """
+
+    def __init__(self, frame, parent, child, time):
+        self.frame = frame
+        self.parent = parent
+        self.child = child
+        self.time = time
+
+    @classmethod
+    def from_lists(cls, frame, parent, child, time):
+        return cls(
+            np.asarray(frame, dtype=np.int32),
+            np.asarray(parent, dtype=np.int32),
+            np.asarray(child, dtype=np.int32),
+            np.asarray(time, dtype=np.float32),
+        )
+
+    def __len__(self):
+        return len(self.time)
+
+
+def exclusive_time(time, edges):
+    """Per-frame exclusive time: inclusive time minus time spent in callees"""
+    exclusive = time.copy()
+    np.subtract.at(exclusive, (edges.frame, edges.parent), edges.time)
+    # Export rounding can push tiny self times slightly negative
+    np.maximum(exclusive, 0, out=exclusive)
+    return exclusive
+
+
+def root_time(time, edges):
+    """Total inclusive time per function over the frames where it had no caller"""
+    has_caller = np.zeros(time.shape, dtype=bool)
+    has_caller[edges.frame, edges.child] = True
+    return np.where(has_caller, 0, time).sum(axis=0, dtype=np.float64)
+
+
+def edge_totals(edges, function_count):
+    """Aggregate edges over frames: returns (parent, child, total time) arrays"""
+    if not len(edges):
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0, dtype=np.float64)
+    keys = edges.parent.astype(np.int64) * function_count + edges.child
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    totals = np.bincount(inverse, weights=edges.time, minlength=len(unique_keys))
+    return unique_keys // function_count, unique_keys % function_count, totals
+
+
+class CallTreeTotals:
+    """Streaming counterpart of the matrix computations above.
+
+    Accumulates exclusive, root and per-edge totals one frame at a time, so
+    memory depends on the number of distinct functions and edges only.
+    """
+
+    def __init__(self):
+        self.self_time = {}
+        self.root_time = {}
+        self.edge_time = {}
+
+    def add_frame(self, functions):
+        callee_time = {}
+        called = set()
+        for parent, child, time in frame_call_edges(functions):
+            callee_time[parent] = callee_time.get(parent, 0.0) + time
+            called.add(child)
+            self.edge_time[(parent, child)] = self.edge_time.get((parent, child), 0.0) + time
+        for name, func_data in functions.items():
+            self_time = max(func_data['totalTime'] - callee_time.get(name, 0.0), 0.0)
+            self.self_time[name] = self.self_time.get(name, 0.0) + self_time
+            if name not in called:
+                self.root_time[name] = self.root_time.get(name, 0.0) + func_data['totalTime']
+
+
+def call_tree_totals(matrix):
+    """Compute CallTreeTotals-shaped dicts from a FrameMatrix in bulk"""
+    totals = CallTreeTotals()
+    names = matrix.names
+    self_time = matrix.exclusive().sum(axis=0, dtype=np.float64)
+    roots = root_time(matrix.time, matrix.edges)
+    totals.self_time = {name: float(t) for name, t in zip(names, self_time)}
+    totals.root_time = {name: float(t) for name, t in zip(names, roots) if t > 0}
+    parents, children, edge_time = edge_totals(matrix.edges, matrix.function_count)
+    totals.edge_time = {
+        (names[p], names[c]): float(t) for p, c, t in zip(parents, children, edge_time)
+    }
+    return totals
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""Live collector for GameProfiler sessions.
+
+GameProfiler only keeps its last `maxFramesToStore` frames and exports them
+as a browser download. With `enableCollector(url)` (or the game's
+`?profileCollector=http://127.0.0.1:5001` URL parameter) it instead posts
+batches of frames here while the game runs. The collector keeps rolling
+statistics for the console and GET /api/profile/stats, and writes frames to
+disk in chunks as they arrive, so memory stays flat however long the
+session runs. When recording stops the chunks are joined into a regular
+GameProfiler export in the output directory, ready for profile_analyzer.py.
+
+Several batches can be in flight at once, so they may arrive out of order.
+Each carries its sequence number, and batches that arrive early are held
+back until the ones before them arrive. A gap is given up on (the
+client dropped that batch) once MAX_REORDER_BATCHES later batches are
+waiting, or when the session ends. Finished sessions are forgotten, and
+sessions idle for longer than the session timeout are written out as
+they are.
+
+Endpoints:
+    POST /api/profile/session            {session, metadata}
+    POST /api/profile/frames             {session, batch, frames}
+    POST /api/profile/session/<id>/end   {metadata}
+    GET  /api/profile/stats[/<id>]
+
+Usage:
+    python profile_collector.py [--port 5001] [--output-dir traces]
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from array import array
+from collections import deque
+
+import numpy as np
+from flask import Flask, jsonify, request
+from flask_cors import CORS
+
+from profile_sketch import LogHistogram
+
+DEFAULT_CHUNK_FRAMES = 1000
+DEFAULT_WINDOW = 600
+DEFAULT_OUTPUT_DIR = 'traces'
+# GameProfiler's default minFrameTimeMs, used until the session's config arrives
+DEFAULT_SLOW_FRAME_MS = 10.67
+# Out-of-order batches held back before a missing earlier batch is given up on
+MAX_REORDER_BATCHES = 32
+DEFAULT_SESSION_TIMEOUT_S = 30 * 60
+# Ended session ids remembered, so late batches are refused instead of opening a new session
+_ENDED_SESSIONS_KEPT = 256
+
+app = Flask(__name__)
+CORS(app)
+app.config.update(
+    OUTPUT_DIR=DEFAULT_OUTPUT_DIR,
+    CHUNK_FRAMES=DEFAULT_CHUNK_FRAMES,
+    WINDOW=DEFAULT_WINDOW,
+    KEEP_CHUNKS=False,
+    SESSION_TIMEOUT=DEFAULT_SESSION_TIMEOUT_S,
+)
+
+_sessions = {}
+_ended_sessions = deque(maxlen=_ENDED_SESSIONS_KEPT)
+_sessions_lock = threading.Lock()
+
+
+class LiveSession:
+    """Rolling statistics and chunked on-disk storage for one recording"""
+
+    def __init__(self, session_id, output_dir, chunk_frames=DEFAULT_CHUNK_FRAMES, window=DEFAULT_WINDOW):
+        self.session_id = session_id
+        self.output_dir = output_dir
+        self.chunk_dir = os.path.join(output_dir, f'live_{session_id}')
+        self.chunk_frames = chunk_frames
+        self.lock = threading.Lock()
+        self.metadata = {}
+        self.pending = []
+        self.chunks = []
+        self.frame_count = 0
+        self.total_time = 0.0
+        self.slow_frames = 0
+        self.frame_times = LogHistogram()
+        self.recent_times = deque(maxlen=window)
+        self.recent_functions = deque(maxlen=window)
+        self.function_stats = {}
+        self.memory = array('d')
+        self.trace_file = None
+        self.next_batch = 0
+        self.waiting = {}
+        self.skipped_batches = 0
+        self.late_batches = 0
+        self.last_seen = time.monotonic()
+
+    @property
+    def threshold(self):
+        return self.metadata.get('config', {}).get('minFrameTimeMs', DEFAULT_SLOW_FRAME_MS)
+
+    def start(self, metadata):
+        with self.lock:
+            self.metadata.update(metadata or {})
+
+    def add_frames(self, frames, batch=None):
+        """Add a batch of frames in sequence order
+
+        Batch `batch` (numbered from 0) is held back until every earlier
+        batch has arrived or been given up on; without a number the frames
+        are appended as they come.
+        """
+        with self.lock:
+            if self.trace_file is not None:
+                raise ValueError(f'Session {self.session_id} has already ended')
+            self.last_seen = time.monotonic()
+            # Reject malformed frames now rather than when their batch is drained
+            if not all(isinstance(frame, dict) and 'totalTime' in frame and isinstance(frame.get('functions'), dict)
+                       for frame in frames):
+                raise ValueError('Malformed frame in batch')
+            if batch is None:
+                self._append(frames)
+                return
+            if batch < self.next_batch or batch in self.waiting:
+                # Arrived after its gap was given up on, or sent twice
+                self.late_batches += 1
+                return
+            self.waiting[batch] = frames
+            self._drain(force=len(self.waiting) > MAX_REORDER_BATCHES)
+
+    def _drain(self, force=False):
+        """Append waiting batches that are next in sequence; with `force`, skip gaps"""
+        while self.waiting:
+            if self.next_batch not in self.waiting:
+                if not force:
+                    return
+                first = min(self.waiting)
+                self.skipped_batches += first - self.next_batch
+                self.next_batch = first
+            self._append(self.waiting.pop(self.next_batch))
+            self.next_batch += 1
+            force = force and len(self.waiting) > MAX_REORDER_BATCHES
+
+    def _append(self, frames):
+        """Fold frames into the statistics and the pending chunk; caller holds the lock"""
+        threshold = self.threshold
+        times = np.array([frame['totalTime'] for frame in frames], dtype=np.float64)
+        self.frame_times.add(times)
+        self.frame_count += len(frames)
+        self.total_time += float(times.sum())
+        self.slow_frames += int(np.count_nonzero(times > threshold))
+        self.recent_times.extend(times.tolist())
+        for frame in frames:
+            functions = frame['functions']
+            self.recent_functions.append({name: data['totalTime'] for name, data in functions.items()})
+            for name, data in functions.items():
+                stats = self.function_stats.setdefault(
+                    name, {'totalTime': 0.0, 'calls': 0, 'children': set(), 'parents': set()}
+                )
+                stats['totalTime'] += data['totalTime']
+                stats['calls'] += data['calls']
+                stats['children'].update(data.get('children', ()))
+                stats['parents'].update(data.get('parents', ()))
+            memory = frame.get('memory')
+            if memory and memory.get('usedJSHeapSize') is not None:
+                self.memory.extend((frame['timestamp'], memory['usedJSHeapSize'], memory['totalJSHeapSize']))
+        self.pending.extend(frames)
+        while len(self.pending) >= self.chunk_frames:
+            self._write_chunk(self.pending[:self.chunk_frames])
+            self.pending = self.pending[self.chunk_frames:]
+
+    def _write_chunk(self, frames):
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        path = os.path.join(self.chunk_dir, f'chunk_{len(self.chunks):05d}.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            for frame in frames:
+                f.write(json.dumps(frame, separators=(',', ':')))
+                f.write('\n')
+        self.chunks.append(path)
+        print(self.status_line())
+
+    def stats(self):
+        """Session-wide and rolling-window statistics as a JSON-ready dict"""
+        with self.lock:
+            recent = np.array(self.recent_times, dtype=np.float64)
+            function_totals = {}
+            for functions in self.recent_functions:
+                for name, t in functions.items():
+                    function_totals[name] = function_totals.get(name, 0.0) + t
+            window = max(len(self.recent_functions), 1)
+            top = sorted(function_totals.items(), key=lambda item: item[1], reverse=True)[:5]
+            p50, p95, p99 = self.frame_times.quantiles([50, 95, 99])
+            return {
+                'session': self.session_id,
+                'frames': self.frame_count,
+                'chunksWritten': len(self.chunks),
+                'waitingBatches': len(self.waiting),
+                'skippedBatches': self.skipped_batches,
+                'lateBatches': self.late_batches,
+                'ended': self.trace_file is not None,
+                'trace': self.trace_file,
+                'overall': {
+                    'averageFrameTime': self.total_time / self.frame_count if self.frame_count else None,
+                    'slowFrames': self.slow_frames,
+                    'p50': _finite(p50), 'p95': _finite(p95), 'p99': _finite(p99),
+                },
+                'rolling': {
+                    'frames': len(recent),
+                    'averageFrameTime': float(recent.mean()) if len(recent) else None,
+                    'p95': float(np.percentile(recent, 95)) if len(recent) else None,
+                    'slowFramePercent': float(np.mean(recent > self.threshold) * 100) if len(recent) else None,
+                    'topFunctions': [{'name': name, 'timePerFrame': t / window} for name, t in top],
+                },
+            }
+
+    def status_line(self):
+        recent = np.array(self.recent_times, dtype=np.float64)
+        if not len(recent):
+            return f'[{self.session_id}] no frames yet'
+        return (
+            f'[{self.session_id}] {self.frame_count} frames | last {len(recent)}: '
+            f'avg {recent.mean():.2f}ms, p95 {np.percentile(recent, 95):.2f}ms, '
+            f'slow {np.mean(recent > self.threshold) * 100:.1f}%'
+        )
+
+    def finish(self, metadata, keep_chunks=False):
+        """Join the chunks into a GameProfiler export and return its path"""
+        with self.lock:
+            if self.trace_file is not None:
+                return self.trace_file
+            # Batches still missing at the end were dropped by the client
+            self._drain(force=True)
+            if self.pending:
+                self._write_chunk(self.pending)
+                self.pending = []
+            self.metadata.update(metadata or {})
+            frame_count = self.frame_count
+            trace_metadata = dict(
+                self.metadata,
+                totalFrames=frame_count,
+                averageFrameTime=self.total_time / frame_count if frame_count else 0.0,
+                skippedBatches=self.skipped_batches,
+                lateBatches=self.late_batches,
+            )
+            trace_metadata.setdefault('config', {})
+            function_stats = {
+                name: {
+                    'totalTime': stats['totalTime'],
+                    'calls': stats['calls'],
+                    'averageTimePerFrame': stats['totalTime'] / frame_count if frame_count else 0.0,
+                    'children': sorted(stats['children']),
+                    'parents': sorted(stats['parents']),
+                }
+                for name, stats in self.function_stats.items()
+            }
+            memory = np.frombuffer(self.memory, dtype=np.float64).reshape(-1, 3)
+
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, f'profile_live_{self.session_id}.json')
+            with open(path, 'w', encoding='utf-8') as out:
+                out.write(f'{{"metadata": {json.dumps(trace_metadata)},\n"frameData": [\n')
+                first = True
+                for chunk in self.chunks:
+                    with open(chunk, 'r', encoding='utf-8') as f:
+                        for line in f:
+                            if not first:
+                                out.write(',\n')
+                            out.write(line.rstrip('\n'))
+                            first = False
+                out.write(f'\n],\n"functionStats": {json.dumps(function_stats)},\n"memoryStats": [\n')
+                out.write(',\n'.join(
+                    json.dumps({'timestamp': t, 'used': used, 'total': total}) for t, used, total in memory.tolist()
+                ))
+                out.write('\n]}\n')
+            if not keep_chunks:
+                shutil.rmtree(self.chunk_dir, ignore_errors=True)
+            self.trace_file = path
+            return path
+
+
+def _finite(value):
+    return float(value) if np.isfinite(value) else None
+
+
+def _session_id(value):
+    if not isinstance(value, str) or not re.fullmatch(r'[A-Za-z0-9_-]{1,64}', value):
+        raise ValueError('Invalid session id')
+    return value
+
+
+def get_session(session_id, create=False):
+    with _sessions_lock:
+        session = _sessions.get(session_id)
+        if session is None and create:
+            if session_id in _ended_sessions:
+                raise ValueError(f'Session {session_id} has already ended')
+            # Frames may arrive before the start request has been handled
+            session = _sessions[session_id] = LiveSession(
+                session_id, app.config['OUTPUT_DIR'], app.config['CHUNK_FRAMES'], app.config['WINDOW']
+            )
+        return session
+
+
+def _forget_session(session_id):
+    with _sessions_lock:
+        _sessions.pop(session_id, None)
+        _ended_sessions.append(session_id)
+
+
+def expire_idle_sessions(timeout=None):
+    """Write out and forget sessions that have received nothing for `timeout` seconds"""
+    timeout = app.config['SESSION_TIMEOUT'] if timeout is None else timeout
+    now = time.monotonic()
+    with _sessions_lock:
+        idle = [session for session in _sessions.values() if now - session.last_seen > timeout]
+    for session in idle:
+        _forget_session(session.session_id)
+        try:
+            path = session.finish({}, app.config['KEEP_CHUNKS'])
+        except Exception as e:
+            print(f'[{session.session_id}] idle session could not be written: {e}')
+            continue
+        print(f'[{session.session_id}] idle for {timeout:.0f}s, trace written: {path}')
+
+
+@app.route('/api/profile/session', methods=['POST'])
+def start_session():
+    data = request.get_json(force=True) or {}
+    expire_idle_sessions()
+    try:
+        session = get_session(_session_id(data.get('session')), create=True)
+    except ValueError as e:
+        return jsonify({'ok': False, 'error': str(e)}), 400
+    session.start(data.get('metadata'))
+    print(f'[{session.session_id}] recording started')
+    return jsonify({'ok': True, 'session': session.session_id})
+
+
+@app.route('/api/profile/frames', methods=['POST'])
+def add_frames():
+    data = request.get_json(force=True) or {}
+    frames = data.get('frames')
+    if not isinstance(frames, list):
+        return jsonify({'ok': False, 'error': 'Missing frames'}), 400
+    batch = data.get('batch')
+    if batch is not None and (not isinstance(batch, int) or isinstance(batch, bool) or batch < 0):
+        return jsonify({'ok': False, 'error': 'Invalid batch number'}), 400
+    expire_idle_sessions()
+    try:
+        session = get_session(_session_id(data.get('session')), create=True)
+        session.add_frames(frames, batch)
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({'ok': False, 'error': str(e)}), 400
+    return jsonify({'ok': True, 'frames': session.frame_count})
+
+
+@app.route('/api/profile/session/<session_id>/end', methods=['POST'])
+def end_session(session_id):
+    session = get_session(session_id)
+    if session is None:
+        return jsonify({'ok': False, 'error': f'Unknown session {session_id}'}), 404
+    data = request.get_json(force=True, silent=True) or {}
+    try:
+        path = session.finish(data.get('metadata'), app.config['KEEP_CHUNKS'])
+    except Exception as e:
+        return jsonify({'ok': False, 'error': str(e)}), 500
+    finally:
+        _forget_session(session_id)
+    print(session.status_line())
+    print(f'[{session_id}] trace written: {path}')
+    return jsonify({'ok': True, 'trace': path})
+
+
+@app.route('/api/profile/stats')
+def all_stats():
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+    return jsonify({'sessions': [session.stats() for session in sessions]})
+
+
+@app.route('/api/profile/stats/<session_id>')
+def session_stats(session_id):
+    session = get_session(session_id)
+    if session is None:
+        return jsonify({'ok': False, 'error': f'Unknown session {session_id}'}), 404
+    return jsonify(session.stats())
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description='Collect GameProfiler frames from the running game')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=5001)
+    p.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR,
+                   help='Directory for finished traces (default: %(default)s)')
+    p.add_argument('--chunk-frames', type=int, default=DEFAULT_CHUNK_FRAMES, metavar='N',
+                   help='Frames per on-disk chunk (default: %(default)s)')
+    p.add_argument('--window', type=int, default=DEFAULT_WINDOW, metavar='N',
+                   help='Frames in the rolling statistics window (default: %(default)s)')
+    p.add_argument('--session-timeout', type=float, default=DEFAULT_SESSION_TIMEOUT_S, metavar='SECONDS',
+                   help='Write out sessions that receive nothing for this long (default: %(default)s)')
+    p.add_argument('--keep-chunks', action='store_true',
+                   help='Keep the chunk files after a session has been written out')
+    return p.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    app.config.update(
+        OUTPUT_DIR=args.output_dir,
+        CHUNK_FRAMES=max(1, args.chunk_frames),
+        WINDOW=max(1, args.window),
+        KEEP_CHUNKS=args.keep_chunks,
+        SESSION_TIMEOUT=args.session_timeout,
+    )
+    print(f'Collecting profiles at http://{args.host}:{args.port} into {os.path.abspath(args.output_dir)}')
+    app.run(host=args.host, port=args.port, threaded=True, use_reloader=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Baseline-vs-candidate comparison of two GameProfiler traces.
+
+Frame times and every function's per-frame inclusive time are compared as
+independent samples: a Mann-Whitney U test decides whether the candidate
+distribution is shifted, and a bootstrap CI bounds the change in the mean.
+A difference counts as a regression only when it is both large enough to
+matter (relative threshold and absolute floor) and statistically
+significant, with Holm correction across the functions tested.
+"""
+import numpy as np
+
+from profile_stats import bootstrap_mean_diff_ci, holm_reject, mann_whitney_u
+
+DEFAULT_THRESHOLD_PCT = 5.0
+DEFAULT_ALPHA = 0.05
+DEFAULT_MIN_DELTA_MS = 0.05
+DEFAULT_BOOTSTRAP = 1000
+
+COMPARE_PERCENTILES = (50, 95, 99)
+
+
+def _series_summary(values):
+    summary = {'mean': float(values.mean()) if len(values) else 0.0}
+    if len(values):
+        points = np.percentile(values, COMPARE_PERCENTILES)
+    else:
+        points = np.zeros(len(COMPARE_PERCENTILES))
+    for q, value in zip(COMPARE_PERCENTILES, points):
+        summary[f'p{q}'] = float(value)
+    return summary
+
+
+def _relative_change(base, delta):
+    if base > 0:
+        return delta / base * 100
+    return float('inf') if delta > 0 else 0.0
+
+
+def _exceeds_threshold(base_mean, delta, threshold_pct, min_delta_ms):
+    return delta >= min_delta_ms and delta > base_mean * threshold_pct / 100
+
+
+def compare_matrices(base, cand, threshold_pct=DEFAULT_THRESHOLD_PCT, alpha=DEFAULT_ALPHA,
+                     min_delta_ms=DEFAULT_MIN_DELTA_MS, n_boot=DEFAULT_BOOTSTRAP):
+    """Compare two FrameMatrix objects.
+
+    Returns a dict with a 'frame' row, per-function 'functions' rows sorted by
+    mean delta (largest slowdown first) and the list of 'regressions'.
+    Functions present in only one trace are compared against zeros.
+    """
+    if not base.frame_count or not cand.frame_count:
+        raise ValueError('Cannot compare a trace without frames')
+
+    frame_delta = float(cand.frame_times.mean() - base.frame_times.mean())
+    _, frame_p = mann_whitney_u(base.frame_times, cand.frame_times)
+    frame_ci = bootstrap_mean_diff_ci(base.frame_times, cand.frame_times, n_boot=n_boot)
+    frame_row = {
+        'name': 'Frame time',
+        'base': _series_summary(base.frame_times),
+        'cand': _series_summary(cand.frame_times),
+        'delta': frame_delta,
+        'relative': _relative_change(float(base.frame_times.mean()), frame_delta),
+        'p': frame_p,
+        'ci': frame_ci,
+    }
+    frame_row['regression'] = bool(
+        _exceeds_threshold(frame_row['base']['mean'], frame_delta, threshold_pct, min_delta_ms)
+        and frame_p < alpha and frame_ci[0] > 0
+    )
+
+    names = list(dict.fromkeys(base.names + cand.names))
+    base_means = _mean_per_frame(base, names)
+    cand_means = _mean_per_frame(cand, names)
+    deltas = cand_means - base_means
+
+    rows = []
+    for name, base_mean, cand_mean, delta in zip(names, base_means, cand_means, deltas):
+        rows.append({
+            'name': name,
+            'base': {'mean': float(base_mean)},
+            'cand': {'mean': float(cand_mean)},
+            'delta': float(delta),
+            'relative': _relative_change(float(base_mean), float(delta)),
+            'p': None,
+            'ci': None,
+            'regression': False,
+        })
+
+    # Only functions whose point estimate already crosses the threshold can be
+    # flagged, so the (sorting-heavy) tests are limited to those
+    tested = [
+        row for row in rows
+        if _exceeds_threshold(row['base']['mean'], row['delta'], threshold_pct, min_delta_ms)
+    ]
+    for row in tested:
+        x = _column_or_zeros(base, row['name'])
+        y = _column_or_zeros(cand, row['name'])
+        _, row['p'] = mann_whitney_u(x, y)
+        row['ci'] = bootstrap_mean_diff_ci(x, y, n_boot=n_boot)
+        row['base'] = _series_summary(x)
+        row['cand'] = _series_summary(y)
+    if tested:
+        rejected = holm_reject([row['p'] for row in tested], alpha)
+        for row, reject in zip(tested, rejected):
+            row['regression'] = bool(reject and row['ci'][0] > 0)
+
+    rows.sort(key=lambda row: row['delta'], reverse=True)
+    regressions = [row['name'] for row in rows if row['regression']]
+    if frame_row['regression']:
+        regressions.insert(0, frame_row['name'])
+
+    return {
+        'frame': frame_row,
+        'functions': rows,
+        'regressions': regressions,
+        'settings': {
+            'thresholdPct': threshold_pct,
+            'alpha': alpha,
+            'minDeltaMs': min_delta_ms,
+            'bootstrap': n_boot,
+        },
+    }
+
+
+def _mean_per_frame(matrix, names):
+    totals = matrix.totals()
+    return np.array([
+        totals[matrix.index[name]] / matrix.frame_count if name in matrix.index else 0.0
+        for name in names
+    ])
+
+
+def _column_or_zeros(matrix, name):
+    if name in matrix.index:
+        return matrix.column(name).astype(np.float64)
+    return np.zeros(matrix.frame_count, dtype=np.float64)
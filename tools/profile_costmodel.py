@@ -0,0 +1,118 @@
+"""Fit how frame and function cost scales with the number of live entities.
+
+When GameProfiler has a counter source (FireworkGame registers particle
+counts per shape, crowd size and drone count), every frame carries a
+`counters` dict. Each function's per-frame time is regressed on all
+counters at once, in a single least-squares solve with one right-hand side
+per function:
+
+    time = b0 + sum_k b_k * count_k                    (linear model)
+    time = a0 + sum_k (a_k * s_k + q_k * s_k^2)         (quadratic model)
+
+where s_k is count_k scaled to [0, 1]. The linear slope b_k is the marginal
+cost of one more entity. A significantly positive quadratic term that
+carries a real share of the cost at high load marks superlinear scaling,
+such as O(n^2) crowd interaction. `exponent` is the elasticity of the
+load-driven cost at the counter's p95 value: 1 for linear scaling, 2 for
+purely quadratic scaling.
+"""
+import numpy as np
+
+DEFAULT_TOP_FUNCTIONS = 15
+MIN_FRAMES = 30
+# |t| a linear slope needs before it is reported
+MIN_T_STAT = 3.0
+# A quadratic term must be this significant, and carry this share of the
+# load-driven cost at p95 load, for the scaling to count as superlinear
+SUPERLINEAR_T_STAT = 4.0
+SUPERLINEAR_SHARE = 0.2
+FRAME = 'Frame'
+
+
+def _least_squares(design, targets):
+    """Coefficients, their standard errors and R^2 for every target column"""
+    coef, _, rank, _ = np.linalg.lstsq(design, targets, rcond=None)
+    residuals = targets - design @ coef
+    ss_res = (residuals ** 2).sum(axis=0)
+    ss_tot = ((targets - targets.mean(axis=0)) ** 2).sum(axis=0)
+    dof = max(len(design) - rank, 1)
+    unscaled = np.diag(np.linalg.pinv(design.T @ design))
+    stderr = np.sqrt(np.outer(unscaled, ss_res / dof))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = np.where(ss_tot > 0, 1 - ss_res / ss_tot, 0.0)
+    return coef, stderr, r2
+
+
+def _t_stats(coef, stderr):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = coef / stderr
+    return np.where(stderr > 0, t, np.where(coef != 0, np.inf * np.sign(coef), 0.0))
+
+
+def entity_cost_models(matrix, top_n=DEFAULT_TOP_FUNCTIONS):
+    """Regress frame time and the top functions' times on the entity counters.
+
+    Returns None when the trace has no usable counters, else {'frames',
+    'counters', 'rows'}: counters are dicts (name, mean, p95, max) and rows
+    are dicts (name, counter, msPerEntity, tStat, loadCost, exponent,
+    superlinear, r2), one per function and counter with a significant
+    slope or superlinear term, sorted by `loadCost`, the cost the counter
+    explains at its p95 value.
+    """
+    if not matrix.counter_names:
+        return None
+    sampled = ~np.isnan(matrix.counters).any(axis=1)
+    counts = np.asarray(matrix.counters[sampled], dtype=np.float64)
+    varying = counts.max(axis=0, initial=0) > counts.min(axis=0, initial=0)
+    counter_names = [name for name, keep in zip(matrix.counter_names, varying) if keep]
+    counts = counts[:, varying]
+    n, k = counts.shape
+    if k == 0 or n < max(MIN_FRAMES, 2 * k + 2):
+        return None
+
+    top = matrix.top(top_n)
+    names = [FRAME] + [matrix.names[i] for i in top]
+    targets = np.column_stack([matrix.frame_times[sampled], matrix.time[sampled][:, top]]).astype(np.float64)
+
+    # Both models are fit on counts scaled to [0, 1] to keep the solve well conditioned
+    scale = counts.max(axis=0)
+    scaled = counts / scale
+    ones = np.ones((n, 1))
+    linear, linear_err, r2 = _least_squares(np.hstack([ones, scaled]), targets)
+    linear_t = _t_stats(linear, linear_err)[1:]
+    linear = linear[1:] / scale[:, None]
+
+    quadratic, quadratic_err, _ = _least_squares(np.hstack([ones, scaled, scaled ** 2]), targets)
+    slope = quadratic[1:k + 1]
+    curve = quadratic[k + 1:]
+    curve_t = _t_stats(curve, quadratic_err[k + 1:])
+
+    p95 = np.percentile(counts, 95, axis=0)
+    s95 = (p95 / scale)[:, None]
+    load_cost = slope * s95 + curve * s95 ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = np.where(load_cost > 0, curve * s95 ** 2 / load_cost, 0.0)
+        exponent = np.where(load_cost > 0, (slope * s95 + 2 * curve * s95 ** 2) / load_cost, np.nan)
+    superlinear = (curve > 0) & (curve_t > SUPERLINEAR_T_STAT) & (share >= SUPERLINEAR_SHARE)
+
+    rows = []
+    for c, f in zip(*np.nonzero((np.abs(linear_t) > MIN_T_STAT) | superlinear)):
+        rows.append({
+            'name': names[f],
+            'counter': counter_names[c],
+            'msPerEntity': float(linear[c, f]),
+            'tStat': float(linear_t[c, f]),
+            'loadCost': float(linear[c, f] * p95[c]),
+            'exponent': float(exponent[c, f]),
+            'superlinear': bool(superlinear[c, f]),
+            'r2': float(r2[f]),
+        })
+    rows.sort(key=lambda row: -abs(row['loadCost']))
+    return {
+        'frames': n,
+        'counters': [
+            {'name': name, 'mean': float(counts[:, c].mean()), 'p95': float(p95[c]), 'max': float(scale[c])}
+            for c, name in enumerate(counter_names)
+        ],
+        'rows': rows,
+    }
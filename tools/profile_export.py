@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Export GameProfiler traces for Perfetto, chrome://tracing and speedscope.
+
+Two formats are written:
+
+- Chrome Trace Event JSON (`<trace>.trace.json`): one complete ('X') event
+  per frame and per function in it, nested by the frame's parent/child
+  links. GameProfiler aggregates each function per frame, so there is one
+  event per function and caller per frame rather than one per call, and
+  siblings are laid out back to back in export order from the start of
+  their caller; durations are exact, positions within a frame are not.
+- Collapsed stacks (`<trace>.collapsed.txt`): `Frame;caller;callee <us>`
+  lines with self time in microseconds summed over all frames, as read by
+  speedscope and flamegraph.pl.
+
+Frames are read with the streaming parser and events are written as they
+are produced, so memory does not grow with the trace length.
+
+Usage:
+    python profile_export.py trace.json [--format chrome|collapsed|both] [-o PREFIX]
+"""
+import argparse
+import json
+import os
+import sys
+
+from profile_calltree import frame_call_edges
+from profile_stream import iter_profile_events
+
+FORMATS = ('chrome', 'collapsed', 'both')
+CHROME_TRACE_SUFFIX = '.trace.json'
+COLLAPSED_SUFFIX = '.collapsed.txt'
+FRAME_NAME = 'Frame'
+_PID = 1
+_TID = 1
+
+
+def frame_call_tree(frame):
+    """Return (roots, children) for one frame.
+
+    `roots` lists (name, duration) for functions without a caller in the
+    frame and `children` maps a function to its (child, time under it)
+    pairs, both in export order.
+    """
+    functions = frame['functions']
+    children = {}
+    called = set()
+    for parent, child, time in frame_call_edges(functions):
+        children.setdefault(parent, []).append((child, time))
+        called.add(child)
+    roots = [(name, data['totalTime']) for name, data in functions.items() if name not in called]
+    return roots, children
+
+
+def _walk(name, start, duration, children, functions, stack):
+    """Yield (stack, start, duration, self time) for a node and its callees.
+
+    A callee shared by several callers contributes to each in proportion to
+    the time it spent under that caller, so its own callees are scaled the
+    same way. Cycles are cut at the first repeated function.
+    """
+    total = functions[name]['totalTime']
+    scale = duration / total if total > 0 else 0.0
+    stack = stack + (name,)
+    callees = [(child, time * scale) for child, time in children.get(name, ()) if child not in stack]
+    yield stack, start, duration, max(duration - sum(d for _, d in callees), 0.0)
+    offset = start
+    for child, child_duration in callees:
+        yield from _walk(child, offset, child_duration, children, functions, stack)
+        offset += child_duration
+
+
+def frame_events(frame):
+    """Yield (stack, start ms, duration ms, self ms) for a frame and every function in it"""
+    roots, children = frame_call_tree(frame)
+    functions = frame['functions']
+    start = frame['timestamp']
+    yield (FRAME_NAME,), start, frame['totalTime'], max(frame['totalTime'] - sum(d for _, d in roots), 0.0)
+    offset = start
+    for name, duration in roots:
+        yield from _walk(name, offset, duration, children, functions, (FRAME_NAME,))
+        offset += duration
+
+
+class ChromeTraceWriter:
+    """Writes a Chrome Trace Event JSON object one event at a time"""
+
+    def __init__(self, f, metadata=None):
+        self.f = f
+        self.first = True
+        f.write('{"displayTimeUnit": "ms", ')
+        if metadata is not None:
+            f.write(f'"metadata": {json.dumps(metadata)}, ')
+        f.write('"traceEvents": [\n')
+        self.write({'name': 'process_name', 'ph': 'M', 'pid': _PID, 'args': {'name': 'GameProfiler'}})
+        self.write({'name': 'thread_name', 'ph': 'M', 'pid': _PID, 'tid': _TID, 'args': {'name': 'Main thread'}})
+
+    def write(self, event):
+        if not self.first:
+            self.f.write(',\n')
+        self.f.write(json.dumps(event, separators=(',', ':')))
+        self.first = False
+
+    def add_frame(self, index, frame):
+        for stack, start, duration, _ in frame_events(frame):
+            name = stack[-1]
+            event = {
+                'name': name, 'cat': 'frame' if len(stack) == 1 else 'function', 'ph': 'X',
+                'ts': round(start * 1000, 3), 'dur': round(duration * 1000, 3), 'pid': _PID, 'tid': _TID,
+            }
+            if len(stack) == 1:
+                event['args'] = {'frame': index}
+            else:
+                event['args'] = {'calls': frame['functions'][name]['calls']}
+            self.write(event)
+
+    def close(self):
+        self.f.write('\n]}\n')
+
+
+class CollapsedStacks:
+    """Sums self time per call stack over all frames"""
+
+    def __init__(self):
+        self.self_time = {}
+
+    def add_frame(self, frame):
+        for stack, _, _, self_ms in frame_events(frame):
+            self.self_time[stack] = self.self_time.get(stack, 0.0) + self_ms
+
+    def write(self, f):
+        for stack, self_ms in sorted(self.self_time.items()):
+            micros = round(self_ms * 1000)
+            if micros > 0:
+                f.write(f"{';'.join(stack)} {micros}\n")
+
+
+def export_trace(input_file, fmt='both', prefix=None):
+    """Stream a GameProfiler export into the requested formats; returns the files written"""
+    prefix = prefix or os.path.splitext(input_file)[0]
+    chrome_file = prefix + CHROME_TRACE_SUFFIX
+    collapsed_file = prefix + COLLAPSED_SUFFIX
+    chrome = None
+    collapsed = CollapsedStacks() if fmt in ('collapsed', 'both') else None
+    metadata = None
+    outputs = []
+
+    try:
+        for section, key, value in iter_profile_events(input_file):
+            if section == 'metadata':
+                metadata = value
+            elif section == 'frameData':
+                if fmt in ('chrome', 'both') and chrome is None:
+                    chrome = ChromeTraceWriter(open(chrome_file, 'w', encoding='utf-8'), metadata)
+                if chrome is not None:
+                    chrome.add_frame(key, value)
+                if collapsed is not None:
+                    collapsed.add_frame(value)
+        if fmt in ('chrome', 'both') and chrome is None:
+            chrome = ChromeTraceWriter(open(chrome_file, 'w', encoding='utf-8'), metadata)
+    finally:
+        if chrome is not None:
+            chrome.close()
+            chrome.f.close()
+    if chrome is not None:
+        outputs.append(chrome_file)
+
+    if collapsed is not None:
+        with open(collapsed_file, 'w', encoding='utf-8') as f:
+            collapsed.write(f)
+        outputs.append(collapsed_file)
+    return outputs
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description='Export GameProfiler traces to Chrome Trace Event JSON and collapsed stacks')
+    p.add_argument('inputs', nargs='+', help='JSON traces exported by GameProfiler')
+    p.add_argument('--format', choices=FORMATS, default='both',
+                   help='Output format (default: %(default)s)')
+    p.add_argument('-o', '--output', metavar='PREFIX',
+                   help='Output path prefix (only with a single input; default: the input path without .json)')
+    return p.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    if args.output and len(args.inputs) > 1:
+        print('Error: --output can only be used with a single input file.')
+        sys.exit(1)
+
+    failed = 0
+    for input_file in args.inputs:
+        try:
+            outputs = export_trace(input_file, args.format, args.output)
+        except Exception as e:
+            print(f'Error exporting {input_file}: {e}')
+            failed += 1
+            continue
+        for output_file in outputs:
+            print(f'{input_file} -> {output_file}')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""Columnar frame x function view of a GameProfiler trace.
+
+The JSON export stores one dict per frame with one dict per function, which
+every report section used to walk again. FrameMatrix converts that once into
+dense float32 matrices (rows are frames, columns are functions) plus a name
+index, so the report can be built from vectorized NumPy operations.
+"""
+import numpy as np
+
+from profile_calltree import CallEdges, exclusive_time, frame_call_edges
+from profile_sketch import CallHistogramSet
+
+
+class FrameMatrix:
+    """Per-frame timings for every instrumented function.
+
+    Attributes:
+        names: function names, one per column
+        index: dict mapping function name to column
+        frame_times: float64 array (frames,) of frame durations in ms
+        timestamps: float64 array (frames,) of frame start times in ms
+        time: float32 array (frames, functions) of inclusive time in ms
+        calls: float32 array (frames, functions) of call counts
+        edges: CallEdges linking callers to callees within each frame
+        counter_names: names of the per-frame entity counters, if recorded
+        counters: float64 array (frames, counters), NaN where a frame has no sample
+        call_histograms: CallHistogramSet of single-call durations, if recorded
+    """
+
+    def __init__(self, names, frame_times, timestamps, time, calls, edges, counter_names=(), counters=None,
+                 call_histograms=None):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.frame_times = frame_times
+        self.timestamps = timestamps
+        self.time = time
+        self.calls = calls
+        self.edges = edges
+        self.counter_names = list(counter_names)
+        self.counters = counters if counters is not None else np.zeros((len(frame_times), 0))
+        self.call_histograms = call_histograms if call_histograms is not None else CallHistogramSet()
+        self._exclusive = None
+        self._totals = None
+        self._call_totals = None
+
+    @classmethod
+    def from_frames(cls, frames):
+        """Build the matrix from a GameProfiler `frameData` list in one pass"""
+        builder = FrameMatrixBuilder()
+        for frame in frames:
+            builder.add_frame(frame)
+        return builder.build()
+
+    @property
+    def frame_count(self):
+        return self.time.shape[0]
+
+    @property
+    def function_count(self):
+        return self.time.shape[1]
+
+    def exclusive(self):
+        """Per-frame exclusive (self) time matrix, computed on first use"""
+        if self._exclusive is None:
+            self._exclusive = exclusive_time(self.time, self.edges)
+        return self._exclusive
+
+    def totals(self):
+        """Total inclusive time per function across all frames (float64)"""
+        if self._totals is None:
+            self._totals = self.time.sum(axis=0, dtype=np.float64)
+        return self._totals
+
+    def call_totals(self):
+        """Total call count per function across all frames (float64)"""
+        if self._call_totals is None:
+            self._call_totals = self.calls.sum(axis=0, dtype=np.float64)
+        return self._call_totals
+
+    def column(self, name):
+        """Per-frame inclusive time of one function (zeros where it did not run)"""
+        return self.time[:, self.index[name]]
+
+    def top(self, n=None):
+        """Column indices sorted by total time, largest first"""
+        order = np.argsort(-self.totals(), kind='stable')
+        return order if n is None else order[:n]
+
+
+class FrameMatrixBuilder:
+    """Accumulates frames one at a time (e.g. from a streamed trace) into a FrameMatrix"""
+
+    def __init__(self):
+        self.index = {}
+        self.frame_times = []
+        self.timestamps = []
+        self.rows, self.cols, self.times, self.calls = [], [], [], []
+        self.edge_frames, self.edge_parents, self.edge_children, self.edge_times = [], [], [], []
+        self.counter_index = {}
+        self.counter_rows, self.counter_cols, self.counter_values = [], [], []
+        self.call_histograms = CallHistogramSet()
+
+    def add_frame(self, frame):
+        functions = frame['functions']
+        self.call_histograms.add_frame(len(self.frame_times), functions)
+        self.add_row(
+            frame['totalTime'],
+            frame['timestamp'],
+            ((name, func_data['totalTime'], func_data['calls']) for name, func_data in functions.items()),
+            frame_call_edges(functions),
+            frame.get('counters'),
+        )
+
+    def add_row(self, frame_time, timestamp, functions, edges, counters=None):
+        """Add a frame given as (name, time, calls) and (parent, child, time) tuples"""
+        i = len(self.frame_times)
+        index = self.index
+        self.frame_times.append(frame_time)
+        self.timestamps.append(timestamp)
+        for name, time, calls in functions:
+            col = index.get(name)
+            if col is None:
+                col = index[name] = len(index)
+            self.rows.append(i)
+            self.cols.append(col)
+            self.times.append(time)
+            self.calls.append(calls)
+        for parent, child, time in edges:
+            self.edge_frames.append(i)
+            self.edge_parents.append(index[parent])
+            self.edge_children.append(index[child])
+            self.edge_times.append(time)
+        for name, value in (counters or {}).items():
+            col = self.counter_index.get(name)
+            if col is None:
+                col = self.counter_index[name] = len(self.counter_index)
+            self.counter_rows.append(i)
+            self.counter_cols.append(col)
+            self.counter_values.append(value)
+
+    def build(self):
+        shape = (len(self.frame_times), len(self.index))
+        time_matrix = np.zeros(shape, dtype=np.float32)
+        call_matrix = np.zeros(shape, dtype=np.float32)
+        time_matrix[self.rows, self.cols] = self.times
+        call_matrix[self.rows, self.cols] = self.calls
+        edges = CallEdges.from_lists(self.edge_frames, self.edge_parents, self.edge_children, self.edge_times)
+        counters = np.full((len(self.frame_times), len(self.counter_index)), np.nan)
+        counters[self.counter_rows, self.counter_cols] = self.counter_values
+        return FrameMatrix(
+            self.index,
+            np.asarray(self.frame_times, dtype=np.float64),
+            np.asarray(self.timestamps, dtype=np.float64),
+            time_matrix,
+            call_matrix,
+            edges,
+            self.counter_index,
+            counters,
+            self.call_histograms,
+        )
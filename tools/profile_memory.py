@@ -0,0 +1,154 @@
+"""Heap growth, allocation rate and garbage-collection analysis.
+
+GameProfiler samples `usedJSHeapSize` once per frame. The heap only shrinks
+when the collector runs, so a drop between two samples marks a GC event;
+the growth between consecutive drops is what the game allocated in that
+interval. The heap level right after each collection (the post-GC floor)
+is what survives, and a steady rise in it is the signature of a leak.
+"""
+import numpy as np
+
+MB = 1024 * 1024
+# Drops smaller than this are treated as sampling noise, not collections
+DEFAULT_MIN_DROP_BYTES = 256 * 1024
+
+
+class MemorySamples:
+    """Heap samples as parallel arrays, e.g. the memory-mapped columns of a .ptrace file
+
+    Stands in for the export's list of {timestamp, used, total} dicts, so
+    a trace with one sample per frame is not expanded into per-sample dicts.
+    """
+
+    def __init__(self, timestamps, used, total):
+        self.timestamps = timestamps
+        self.used = used
+        self.total = total
+
+    def __len__(self):
+        return len(self.timestamps)
+
+
+def memory_arrays(samples):
+    """(timestamps in ms, used bytes, total bytes) of MemorySamples or a list of sample dicts
+
+    Null heap sizes (browsers without performance.memory) become NaN.
+    """
+    if isinstance(samples, MemorySamples):
+        return samples.timestamps, samples.used, samples.total
+    timestamps = np.array([s['timestamp'] for s in samples], dtype=np.float64)
+    used = np.array([s['used'] for s in samples], dtype=np.float64)
+    total = np.array([s['total'] for s in samples], dtype=np.float64)
+    return timestamps, used, total
+
+
+def heap_samples(timestamps, used, total):
+    """Drop samples without a heap size; returns (timestamps, used, total, after_gap)
+
+    `after_gap` marks the kept samples that directly follow dropped ones,
+    so heap changes are not measured across the gaps.
+    """
+    timestamps, used, total = (np.asarray(a, dtype=np.float64) for a in (timestamps, used, total))
+    keep = np.isfinite(timestamps) & np.isfinite(used) & np.isfinite(total)
+    dropped_before = np.r_[False, ~keep[:-1]] if len(keep) else keep
+    return timestamps[keep], used[keep], total[keep], dropped_before[keep]
+
+
+def detect_gc_events(used, min_drop_bytes=DEFAULT_MIN_DROP_BYTES, after_gap=None):
+    """Indices of samples whose heap is at least min_drop_bytes below the previous one
+
+    Samples marked in `after_gap` (see heap_samples) are never GC events.
+    """
+    used = np.asarray(used, dtype=np.float64)
+    drops = np.diff(used) <= -min_drop_bytes
+    if after_gap is not None:
+        drops &= ~np.asarray(after_gap, dtype=bool)[1:]
+    return np.flatnonzero(drops) + 1
+
+
+def _fit_line(x, y):
+    """Least-squares slope and R^2 of y against x"""
+    if len(x) < 2 or np.ptp(x) == 0:
+        return 0.0, 0.0
+    slope, intercept = np.polyfit(x, y, 1)
+    residual = y - (slope * x + intercept)
+    variance = np.sum((y - y.mean()) ** 2)
+    r2 = 1 - np.sum(residual ** 2) / variance if variance > 0 else 0.0
+    return float(slope), float(r2)
+
+
+def analyze_heap(timestamps, used, min_drop_bytes=DEFAULT_MIN_DROP_BYTES, after_gap=None):
+    """Summarize heap behaviour from per-frame samples (timestamps in ms, bytes).
+
+    Samples must all have a heap size (see heap_samples); changes into the
+    samples marked in `after_gap` are ignored.
+
+    Returns a dict with the GC event indices ('gcIndices') and sizes
+    ('gcDropsMB'), per-interval allocation rates in MB/s ('allocationRates'),
+    the overall allocation rate, and the leak slope in MB/min fitted to the
+    post-GC floors (or to every sample when there are fewer than two
+    collections), with its R^2 and the samples it was fitted to.
+    """
+    t = np.asarray(timestamps, dtype=np.float64)
+    used = np.asarray(used, dtype=np.float64)
+    after_gap = np.zeros(len(used), dtype=bool) if after_gap is None else np.asarray(after_gap, dtype=bool)
+    gc = detect_gc_events(used, min_drop_bytes, after_gap)
+
+    # Allocation between collections: growth from one post-GC floor to the
+    # peak right before the next drop (intervals also end at sampling gaps)
+    bounds = np.union1d(np.r_[0, gc, len(used)], np.flatnonzero(after_gap))
+    starts, ends = bounds[:-1], bounds[1:] - 1
+    durations = (t[ends] - t[starts]) / 1000
+    valid = durations > 0
+    rates = (used[ends] - used[starts])[valid] / MB / durations[valid]
+
+    increments = np.diff(used)[~after_gap[1:]] if len(used) else np.zeros(0)
+    elapsed = (t[-1] - t[0]) / 1000 if len(t) > 1 else 0.0
+    allocated = increments[increments > 0].sum() / MB
+
+    fit_indices = gc if len(gc) >= 2 else np.arange(len(used))
+    slope, r2 = _fit_line(t[fit_indices] / 60000, used[fit_indices] / MB)
+
+    return {
+        'gcIndices': gc,
+        'gcDropsMB': (used[gc - 1] - used[gc]) / MB,
+        'allocationRates': rates,
+        'allocationRate': float(allocated / elapsed) if elapsed > 0 else 0.0,
+        'allocatedMB': float(allocated),
+        'leakSlope': slope,
+        'leakR2': r2,
+        'leakFitIndices': fit_indices,
+        'leakFitOnFloors': len(gc) >= 2,
+    }
+
+
+def gc_frame_correlation(gc_times, frame_timestamps, frame_times, unprofiled, threshold_ms, tolerance=1):
+    """Relate GC events to slow frames.
+
+    A collection observed at a sample happened during the frame that
+    sample belongs to; frames within `tolerance` frames of it count as
+    GC-affected. `unprofiled` is each frame's time not covered by any
+    instrumented function, where a collector pause usually shows up.
+    """
+    n = len(frame_times)
+    affected = np.zeros(n, dtype=bool)
+    if n and len(gc_times):
+        frames = np.clip(np.searchsorted(frame_timestamps, gc_times, side='right') - 1, 0, n - 1)
+        for offset in range(-tolerance, tolerance + 1):
+            affected[np.clip(frames + offset, 0, n - 1)] = True
+    slow = frame_times > threshold_ms
+
+    def mean(values, mask):
+        return float(values[mask].mean()) if mask.any() else 0.0
+
+    return {
+        'gcFrames': int(affected.sum()),
+        'slowFrames': int(slow.sum()),
+        'slowWithGc': int((slow & affected).sum()),
+        'slowRateGc': mean(slow.astype(np.float64), affected) * 100,
+        'slowRateOther': mean(slow.astype(np.float64), ~affected) * 100,
+        'frameTimeGc': mean(frame_times, affected),
+        'frameTimeOther': mean(frame_times, ~affected),
+        'unprofiledGc': mean(unprofiled, affected),
+        'unprofiledOther': mean(unprofiled, ~affected),
+    }
@@ -0,0 +1,89 @@
+"""Estimate and remove GameProfiler's instrumentation cost from timings.
+
+Every instrumented call runs startFunction and endFunction, each of which
+GameProfiler counts in `profilerCallCount` and times in `profilerOverhead`,
+so `averageOverheadPerCall` is the cost of one half of a call. Within a
+function's measured window:
+
+- its own calls add about one half each: the timestamp is taken near the
+  end of startFunction and at the start of endFunction, so roughly the
+  bookkeeping between them (one half) lands inside the window;
+- every call made by an instrumented descendant adds both halves.
+
+Hence, with o the overhead per half and calls summed over the trace:
+
+    corrected inclusive = inclusive - o * (own calls + 2 * descendant calls)
+    corrected exclusive = exclusive - o * (own calls + direct child calls)
+    corrected frame     = frame - 2 * o * calls made in the frame
+
+The export aggregates calls per function and frame, not per call edge, so a
+child's calls are attributed to its callers in proportion to the time it
+spent under each of them. Functions dropped from the export for falling
+below `minFunctionTimeMs` are not counted, which makes the correction
+slightly conservative.
+"""
+import numpy as np
+
+
+def overhead_per_call(metadata):
+    """Average overhead of one startFunction/endFunction half, in ms"""
+    per_call = metadata.get('averageOverheadPerCall')
+    if per_call is None:
+        call_count = metadata.get('profilerCallCount') or 0
+        per_call = metadata.get('profilerOverhead', 0) / call_count if call_count else 0.0
+    per_call = float(per_call)
+    return per_call if np.isfinite(per_call) and per_call > 0 else 0.0
+
+
+def nested_calls(names, calls, total_time, edge_time):
+    """Direct child and descendant call counts per function.
+
+    `calls` and `total_time` are per-function totals aligned with `names`;
+    `edge_time` maps (parent, child) to the time child spent under parent,
+    as in CallTreeTotals. Returns (direct, descendant) float64 arrays.
+    """
+    index = {name: i for i, name in enumerate(names)}
+    n = len(names)
+    # share[p, c]: fraction of c's calls made from p
+    share = np.zeros((n, n), dtype=np.float64)
+    for (parent, child), time in edge_time.items():
+        p, c = index.get(parent), index.get(child)
+        if p is not None and c is not None and total_time[c] > 0:
+            share[p, c] += time / total_time[c]
+    np.clip(share, 0, 1, out=share)
+
+    calls = np.asarray(calls, dtype=np.float64)
+    direct = share @ calls
+    descendant = direct.copy()
+    # One level of nesting per iteration; the cap guards against call cycles
+    for _ in range(n):
+        updated = share @ (calls + descendant)
+        if np.allclose(updated, descendant):
+            break
+        descendant = updated
+    return direct, descendant
+
+
+def corrected_totals(names, total_time, self_time, calls, edge_time, per_call):
+    """Overhead-corrected inclusive and exclusive totals per function.
+
+    Returns a dict of float64 arrays aligned with `names`: 'inclusive',
+    'exclusive', and the estimated overhead removed from each,
+    'inclusiveOverhead' and 'exclusiveOverhead'. Corrected times are
+    clamped at zero.
+    """
+    calls = np.asarray(calls, dtype=np.float64)
+    direct, descendant = nested_calls(names, calls, total_time, edge_time)
+    inclusive_overhead = per_call * (calls + 2 * descendant)
+    exclusive_overhead = per_call * (calls + direct)
+    return {
+        'inclusive': np.maximum(total_time - inclusive_overhead, 0),
+        'exclusive': np.maximum(self_time - exclusive_overhead, 0),
+        'inclusiveOverhead': inclusive_overhead,
+        'exclusiveOverhead': exclusive_overhead,
+    }
+
+
+def corrected_frame_times(frame_times, frame_calls, per_call):
+    """Frame durations minus the overhead of every call made in the frame"""
+    return np.maximum(frame_times - 2 * per_call * frame_calls, 0)
@@ -0,0 +1,142 @@
+"""Find hitches that repeat at a fixed period (autosaves, spawn waves, GC).
+
+The frame-time series and the top functions' series are first put on a
+uniform time grid with the median frame interval as step. Each grid cell
+keeps the maximum of its frames, so periods stay stable when the frame
+rate varies. Each series is then median-centered, detrended with a
+quadratic fit, and autocorrelated through one zero-padded FFT over all columns at once
+(Wiener-Khinchin). A series' dominant period is the lag of its highest
+local autocorrelation maximum after the autocorrelation first crosses
+zero, so slow drifts do not pass for short periods. A peak near that height at a shorter lag
+is preferred, so harmonics are not reported in place of the fundamental.
+A function carries a frame-time period when its own autocorrelation at
+that lag is high.
+"""
+import numpy as np
+
+DEFAULT_TOP_FUNCTIONS = 10
+# Shortest period considered, in grid steps (about frames)
+MIN_PERIOD = 4
+# Periods must repeat at least this many times within the trace
+MIN_REPEATS = 3
+# Autocorrelation a period needs to be reported (also scaled with trace length)
+MIN_STRENGTH = 0.15
+# Peaks within this fraction of the strongest count as candidates for the fundamental
+FUNDAMENTAL_TOLERANCE = 0.8
+FRAME = 'Frame'
+
+
+def _time_grid(timestamps, series):
+    """Max of `series` rows per time step of the median frame interval; returns (step, grid)"""
+    n = len(timestamps)
+    step = float(np.median(np.diff(timestamps))) if n > 1 else 0.0
+    if step <= 0:
+        return step, series
+    cells = np.floor((timestamps - timestamps[0]) / step).astype(np.int64)
+    grid = np.tile(np.median(series, axis=0), (int(cells[-1]) + 1, 1))
+    filled = np.zeros(len(grid), dtype=bool)
+    filled[cells] = True
+    grid[filled] = -np.inf
+    np.maximum.at(grid, cells, series)
+    return step, grid
+
+
+def autocorrelation(series):
+    """Normalized autocorrelation of every column of a (samples, series) array via FFT"""
+    n = len(series)
+    centered = series - np.median(series, axis=0)
+    # Remove slow trends (e.g. a growing crowd) so they do not mask periods
+    t = np.linspace(-1, 1, n)
+    design = np.column_stack([np.ones(n), t, t ** 2])
+    centered = centered - design @ np.linalg.lstsq(design, centered, rcond=None)[0]
+    size = 1 << int(np.ceil(np.log2(max(2 * n - 1, 1))))
+    spectrum = np.fft.rfft(centered, n=size, axis=0)
+    acf = np.fft.irfft(spectrum * np.conj(spectrum), n=size, axis=0)[:n]
+    # Unbiased estimate: each lag averages over the n - lag overlapping samples
+    acf /= (n - np.arange(n))[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        acf = np.where(acf[:1] > 0, acf / acf[:1], 0.0)
+    return acf
+
+
+def dominant_periods(acf, min_period=MIN_PERIOD, max_period=None, min_strength=MIN_STRENGTH):
+    """(lag, strength) of each column's dominant period; lag 0 where there is none"""
+    n, d = acf.shape
+    max_period = min(max_period or n // MIN_REPEATS, n - 2)
+    lags = np.zeros(d, dtype=np.int64)
+    strengths = np.zeros(d)
+    if max_period <= min_period:
+        return lags, strengths
+    window = acf[min_period - 1:max_period + 2]
+    inner = window[1:-1]
+    crossed = np.maximum.accumulate(acf <= 0, axis=0)[min_period:max_period + 1]
+    peaks = (inner > window[:-2]) & (inner >= window[2:]) & (inner >= min_strength) & crossed
+    candidates = np.where(peaks, inner, -np.inf)
+    best = candidates.max(axis=0)
+    found = np.isfinite(best)
+    # First peak close to the best one: the fundamental rather than a harmonic
+    first = np.argmax(candidates >= FUNDAMENTAL_TOLERANCE * best, axis=0)
+    lags[found] = first[found] + min_period
+    strengths[found] = inner[first, np.arange(d)][found]
+    return lags, strengths
+
+
+def _strength_at(acf, lag):
+    """Best autocorrelation of every column within one step of `lag` (allows jitter)"""
+    return acf[max(lag - 1, 1):lag + 2].max(axis=0)
+
+
+def periodic_hitches(matrix, top_n=DEFAULT_TOP_FUNCTIONS):
+    """Dominant periods of the frame times and top functions, and who carries them.
+
+    Returns {'step', 'series', 'carriers', 'frameAutocorrelation'}: `step`
+    is the grid step in ms, and `frameAutocorrelation` holds the frame-time
+    autocorrelation per lag, up to the longest period considered.
+    `series` holds one dict (name, period, periodSeconds, strength) per
+    series with a period, frame time first. `carriers` lists dicts (name,
+    strength, share) for the functions repeating at the frame-time period.
+    `share` is the function's share of the frame-time excess in the frames
+    at the periodic peaks.
+    """
+    result = {'step': 0.0, 'series': [], 'carriers': [], 'frameAutocorrelation': np.zeros(0)}
+    n = matrix.frame_count
+    if n < MIN_PERIOD * MIN_REPEATS * 2:
+        return result
+    top = matrix.top(top_n)
+    names = [FRAME] + [matrix.names[i] for i in top]
+    series = np.column_stack([matrix.frame_times, matrix.time[:, top]]).astype(np.float64)
+    step, grid = _time_grid(np.asarray(matrix.timestamps, dtype=np.float64), series)
+    result['step'] = step
+    acf = autocorrelation(grid)
+    result['frameAutocorrelation'] = acf[:len(grid) // MIN_REPEATS + 1, 0]
+    # Noise autocorrelation shrinks as 1/sqrt(n); do not report periods below that floor
+    min_strength = max(MIN_STRENGTH, 4 / np.sqrt(len(grid)))
+    lags, strengths = dominant_periods(acf, min_strength=min_strength)
+
+    for name, lag, strength in zip(names, lags.tolist(), strengths.tolist()):
+        if lag:
+            result['series'].append({
+                'name': name,
+                'period': lag,
+                'periodSeconds': lag * step / 1000,
+                'strength': strength,
+            })
+
+    frame_lag = int(lags[0])
+    if frame_lag:
+        carried = _strength_at(acf, frame_lag)[1:]
+        # Frames at the periodic peaks: those well above the median frame time
+        frame_times = series[:, 0]
+        excess = frame_times - np.median(frame_times)
+        peak_frames = excess > np.percentile(excess, 100 - 100 / frame_lag)
+        peak_excess = excess[peak_frames].sum()
+        function_excess = (series[peak_frames, 1:] - np.median(series[:, 1:], axis=0)).sum(axis=0)
+        for j in np.argsort(-carried, kind='stable'):
+            if carried[j] < min_strength:
+                break
+            result['carriers'].append({
+                'name': names[j + 1],
+                'strength': float(carried[j]),
+                'share': float(function_excess[j] / peak_excess * 100) if peak_excess > 0 else 0.0,
+            })
+    return result
@@ -0,0 +1,144 @@
+"""Split a trace into gameplay phases at changes in frame cost.
+
+Frame cost shifts as the game progresses (the crowd grows, drones unlock,
+the finale fires), so whole-trace averages blend very different phases.
+Binary segmentation looks for the frames where the mean of the frame-time
+series and the top functions' series jointly shifts: each series is
+standardized by a robust noise estimate and clipped around its local
+median so isolated spikes cannot open a phase of their own, then segments
+are split greedily at the point of largest cost reduction for as long as
+that reduction beats a BIC-style penalty. Every candidate split of a
+segment is scored at once from cumulative sums.
+"""
+import numpy as np
+
+DEFAULT_MIN_FRAMES = 120
+DEFAULT_MAX_PHASES = 8
+DEFAULT_TOP_FUNCTIONS = 10
+DEFAULT_CHANGES_PER_BOUNDARY = 3
+# Penalty per change point, in units of (series + 1) * log(frames)
+DEFAULT_PENALTY_SCALE = 3.0
+_SPIKE_BLOCK = 31
+_CLIP = 3.0
+
+
+def _standardize(series):
+    """Scale each column to unit noise and clip spikes around its local median
+
+    The local median is taken over fixed blocks of _SPIKE_BLOCK frames,
+    which is all clipping needs and far cheaper than a rolling window.
+    """
+    diffs = np.diff(series, axis=0)
+    # Noise scale from first differences is insensitive to level shifts
+    scale = 1.4826 * np.median(np.abs(diffs - np.median(diffs, axis=0)), axis=0) / np.sqrt(2)
+    fallback = series.std(axis=0)
+    scale = np.where(scale > 0, scale, np.where(fallback > 0, fallback, 1.0))
+    z = (series - np.median(series, axis=0)) / scale
+    n = len(z)
+    blocks = -(-n // _SPIKE_BLOCK)
+    padded = np.pad(z, [(0, blocks * _SPIKE_BLOCK - n), (0, 0)], mode='edge')
+    block_medians = np.median(padded.reshape(blocks, _SPIKE_BLOCK, -1), axis=1)
+    baseline = np.repeat(block_medians, _SPIKE_BLOCK, axis=0)[:n]
+    return baseline + np.clip(z - baseline, -_CLIP, _CLIP)
+
+
+def _best_split(cumsum, start, end, min_size):
+    """Return (gain, split) for the best single split of [start, end), or (0, None)"""
+    if end - start < 2 * min_size:
+        return 0.0, None
+    splits = np.arange(start + min_size, end - min_size + 1)
+    total = cumsum[end] - cumsum[start]
+    left = cumsum[splits] - cumsum[start]
+    n_left = (splits - start)[:, None]
+    n_right = (end - splits)[:, None]
+    n = end - start
+    # Reduction in summed squared error from giving each side its own mean
+    gain = ((left ** 2) / n_left + ((total - left) ** 2) / n_right).sum(axis=1) - (total ** 2).sum() / n
+    best = int(np.argmax(gain))
+    return float(gain[best]), int(splits[best])
+
+
+def segment(series, min_size=DEFAULT_MIN_FRAMES, max_segments=DEFAULT_MAX_PHASES, penalty_scale=DEFAULT_PENALTY_SCALE):
+    """Change points of a (frames, series) matrix by penalized binary segmentation
+
+    Returns the sorted frame indices where new segments start (excluding 0).
+    """
+    series = np.asarray(series, dtype=np.float64)
+    if series.ndim == 1:
+        series = series[:, None]
+    n, d = series.shape
+    if n < 2 * min_size:
+        return []
+    z = _standardize(series)
+    cumsum = np.vstack([np.zeros((1, d)), np.cumsum(z, axis=0)])
+    penalty = penalty_scale * (d + 1) * np.log(n)
+
+    candidates = {(0, n): _best_split(cumsum, 0, n, min_size)}
+    change_points = []
+    while len(change_points) + 1 < max_segments and candidates:
+        (start, end), (gain, split) = max(candidates.items(), key=lambda item: item[1][0])
+        if split is None or gain <= penalty:
+            break
+        del candidates[(start, end)]
+        change_points.append(split)
+        candidates[(start, split)] = _best_split(cumsum, start, split, min_size)
+        candidates[(split, end)] = _best_split(cumsum, split, end, min_size)
+    return sorted(change_points)
+
+
+def gameplay_phases(matrix, threshold_ms, min_frames=DEFAULT_MIN_FRAMES, max_phases=DEFAULT_MAX_PHASES,
+                    top_n=DEFAULT_TOP_FUNCTIONS, changes_per_boundary=DEFAULT_CHANGES_PER_BOUNDARY):
+    """Segment a FrameMatrix into phases and describe what changed between them.
+
+    Change points are searched jointly over the frame times and the `top_n`
+    functions' per-frame times. Returns {'phases', 'boundaries', 'series'}:
+    phases are dicts (start, end, frames, startTime, endTime, mean, p95,
+    slowPercent) over frame index ranges [start, end); each boundary
+    (frame, time, before, after, changes) lists the functions whose mean
+    per-frame time changed most across it, as dicts (name, before, after,
+    delta).
+    """
+    top = matrix.top(top_n)
+    series = np.column_stack([matrix.frame_times, matrix.time[:, top]])
+    starts = [0] + segment(series, min_frames, max_phases)
+    ends = starts[1:] + [matrix.frame_count]
+    result = {'phases': [], 'boundaries': [], 'series': ['Frame'] + [matrix.names[i] for i in top]}
+    if not matrix.frame_count:
+        return result
+
+    timestamps = matrix.timestamps
+    origin = timestamps[0]
+    lengths = np.diff(starts + [matrix.frame_count])
+    function_means = np.add.reduceat(matrix.time, starts, axis=0, dtype=np.float64) / lengths[:, None]
+    for start, end in zip(starts, ends):
+        times = matrix.frame_times[start:end]
+        result['phases'].append({
+            'start': start,
+            'end': end,
+            'frames': end - start,
+            'startTime': float(timestamps[start] - origin) / 1000,
+            'endTime': float(timestamps[end - 1] - origin) / 1000,
+            'mean': float(times.mean()),
+            'p95': float(np.percentile(times, 95)),
+            'slowPercent': float(np.mean(times > threshold_ms) * 100),
+        })
+
+    for k in range(1, len(starts)):
+        delta = function_means[k] - function_means[k - 1]
+        order = np.argsort(-np.abs(delta), kind='stable')[:changes_per_boundary]
+        result['boundaries'].append({
+            'frame': starts[k],
+            'time': float(timestamps[starts[k]] - origin) / 1000,
+            'before': result['phases'][k - 1]['mean'],
+            'after': result['phases'][k]['mean'],
+            'changes': [
+                {
+                    'name': matrix.names[i],
+                    'before': float(function_means[k - 1, i]),
+                    'after': float(function_means[k, i]),
+                    'delta': float(delta[i]),
+                }
+                for i in order if delta[i] != 0
+            ],
+        })
+    return result
@@ -0,0 +1,305 @@
+"""Mergeable, fixed-accuracy summaries of timing distributions.
+
+LogHistogram is a DDSketch-style histogram: positive values fall into
+buckets whose bounds grow geometrically by GAMMA, so any quantile it
+returns is within RELATIVE_ACCURACY of the true value, however many values
+were added. Two histograms with the same GAMMA merge by adding bucket
+counts, which is what lets sessions (or chunks of a session) be summarized
+independently and combined later without keeping the raw samples.
+"""
+import heapq
+import math
+import random
+from array import array
+
+import numpy as np
+
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(GAMMA)
+# Values at or below this (ms) are counted in the zero bucket
+MIN_VALUE = 1e-6
+# Values buffered per HistogramSet series before they are bucketed in one batch
+DEFAULT_BATCH_SIZE = 4096
+DEFAULT_RESERVOIR_SIZE = 4096
+
+
+def bucket_index(values):
+    """Bucket index of every value: bucket i covers (GAMMA**(i-1), GAMMA**i]"""
+    return np.ceil(np.log(np.asarray(values, dtype=np.float64)) / _LOG_GAMMA).astype(np.int64)
+
+
+def bucket_value(index):
+    """Representative value of bucket `index`, within RELATIVE_ACCURACY of all its members"""
+    return 2 * GAMMA ** np.asarray(index, dtype=np.float64) / (GAMMA + 1)
+
+
+class LogHistogram:
+    """Count, sum, sum of squares, min, max and log-bucketed counts of a series"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.zero_count = 0
+        self.buckets = {}
+
+    def add(self, values):
+        """Add an array (or scalar) of non-negative values"""
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+        if not len(values):
+            return
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.total_sq += float(np.dot(values, values))
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        positive = values[values > MIN_VALUE]
+        self.zero_count += len(values) - len(positive)
+        if len(positive):
+            keys, counts = np.unique(bucket_index(positive), return_counts=True)
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                self.buckets[key] = self.buckets.get(key, 0) + count
+
+    def merge(self, other):
+        """Add another histogram's counts into this one"""
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.zero_count += other.zero_count
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        return self
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else math.nan
+
+    def quantiles(self, percentiles):
+        """Approximate percentiles (0-100), clamped to the observed min/max"""
+        if not self.count:
+            return np.full(len(percentiles), np.nan)
+        keys = np.array(sorted(self.buckets), dtype=np.int64)
+        counts = np.array([self.buckets[k] for k in keys.tolist()], dtype=np.float64)
+        return quantiles_from_counts(keys, counts, self.zero_count, percentiles, self.min, self.max)[0]
+
+    def dense(self, keys):
+        """Bucket counts aligned with `keys` (an array of bucket indices)"""
+        return np.array([self.buckets.get(k, 0) for k in keys.tolist()], dtype=np.float64)
+
+    def to_dict(self):
+        return {
+            'count': self.count, 'total': self.total, 'totalSq': self.total_sq,
+            'min': self.min if self.count else None, 'max': self.max if self.count else None,
+            'zeroCount': self.zero_count, 'buckets': {str(k): v for k, v in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        sketch = cls()
+        sketch.count = d['count']
+        sketch.total = d['total']
+        sketch.total_sq = d.get('totalSq', 0.0)
+        sketch.min = d['min'] if d['min'] is not None else math.inf
+        sketch.max = d['max'] if d['max'] is not None else -math.inf
+        sketch.zero_count = d.get('zeroCount', 0)
+        sketch.buckets = {int(k): v for k, v in d['buckets'].items()}
+        return sketch
+
+
+def quantiles_from_counts(keys, counts, zero_count, percentiles, low=-math.inf, high=math.inf):
+    """Percentiles from sorted bucket keys and their counts.
+
+    `counts` is (n, buckets) and `zero_count` (n,), so many weightings of the
+    same buckets (e.g. bootstrap resamples) are evaluated at once; returns
+    an (n, len(percentiles)) array.
+    """
+    counts = np.atleast_2d(counts)
+    zero_count = np.broadcast_to(np.asarray(zero_count, dtype=np.float64), counts.shape[:1])
+    cumulative = np.cumsum(counts, axis=1) + zero_count[:, None]
+    totals = cumulative[:, -1] if counts.shape[1] else zero_count
+    values = bucket_value(keys)
+    result = np.empty((counts.shape[0], len(percentiles)), dtype=np.float64)
+    for j, q in enumerate(percentiles):
+        rank = q / 100 * np.maximum(totals - 1, 0)
+        position = np.count_nonzero(cumulative <= rank[:, None], axis=1)
+        in_zero = rank < zero_count
+        picked = values[np.minimum(position, len(values) - 1)] if len(values) else np.zeros(len(rank))
+        result[:, j] = np.where(in_zero, 0.0, picked)
+    result = np.clip(result, low, high)
+    result[totals == 0] = np.nan
+    return result
+
+
+class HistogramSet:
+    """LogHistograms keyed by name, fed one value at a time.
+
+    LogHistogram.add is vectorized, so values are buffered per name and
+    bucketed in batches of `batch_size`; memory stays bounded by the
+    buffers and the bucket counts however many values arrive.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.histograms = {}
+        self._pending = {}
+
+    def __contains__(self, name):
+        return name in self.histograms
+
+    def add(self, name, value):
+        pending = self._pending.get(name)
+        if pending is None:
+            pending = self._pending[name] = array('d')
+            self.histograms[name] = LogHistogram()
+        pending.append(value)
+        if len(pending) >= self.batch_size:
+            self._flush(name)
+
+    def _flush(self, name):
+        pending = self._pending[name]
+        if pending:
+            self.histograms[name].add(np.frombuffer(pending, dtype=np.float64))
+            del pending[:]
+
+    def get(self, name):
+        """The LogHistogram of `name` with every value added so far, or None"""
+        if name not in self.histograms:
+            return None
+        self._flush(name)
+        return self.histograms[name]
+
+    def merge(self, other):
+        for name in other.histograms:
+            histogram = other.get(name)
+            if name in self.histograms:
+                self.get(name).merge(histogram)
+            else:
+                self._pending[name] = array('d')
+                self.histograms[name] = LogHistogram().merge(histogram)
+        return self
+
+
+class Reservoir:
+    """Uniform random sample of at most `size` items from a stream, mergeable.
+
+    Every item draws a random priority and the `size` lowest priorities are
+    kept (bottom-k sampling), which is a uniform sample without replacement.
+    Reservoirs over disjoint parts of a stream merge by keeping the lowest
+    priorities of both. Items are (key, value) pairs and come back sorted by
+    key, e.g. frames by frame index.
+    """
+
+    def __init__(self, size=DEFAULT_RESERVOIR_SIZE, seed=0):
+        self.size = size
+        self.seen = 0
+        self._random = random.Random(seed)
+        # Max-heap on priority: entries are (-priority, key, value)
+        self._heap = []
+
+    def __len__(self):
+        return len(self._heap)
+
+    def wants(self):
+        """Draw the next item's priority; returns it if the item is kept, else None
+
+        Lets callers skip preparing items that will not be sampled.
+        """
+        self.seen += 1
+        priority = self._random.random()
+        if len(self._heap) < self.size or (self._heap and priority < -self._heap[0][0]):
+            return priority
+        return None
+
+    def put(self, priority, key, value):
+        """Keep an item accepted by wants()"""
+        entry = (-priority, key, value)
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, entry)
+        else:
+            heapq.heapreplace(self._heap, entry)
+
+    def add(self, key, value):
+        priority = self.wants()
+        if priority is not None:
+            self.put(priority, key, value)
+
+    def merge(self, other):
+        self.seen += other.seen
+        for entry in other._heap:
+            if not self.size:
+                break
+            if len(self._heap) < self.size:
+                heapq.heappush(self._heap, entry)
+            elif entry[0] > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+        return self
+
+    def items(self):
+        """Sampled (key, value) pairs sorted by key"""
+        return sorted(((key, value) for _, key, value in self._heap), key=lambda item: item[0])
+
+
+class CallHistogramSet:
+    """Per-function LogHistograms of single-call durations, merged over frames.
+
+    GameProfiler exports, per function and frame, a `callHistogram`
+    ({bucket index: calls}, bucketed with this module's GAMMA) and the
+    frame's `maxCallTime`; calls missing from the buckets took no measurable
+    time. `worst_frames` maps each function to the frame of its slowest call.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.worst_frames = {}
+
+    def __bool__(self):
+        return bool(self.histograms)
+
+    def add_frame(self, index, functions):
+        """Merge one frame's `functions` entries"""
+        for name, func_data in functions.items():
+            buckets = func_data.get('callHistogram')
+            if buckets is None:
+                continue
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LogHistogram()
+            counted = 0
+            lowest = None
+            for key, count in buckets.items():
+                key = int(key)
+                histogram.buckets[key] = histogram.buckets.get(key, 0) + count
+                counted += count
+                lowest = key if lowest is None else min(lowest, key)
+            calls = max(func_data['calls'], counted)
+            histogram.count += calls
+            histogram.zero_count += calls - counted
+            histogram.total += func_data['totalTime']
+            if calls > counted:
+                histogram.min = 0.0
+            elif lowest is not None:
+                histogram.min = min(histogram.min, float(bucket_value(lowest)))
+            worst = func_data.get('maxCallTime', 0.0)
+            if worst > histogram.max:
+                histogram.max = worst
+                self.worst_frames[name] = index
+
+    def to_dict(self):
+        return {
+            name: dict(histogram.to_dict(), worstFrame=self.worst_frames.get(name))
+            for name, histogram in self.histograms.items()
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        histograms = cls()
+        for name, entry in d.items():
+            histograms.histograms[name] = LogHistogram.from_dict(entry)
+            if entry.get('worstFrame') is not None:
+                histograms.worst_frames[name] = entry['worstFrame']
+        return histograms
@@ -0,0 +1,84 @@
+"""Attribute slow frames to the functions that made them slow.
+
+Each frame over the slow-frame threshold is compared against a rolling
+median of its neighbours: the frame's excess over that baseline is split
+between the functions whose exclusive time rose above their own rolling
+median, and whatever the instrumented functions do not explain is left as
+unprofiled time. Everything runs on whole columns of the FrameMatrix.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+DEFAULT_WINDOW = 31
+UNPROFILED = 'Unprofiled'
+
+
+def rolling_median(values, window=DEFAULT_WINDOW, rows=None, batch_elements=4_000_000):
+    """Centered rolling median along axis 0, with edge padding.
+
+    Works on 1-D series and on (frames, columns) matrices alike; rows are
+    processed in batches so the windowed copy stays near `batch_elements`.
+    With `rows` (an index array) only those rows' medians are returned.
+    """
+    values = np.asarray(values)
+    n = values.shape[0]
+    if n == 0:
+        return values.astype(np.float64)
+    window = max(1, min(window, n) | 1)
+    half = window // 2
+    pad = [(half, half)] + [(0, 0)] * (values.ndim - 1)
+    windows = sliding_window_view(np.pad(values, pad, mode='edge'), window, axis=0)
+    rows = np.arange(n) if rows is None else np.asarray(rows)
+    row_size = max(1, values[:1].size * window)
+    batch = max(1, batch_elements // row_size)
+    result = np.empty((len(rows),) + values.shape[1:], dtype=np.float64)
+    for start in range(0, len(rows), batch):
+        result[start:start + batch] = np.median(windows[rows[start:start + batch]], axis=-1)
+    return result
+
+
+def spike_contributors(matrix, threshold_ms, window=DEFAULT_WINDOW):
+    """Rank functions by how much of the slow frames' excess they explain.
+
+    Returns {'slowFrames', 'frameExcess', 'totalExcess', 'window', 'rows'}:
+    `frameExcess` is the slow frames' summed time over their baseline and
+    `totalExcess` the summed per-function excess (which can exceed it when
+    other functions ran faster than usual in the same frames). Rows are
+    dicts (name, frames, topFrames, excess, share) sorted by excess, with
+    the unexplained remainder reported as UNPROFILED. `frames` counts slow
+    frames where the function ran above its baseline and `topFrames` those
+    where it was the largest contributor.
+    """
+    slow = np.flatnonzero(matrix.frame_times > threshold_ms)
+    result = {'slowFrames': len(slow), 'frameExcess': 0.0, 'totalExcess': 0.0, 'window': window, 'rows': []}
+    if not len(slow):
+        return result
+
+    frame_excess = np.maximum(matrix.frame_times[slow] - rolling_median(matrix.frame_times, window, slow), 0)
+    exclusive = matrix.exclusive()
+    function_excess = np.maximum(exclusive[slow] - rolling_median(exclusive, window, slow), 0)
+
+    explained = function_excess.sum(axis=1)
+    unprofiled = np.maximum(frame_excess - explained, 0)
+    # Columns: every function, then the unprofiled remainder
+    excess = np.column_stack([function_excess, unprofiled])
+    names = matrix.names + [UNPROFILED]
+
+    totals = excess.sum(axis=0)
+    total_excess = float(totals.sum())
+    frames = np.count_nonzero(excess > 0, axis=0)
+    top = np.bincount(excess.argmax(axis=1)[excess.max(axis=1) > 0], minlength=len(names))
+
+    for i in np.argsort(-totals, kind='stable'):
+        if totals[i] <= 0:
+            break
+        result['rows'].append({
+            'name': names[i],
+            'frames': int(frames[i]),
+            'topFrames': int(top[i]),
+            'excess': float(totals[i]),
+            'share': float(totals[i] / total_excess * 100),
+        })
+    result['frameExcess'] = float(frame_excess.sum())
+    result['totalExcess'] = total_excess
+    return result
@@ -0,0 +1,162 @@
+"""Vectorized statistics helpers shared by the analyzer modules.
+
+NumPy-only implementations of the handful of tests the analyzer needs, so
+the tools keep running without SciPy.
+"""
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+
+def rankdata(values):
+    """Ranks starting at 1, averaging ties; returns (ranks, tie group sizes)"""
+    values = np.asarray(values)
+    n = len(values)
+    order = np.argsort(values, kind='mergesort')
+    sorted_values = values[order]
+    first_of_group = np.r_[True, sorted_values[1:] != sorted_values[:-1]]
+    group = np.cumsum(first_of_group) - 1
+    bounds = np.r_[np.flatnonzero(first_of_group), n]
+    # Average of 1-based ranks bounds[g] + 1 .. bounds[g + 1]
+    average = 0.5 * (bounds[:-1] + 1 + bounds[1:])
+    ranks = np.empty(n, dtype=np.float64)
+    ranks[order] = average[group]
+    return ranks, np.diff(bounds)
+
+
+def mann_whitney_u(x, y):
+    """Two-sided Mann-Whitney U test with tie correction (normal approximation).
+
+    Returns (U statistic of y against x, p-value). Large U means y tends to be
+    larger than x.
+    """
+    n1, n2 = len(x), len(y)
+    if n1 == 0 or n2 == 0:
+        return 0.0, 1.0
+    ranks, ties = rankdata(np.concatenate([x, y]))
+    n = n1 + n2
+    u = ranks[n1:].sum() - n2 * (n2 + 1) / 2
+    mean_u = n1 * n2 / 2
+    tie_term = float(np.sum(ties.astype(np.float64) ** 3 - ties))
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return u, 1.0
+    z = (abs(u - mean_u) - 0.5) / math.sqrt(variance)
+    return u, math.erfc(max(z, 0.0) / math.sqrt(2))
+
+
+def t_quantile(p, df):
+    """Quantile of Student's t distribution.
+
+    Exact for 1 and 2 degrees of freedom, otherwise the Cornish-Fisher
+    expansion around the normal quantile (within 0.2% from df=3 at p=0.975).
+    """
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) * math.sqrt(2 / (4 * p * (1 - p)))
+    z = NormalDist().inv_cdf(p)
+    return (
+        z
+        + (z ** 3 + z) / (4 * df)
+        + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+        + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3)
+        + (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / (92160 * df ** 4)
+    )
+
+
+def mean_ci(values, confidence=0.95):
+    """Student t confidence interval for the mean of a small sample"""
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n < 2:
+        return math.nan, math.nan
+    half_width = t_quantile(1 - (1 - confidence) / 2, n - 1) * values.std(ddof=1) / math.sqrt(n)
+    mean = float(values.mean())
+    return mean - half_width, mean + half_width
+
+
+def holm_reject(p_values, alpha):
+    """Holm-Bonferroni step-down: boolean mask of hypotheses rejected at alpha"""
+    p_values = np.asarray(p_values, dtype=np.float64)
+    m = len(p_values)
+    order = np.argsort(p_values, kind='stable')
+    thresholds = alpha / (m - np.arange(m))
+    passed = p_values[order] <= thresholds
+    # Stop at the first failure: everything after it is retained
+    n_rejected = m if passed.all() else int(np.argmin(passed))
+    reject = np.zeros(m, dtype=bool)
+    reject[order[:n_rejected]] = True
+    return reject
+
+
+def bootstrap_mean_diff_ci(x, y, n_boot=1000, confidence=0.95, seed=0, batch_elements=4_000_000):
+    """Percentile bootstrap CI for mean(y) - mean(x).
+
+    Resamples are drawn in batches so memory stays around `batch_elements`
+    indices however long the series are.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(x) == 0 or len(y) == 0:
+        return math.nan, math.nan
+    rng = np.random.default_rng(seed)
+    diffs = np.empty(n_boot, dtype=np.float64)
+    batch = max(1, batch_elements // max(len(x), len(y)))
+    for start in range(0, n_boot, batch):
+        b = min(batch, n_boot - start)
+        x_means = x[rng.integers(0, len(x), size=(b, len(x)))].mean(axis=1)
+        y_means = y[rng.integers(0, len(y), size=(b, len(y)))].mean(axis=1)
+        diffs[start:start + b] = y_means - x_means
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(diffs, [tail, 100 - tail])
+    return float(low), float(high)
+
+
+def column_percentiles(values, valid, percentiles):
+    """Percentiles of every column over its valid rows only.
+
+    Uses linear interpolation like np.percentile, but sorts all columns in
+    one call instead of looping (as np.nanpercentile does). Returns an array
+    of shape (len(percentiles), columns); columns without valid rows are NaN.
+    """
+    if values.shape[0] == 0:
+        return np.full((len(percentiles), values.shape[1]), np.nan)
+    filled = np.where(valid, values, np.inf)
+    filled.sort(axis=0)
+    counts = valid.sum(axis=0)
+    position = np.outer(np.asarray(percentiles, dtype=np.float64) / 100, np.maximum(counts - 1, 0))
+    low = np.floor(position).astype(np.int64)
+    high = np.minimum(low + 1, np.maximum(counts - 1, 0))
+    columns = np.arange(values.shape[1])
+    low_values = filled[low, columns].astype(np.float64)
+    high_values = filled[high, columns].astype(np.float64)
+    with np.errstate(invalid='ignore'):
+        result = low_values + (high_values - low_values) * (position - low)
+    result[:, counts == 0] = np.nan
+    return result
+
+
+def downsample_minmax(x, y, max_points):
+    """Reduce a series to at most max_points points, keeping spikes visible.
+
+    The series is split into max_points // 2 equal buckets and each bucket
+    contributes its minimum and its maximum in their original order (a
+    min/max envelope), so every peak survives however long the series is.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(y)
+    if n <= max_points:
+        return x, y
+    buckets = max(1, max_points // 2)
+    width = -(-n // buckets)
+    padded = np.pad(y, (0, buckets * width - n), mode='edge').reshape(buckets, width)
+    offsets = np.arange(buckets) * width
+    lows = np.minimum(offsets + padded.argmin(axis=1), n - 1)
+    highs = np.minimum(offsets + padded.argmax(axis=1), n - 1)
+    picks = np.sort(np.stack([lows, highs], axis=1), axis=1).ravel()
+    # A flat bucket yields the same index twice
+    picks = picks[np.r_[True, picks[1:] != picks[:-1]]]
+    return x[picks], y[picks]
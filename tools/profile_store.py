@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""Indexed SQLite store of every ingested trace, with a query CLI.
+
+`profile_analyzer.py --ingest` (or `profile_store.py ingest`) loads each
+trace once and stores its frames, the per-frame time of every function and
+a per-trace LogHistogram sketch of each function. Questions across many
+traces then become indexed lookups instead of re-parsing every JSON:
+
+    python profile_store.py top --by p99 --last 30 --limit 20
+    python profile_store.py frames crowdUpdate --over 4
+    python profile_store.py history particleSystemUpdate --last 50
+    python profile_store.py traces
+
+Cross-trace percentiles merge the per-trace sketches, so they are accurate
+to the sketch's relative accuracy (1%) and never touch frame rows.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+from profile_cache import file_digest
+from profile_sketch import LogHistogram
+
+DEFAULT_STORE_NAME = 'profile_store.sqlite'
+SCHEMA_VERSION = 1
+TOP_METRICS = ('p50', 'p95', 'p99', 'p99.9', 'mean', 'total', 'self')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS traces (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    digest TEXT NOT NULL,
+    recorded_at REAL NOT NULL,
+    ingested_at REAL NOT NULL,
+    frame_count INTEGER NOT NULL,
+    average_frame_time REAL,
+    slow_frames INTEGER,
+    min_frame_time_ms REAL,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS traces_recorded ON traces (recorded_at);
+
+CREATE TABLE IF NOT EXISTS functions (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS frames (
+    trace_id INTEGER NOT NULL REFERENCES traces (id) ON DELETE CASCADE,
+    frame INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    total_time REAL NOT NULL,
+    PRIMARY KEY (trace_id, frame)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS frames_time ON frames (total_time);
+
+CREATE TABLE IF NOT EXISTS frame_functions (
+    trace_id INTEGER NOT NULL REFERENCES traces (id) ON DELETE CASCADE,
+    function_id INTEGER NOT NULL REFERENCES functions (id),
+    frame INTEGER NOT NULL,
+    time REAL NOT NULL,
+    self_time REAL NOT NULL,
+    calls INTEGER NOT NULL,
+    PRIMARY KEY (trace_id, function_id, frame)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS frame_functions_time ON frame_functions (function_id, time);
+
+CREATE TABLE IF NOT EXISTS function_summaries (
+    trace_id INTEGER NOT NULL REFERENCES traces (id) ON DELETE CASCADE,
+    function_id INTEGER NOT NULL REFERENCES functions (id),
+    frames INTEGER NOT NULL,
+    total_time REAL NOT NULL,
+    self_time REAL NOT NULL,
+    calls INTEGER NOT NULL,
+    sketch TEXT NOT NULL,
+    PRIMARY KEY (function_id, trace_id)
+) WITHOUT ROWID;
+"""
+
+
+def connect(path):
+    """Open (creating if needed) a trace store"""
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA foreign_keys = ON')
+    conn.execute('PRAGMA journal_mode = WAL')
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version not in (0, SCHEMA_VERSION):
+        raise ValueError(f'{path} has store schema {version}, expected {SCHEMA_VERSION}')
+    conn.executescript(SCHEMA)
+    conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    return conn
+
+
+def _function_ids(conn, names):
+    conn.executemany('INSERT OR IGNORE INTO functions (name) VALUES (?)', [(name,) for name in names])
+    ids = dict(conn.execute(
+        f"SELECT name, id FROM functions WHERE name IN ({','.join('?' * len(names))})", names
+    ).fetchall()) if names else {}
+    return np.array([ids[name] for name in names], dtype=np.int64)
+
+
+def ingest_profile(conn, path, data):
+    """Store processed profile data (see process_profile_data) for `path`.
+
+    Replaces any earlier ingest of the same path. Returns the trace id.
+    """
+    matrix = data['matrix']
+    metadata = data['metadata']
+    path = os.path.abspath(path)
+    digest = file_digest(path)
+    with conn:
+        conn.execute('DELETE FROM traces WHERE path = ?', (path,))
+        cursor = conn.execute(
+            'INSERT INTO traces (path, digest, recorded_at, ingested_at, frame_count, average_frame_time,'
+            ' slow_frames, min_frame_time_ms, metadata) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                path, digest, os.path.getmtime(path), time.time(), matrix.frame_count,
+                float(matrix.frame_times.mean()) if matrix.frame_count else None,
+                data['slowFrameCount'], metadata['config'].get('minFrameTimeMs'), json.dumps(metadata),
+            )
+        )
+        trace_id = cursor.lastrowid
+        conn.executemany(
+            'INSERT INTO frames (trace_id, frame, timestamp, total_time) VALUES (?, ?, ?, ?)',
+            zip([trace_id] * matrix.frame_count, range(matrix.frame_count),
+                matrix.timestamps.tolist(), matrix.frame_times.tolist())
+        )
+
+        function_ids = _function_ids(conn, matrix.names)
+        exclusive = matrix.exclusive()
+        frame_index, column = np.nonzero(matrix.calls > 0)
+        conn.executemany(
+            'INSERT INTO frame_functions (trace_id, function_id, frame, time, self_time, calls)'
+            ' VALUES (?, ?, ?, ?, ?, ?)',
+            zip([trace_id] * len(frame_index), function_ids[column].tolist(), frame_index.tolist(),
+                matrix.time[frame_index, column].astype(np.float64).tolist(),
+                exclusive[frame_index, column].astype(np.float64).tolist(),
+                matrix.calls[frame_index, column].astype(np.int64).tolist())
+        )
+
+        totals = matrix.totals()
+        self_totals = exclusive.sum(axis=0, dtype=np.float64)
+        call_totals = matrix.call_totals()
+        summaries = []
+        for i, function_id in enumerate(function_ids.tolist()):
+            ran = matrix.calls[:, i] > 0
+            sketch = LogHistogram()
+            sketch.add(matrix.time[ran, i])
+            summaries.append((
+                trace_id, function_id, int(ran.sum()), float(totals[i]), float(self_totals[i]),
+                int(call_totals[i]), json.dumps(sketch.to_dict()),
+            ))
+        conn.executemany(
+            'INSERT INTO function_summaries (trace_id, function_id, frames, total_time, self_time, calls, sketch)'
+            ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+            summaries
+        )
+    return trace_id
+
+
+def is_ingested(conn, path):
+    """True if `path` is stored with its current content"""
+    row = conn.execute('SELECT digest FROM traces WHERE path = ?', (os.path.abspath(path),)).fetchone()
+    return row is not None and row[0] == file_digest(path)
+
+
+def _last_traces(conn, last):
+    sql = 'SELECT id FROM traces ORDER BY recorded_at DESC'
+    params = ()
+    if last:
+        sql += ' LIMIT ?'
+        params = (last,)
+    return [row[0] for row in conn.execute(sql, params)]
+
+
+def _in_clause(values):
+    return f"({','.join('?' * len(values))})"
+
+
+def top_functions(conn, by='p99', last=None, limit=20):
+    """Functions ranked by a metric pooled over the last `last` traces.
+
+    Returns dicts with name, traces, frames, mean (inclusive ms per frame
+    the function ran), p50/p95/p99/p99.9, total and self (ms summed).
+    """
+    trace_ids = _last_traces(conn, last)
+    if not trace_ids:
+        return []
+    rows = conn.execute(
+        'SELECT f.name, s.frames, s.total_time, s.self_time, s.sketch FROM function_summaries s'
+        ' JOIN functions f ON f.id = s.function_id'
+        f' WHERE s.trace_id IN {_in_clause(trace_ids)}',
+        trace_ids
+    ).fetchall()
+    pooled = {}
+    for name, frames, total, self_time, sketch in rows:
+        entry = pooled.setdefault(name, {'name': name, 'traces': 0, 'frames': 0, 'total': 0.0, 'self': 0.0,
+                                         'sketch': LogHistogram()})
+        entry['traces'] += 1
+        entry['frames'] += frames
+        entry['total'] += total
+        entry['self'] += self_time
+        entry['sketch'].merge(LogHistogram.from_dict(json.loads(sketch)))
+    results = []
+    for entry in pooled.values():
+        sketch = entry.pop('sketch')
+        entry['mean'] = sketch.mean
+        for label, value in zip(('p50', 'p95', 'p99', 'p99.9'), sketch.quantiles([50, 95, 99, 99.9])):
+            entry[label] = float(value)
+        results.append(entry)
+    results.sort(key=lambda entry: entry[by], reverse=True)
+    return results[:limit]
+
+
+def frames_over(conn, function, threshold_ms, last=None, limit=50):
+    """Frames where `function` took longer than threshold_ms, slowest first"""
+    trace_ids = _last_traces(conn, last)
+    if not trace_ids:
+        return []
+    return conn.execute(
+        'SELECT t.path, ff.frame, fr.timestamp, fr.total_time, ff.time, ff.self_time, ff.calls'
+        ' FROM frame_functions ff'
+        ' JOIN functions f ON f.id = ff.function_id'
+        ' JOIN frames fr ON fr.trace_id = ff.trace_id AND fr.frame = ff.frame'
+        ' JOIN traces t ON t.id = ff.trace_id'
+        f' WHERE f.name = ? AND ff.time > ? AND ff.trace_id IN {_in_clause(trace_ids)}'
+        ' ORDER BY ff.time DESC LIMIT ?',
+        [function, threshold_ms] + trace_ids + [limit]
+    ).fetchall()
+
+
+def function_history(conn, function, last=None):
+    """Per-trace summary of one function, oldest trace first"""
+    trace_ids = _last_traces(conn, last)
+    if not trace_ids:
+        return []
+    rows = conn.execute(
+        'SELECT t.path, t.recorded_at, t.frame_count, s.frames, s.total_time, s.self_time, s.calls, s.sketch'
+        ' FROM function_summaries s'
+        ' JOIN functions f ON f.id = s.function_id'
+        ' JOIN traces t ON t.id = s.trace_id'
+        f' WHERE f.name = ? AND s.trace_id IN {_in_clause(trace_ids)}'
+        ' ORDER BY t.recorded_at',
+        [function] + trace_ids
+    ).fetchall()
+    history = []
+    for path, recorded_at, frame_count, frames, total, self_time, calls, sketch in rows:
+        p95, p99 = LogHistogram.from_dict(json.loads(sketch)).quantiles([95, 99])
+        history.append({
+            'path': path, 'recordedAt': recorded_at, 'perFrame': total / frame_count if frame_count else 0.0,
+            'selfPerFrame': self_time / frame_count if frame_count else 0.0, 'frames': frames,
+            'calls': calls, 'p95': float(p95), 'p99': float(p99),
+        })
+    return history
+
+
+def list_traces(conn, last=None):
+    sql = ('SELECT path, recorded_at, frame_count, average_frame_time, slow_frames FROM traces'
+           ' ORDER BY recorded_at DESC')
+    params = ()
+    if last:
+        sql += ' LIMIT ?'
+        params = (last,)
+    return conn.execute(sql, params).fetchall()
+
+
+def _print_table(headers, rows):
+    widths = [max(len(str(h)), *(len(str(row[i])) for row in rows)) if rows else len(str(h))
+              for i, h in enumerate(headers)]
+    print('  '.join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print('  '.join(str(v).ljust(w) for v, w in zip(row, widths)))
+
+
+def _when(timestamp):
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp))
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description='Query the indexed store of ingested GameProfiler traces')
+    p.add_argument('--store', default=os.path.join('traces', DEFAULT_STORE_NAME),
+                   help='Store path (default: %(default)s)')
+    sub = p.add_subparsers(dest='command', required=True)
+
+    ingest = sub.add_parser('ingest', help='Ingest traces (files or directories)')
+    ingest.add_argument('paths', nargs='+')
+    ingest.add_argument('--force', action='store_true', help='Re-ingest traces that are already stored')
+
+    top = sub.add_parser('top', help='Top functions by a pooled metric')
+    top.add_argument('--by', choices=TOP_METRICS, default='p99')
+    top.add_argument('--last', type=int, metavar='N', help='Only the N most recent traces')
+    top.add_argument('--limit', type=int, default=20)
+
+    frames = sub.add_parser('frames', help='Frames where a function exceeded a time')
+    frames.add_argument('function')
+    frames.add_argument('--over', type=float, required=True, metavar='MS')
+    frames.add_argument('--last', type=int, metavar='N')
+    frames.add_argument('--limit', type=int, default=50)
+
+    history = sub.add_parser('history', help='Per-trace history of one function')
+    history.add_argument('function')
+    history.add_argument('--last', type=int, metavar='N')
+
+    traces = sub.add_parser('traces', help='List stored traces')
+    traces.add_argument('--last', type=int, metavar='N')
+    return p.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    if args.command == 'ingest':
+        # The analyzer owns trace loading; import lazily to keep queries light
+        from profile_analyzer import ingest_traces
+        sys.exit(ingest_traces(args.paths, args.store, force=args.force))
+
+    if not os.path.isfile(args.store):
+        print(f"Error: store '{args.store}' not found. Run with 'ingest' first.")
+        sys.exit(1)
+    conn = connect(args.store)
+    started = time.perf_counter()
+    if args.command == 'top':
+        rows = top_functions(conn, args.by, args.last, args.limit)
+        _print_table(
+            ['Function', 'Traces', 'Frames', 'Mean', 'p50', 'p95', 'p99', 'p99.9', 'Total', 'Self'],
+            [[r['name'], r['traces'], r['frames'], f"{r['mean']:.3f}", f"{r['p50']:.3f}", f"{r['p95']:.3f}",
+              f"{r['p99']:.3f}", f"{r['p99.9']:.3f}", f"{r['total']:.1f}", f"{r['self']:.1f}"] for r in rows]
+        )
+    elif args.command == 'frames':
+        rows = frames_over(conn, args.function, args.over, args.last, args.limit)
+        _print_table(
+            ['Trace', 'Frame', 'Timestamp', 'Frame Time', f'{args.function}', 'Self', 'Calls'],
+            [[os.path.basename(path), frame, f'{ts:.1f}', f'{frame_time:.2f}', f'{t:.3f}', f'{self_t:.3f}', calls]
+             for path, frame, ts, frame_time, t, self_t, calls in rows]
+        )
+    elif args.command == 'history':
+        rows = function_history(conn, args.function, args.last)
+        _print_table(
+            ['Trace', 'Recorded', 'ms/Frame', 'Self ms/Frame', 'Frames', 'Calls', 'p95', 'p99'],
+            [[os.path.basename(r['path']), _when(r['recordedAt']), f"{r['perFrame']:.3f}",
+              f"{r['selfPerFrame']:.3f}", r['frames'], r['calls'], f"{r['p95']:.3f}", f"{r['p99']:.3f}"]
+             for r in rows]
+        )
+    else:
+        rows = list_traces(conn, args.last)
+        _print_table(
+            ['Trace', 'Recorded', 'Frames', 'Avg Frame', 'Slow'],
+            [[path, _when(recorded), frames, f'{avg:.2f}' if avg is not None else '-', slow]
+             for path, recorded, frames, avg, slow in rows]
+        )
+    print(f'({len(rows)} rows in {(time.perf_counter() - started) * 1000:.1f} ms)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,362 @@
+"""Incremental reader for GameProfiler JSON exports.
+
+`json.load` materialises every frame dict of a trace at once, which long
+soak-test traces cannot afford. This module walks the export with
+`json.JSONDecoder.raw_decode` over a sliding read buffer and yields one
+frame, function entry or memory snapshot at a time, so the accumulators
+below only ever hold per-section summaries: log-bucketed sketches for
+percentiles, running sums for totals, bucketed series for timelines and a
+fixed-size uniform sample of whole frames. Memory does not grow with the
+number of frames.
+"""
+import json
+import re
+from array import array
+
+import numpy as np
+
+from profile_calltree import CallTreeTotals, frame_call_edges
+from profile_matrix import FrameMatrixBuilder
+from profile_sketch import (
+    DEFAULT_BATCH_SIZE, DEFAULT_RESERVOIR_SIZE, CallHistogramSet, HistogramSet, LogHistogram, Reservoir, bucket_value,
+)
+
+# Top-level keys whose elements are yielded one by one instead of decoded whole
+STREAMED_ARRAYS = ('frameData', 'memoryStats')
+STREAMED_OBJECTS = ('functionStats',)
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+DEFAULT_MAX_POINTS = 2000
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class _BufferedJSONReader:
+    """Minimal pull parser over a text file, decoding one JSON value at a time"""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size):
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        chunk = self.f.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf += chunk
+        return True
+
+    def peek(self):
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill(self.chunk_size):
+                raise ValueError('Unexpected end of profile data')
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' but found '{found}' in profile data")
+        self.pos += 1
+
+    def skip_comma(self):
+        if self.peek() == ',':
+            self.pos += 1
+
+    def value(self):
+        self.peek()
+        read_size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self._fill(read_size)
+                read_size *= 2
+                continue
+            # A number ending exactly at the buffer edge may continue in the next chunk
+            if end == len(self.buf) and not self.eof:
+                self._fill(read_size)
+                read_size *= 2
+                continue
+            self.pos = end
+            return value
+
+
+def iter_profile_events(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield (section, key, value) tuples from a GameProfiler export.
+
+    `frameData` and `memoryStats` yield one event per element with the element
+    index as key, `functionStats` yields one event per function with its name
+    as key, and every other top-level entry is yielded whole with key None.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = _BufferedJSONReader(f, chunk_size)
+        reader.expect('{')
+        while reader.peek() != '}':
+            section = reader.value()
+            reader.expect(':')
+            if section in STREAMED_ARRAYS and reader.peek() == '[':
+                reader.expect('[')
+                index = 0
+                while reader.peek() != ']':
+                    yield section, index, reader.value()
+                    index += 1
+                    reader.skip_comma()
+                reader.expect(']')
+            elif section in STREAMED_OBJECTS and reader.peek() == '{':
+                reader.expect('{')
+                while reader.peek() != '}':
+                    name = reader.value()
+                    reader.expect(':')
+                    yield section, name, reader.value()
+                    reader.skip_comma()
+                reader.expect('}')
+            else:
+                yield section, None, reader.value()
+            reader.skip_comma()
+
+
+class FrameTimeAccumulator:
+    """Slow-frame count plus a LogHistogram (count, sum, min, max, quantiles) of frame times"""
+
+    def __init__(self, slow_threshold_ms, batch_size=DEFAULT_BATCH_SIZE):
+        self.slow_threshold_ms = slow_threshold_ms
+        self.batch_size = batch_size
+        self.slow = 0
+        self._sketch = LogHistogram()
+        self._pending = array('d')
+
+    def add(self, frame_time):
+        if frame_time > self.slow_threshold_ms:
+            self.slow += 1
+        self._pending.append(frame_time)
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            self._sketch.add(np.frombuffer(self._pending, dtype=np.float64))
+            del self._pending[:]
+
+    @property
+    def sketch(self):
+        self._flush()
+        return self._sketch
+
+    @property
+    def count(self):
+        return self.sketch.count
+
+    @property
+    def total(self):
+        return self.sketch.total
+
+    def merge(self, other):
+        self.slow += other.slow
+        self.sketch.merge(other.sketch)
+        return self
+
+    def percentiles(self, percentiles):
+        """Approximate percentiles, within the sketch's relative accuracy"""
+        return [float(value) for value in self.sketch.quantiles(percentiles)]
+
+    def histogram(self):
+        """Return (bucket values, counts) sorted by frame time"""
+        sketch = self.sketch
+        keys = sorted(sketch.buckets)
+        centers = [float(value) for value in bucket_value(keys)]
+        counts = [sketch.buckets[key] for key in keys]
+        if sketch.zero_count:
+            centers.insert(0, 0.0)
+            counts.insert(0, sketch.zero_count)
+        return centers, counts
+
+
+class SeriesSet:
+    """Per-frame series for many functions, kept at a bounded number of points.
+
+    All series share one bucket width; when a frame index falls past the last
+    bucket the width doubles and neighbouring buckets are merged, so memory is
+    O(functions * max_points) regardless of trace length. Frames in which a
+    function did not run contribute 0, matching the in-memory timeline.
+    """
+
+    def __init__(self, max_points=DEFAULT_MAX_POINTS):
+        self.max_points = max_points
+        self.width = 1
+        self.sums = {}
+        self.maxes = {}
+
+    def _compact(self):
+        self.width *= 2
+        for name in self.sums:
+            self.sums[name] = _merge_pairs(self.sums[name], lambda a, b: a + b)
+            self.maxes[name] = _merge_pairs(self.maxes[name], max)
+
+    def add(self, name, index, value):
+        b = index // self.width
+        while b >= self.max_points:
+            self._compact()
+            b = index // self.width
+        sums = self.sums.setdefault(name, [])
+        maxes = self.maxes.setdefault(name, [])
+        if len(sums) <= b:
+            sums.extend([0.0] * (b + 1 - len(sums)))
+            maxes.extend([0.0] * (b + 1 - len(maxes)))
+        sums[b] += value
+        maxes[b] = max(maxes[b], value)
+
+    def total(self, name):
+        return sum(self.sums.get(name, ()))
+
+    def points(self, name, frame_count):
+        """Return (bucket start frames, per-bucket means, per-bucket maxima)"""
+        sums = self.sums.get(name, [])
+        n_buckets = -(-frame_count // self.width)
+        x, means, maxes = [], [], []
+        for b in range(n_buckets):
+            frames_in_bucket = min(self.width, frame_count - b * self.width)
+            s = sums[b] if b < len(sums) else 0.0
+            x.append(b * self.width)
+            means.append(s / frames_in_bucket)
+            maxes.append(self.maxes[name][b] if b < len(sums) else 0.0)
+        return x, means, maxes
+
+
+def _merge_pairs(values, combine):
+    merged = [combine(values[i], values[i + 1]) for i in range(0, len(values) - 1, 2)]
+    if len(values) % 2:
+        merged.append(values[-1])
+    return merged
+
+
+def _sampled_frame(frame, names):
+    """A frame as FrameMatrixBuilder.add_row arguments, in compact tuples
+
+    Function names are shared through `names`, so sampled frames do not each
+    hold their own copies.
+    """
+    functions = frame['functions']
+    return (
+        frame['totalTime'],
+        frame['timestamp'],
+        tuple((names.setdefault(name, name), func_data['totalTime'], func_data['calls'])
+              for name, func_data in functions.items()),
+        tuple((names[parent], names[child], time) for parent, child, time in frame_call_edges(functions)),
+        frame.get('counters'),
+    )
+
+
+def process_profile_stream(path, max_points=DEFAULT_MAX_POINTS, chunk_size=DEFAULT_CHUNK_SIZE,
+                           sample_frames=DEFAULT_RESERVOIR_SIZE):
+    """Build the report inputs from a trace in one incremental pass.
+
+    Returns the same top-level shape as `process_profile_data`, except that
+    the frame matrix is replaced by bounded summaries:
+    `frameSummary` (a FrameTimeAccumulator), `functionSeries` (a SeriesSet),
+    `functionTotals` ({name: {'totalTime', 'calls'}} running sums),
+    `functionHistograms` (a HistogramSet of each function's per-frame time
+    over the frames it ran), `callTree` (CallTreeTotals), `callHistograms`
+    (a CallHistogramSet) and `frameSample`, a FrameMatrix of a uniform
+    random sample of at most `sample_frames` frames in trace order.
+    `memoryStats` is bucketed down to at most `max_points` points, with a
+    null sample marking each gap left by samples without a heap size.
+    """
+    metadata = None
+    frames = None
+    function_series = SeriesSet(max_points)
+    function_stats = {}
+    function_totals = {}
+    function_histograms = HistogramSet()
+    call_tree = CallTreeTotals()
+    call_histograms = CallHistogramSet()
+    sample = Reservoir(sample_frames)
+    sample_names = {}
+    memory_series = SeriesSet(max_points)
+    memory_count = 0
+    memory_gap = False
+
+    for section, key, value in iter_profile_events(path, chunk_size):
+        if section == 'frameData':
+            if frames is None:
+                if metadata is None:
+                    raise ValueError('Streaming requires metadata to precede frameData')
+                frames = FrameTimeAccumulator(metadata['config']['minFrameTimeMs'])
+            frames.add(value['totalTime'])
+            for func_name, func_data in value['functions'].items():
+                time = func_data['totalTime']
+                function_series.add(func_name, key, time)
+                function_histograms.add(func_name, time)
+                totals = function_totals.get(func_name)
+                if totals is None:
+                    totals = function_totals[func_name] = {'totalTime': 0.0, 'calls': 0}
+                totals['totalTime'] += time
+                totals['calls'] += func_data['calls']
+            call_tree.add_frame(value['functions'])
+            call_histograms.add_frame(key, value['functions'])
+            priority = sample.wants()
+            if priority is not None:
+                sample.put(priority, key, _sampled_frame(value, sample_names))
+        elif section == 'functionStats':
+            value.pop('timePerFrame', None)
+            function_stats[key] = value
+        elif section == 'memoryStats':
+            # Browsers without performance.memory export null heap sizes
+            if value['used'] is None or value['total'] is None:
+                memory_gap = memory_count > 0
+                continue
+            if memory_gap:
+                memory_series.add('gap', memory_count, 1.0)
+                memory_gap = False
+            memory_series.add('timestamp', memory_count, value['timestamp'])
+            memory_series.add('used', memory_count, value['used'])
+            memory_series.add('total', memory_count, value['total'])
+            memory_count += 1
+        elif section == 'metadata':
+            metadata = value
+
+    if metadata is None:
+        raise ValueError('Profile data has no metadata')
+    if frames is None:
+        frames = FrameTimeAccumulator(metadata['config']['minFrameTimeMs'])
+
+    memory_stats = []
+    if memory_count:
+        _, timestamps, _ = memory_series.points('timestamp', memory_count)
+        _, used, _ = memory_series.points('used', memory_count)
+        _, total, _ = memory_series.points('total', memory_count)
+        _, _, gaps = memory_series.points('gap', memory_count)
+        # A null sample ahead of each bucket that follows a gap keeps heap
+        # analysis from reading a GC drop across it
+        for t, u, m, gap in zip(timestamps, used, total, gaps):
+            if gap:
+                memory_stats.append({'timestamp': t, 'used': None, 'total': None})
+            memory_stats.append({'timestamp': t, 'used': u, 'total': m})
+
+    builder = FrameMatrixBuilder()
+    for _, row in sample.items():
+        builder.add_row(*row)
+
+    return {
+        'metadata': metadata,
+        'functionStats': function_stats,
+        'memoryStats': memory_stats,
+        'frameSummary': frames,
+        'functionSeries': function_series,
+        'functionTotals': function_totals,
+        'functionHistograms': function_histograms,
+        'frameSample': builder.build(),
+        'callTree': call_tree,
+        'callHistograms': call_histograms,
+        'slowFrameCount': frames.slow,
+    }
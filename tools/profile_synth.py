@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""Write synthetic GameProfiler-shaped traces of any size.
+
+The call tree has `width` root systems, each with `width` children, down to
+`depth` levels, named like `system2.child0.child1`. Self times are drawn
+from per-function lognormal distributions, with occasional spikes, and
+inclusive times, childTimes and frame times are derived from them the way
+GameProfiler records them. Heap samples follow an allocation sawtooth with
+periodic collections. Frames are generated in batches and written as they
+are produced, so a million-frame trace needs no more memory than a
+thousand-frame one.
+
+Usage:
+    python profile_synth.py out.json --frames 100000 [--depth 3] [--width 3] [--seed 0] [--counters]
+"""
+import argparse
+import json
+from array import array
+
+import numpy as np
+
+from profile_sketch import MIN_VALUE, bucket_index
+
+DEFAULT_FRAMES = 1000
+DEFAULT_DEPTH = 2
+DEFAULT_WIDTH = 3
+_BATCH = 1000
+_METADATA_SPACE = 1024
+_CONFIG = {
+    'minFrameTimeMs': 10.67,
+    'minFunctionTimeMs': 0.01,
+    'maxFramesToStore': 1000,
+    'significantDigits': 3,
+}
+
+
+def build_call_tree(depth, width):
+    """Return (names, parent index or -1, level) lists in breadth-first order"""
+    names, parents, levels = [], [], []
+    frontier = [(f'system{i}', -1) for i in range(width)]
+    for level in range(depth):
+        next_frontier = []
+        for name, parent in frontier:
+            index = len(names)
+            names.append(name)
+            parents.append(parent)
+            levels.append(level)
+            next_frontier.extend((f'{name}.child{j}', index) for j in range(width))
+        frontier = next_frontier
+    return names, np.array(parents, dtype=np.int64), np.array(levels, dtype=np.int64)
+
+
+def _inclusive_batch(rng, n, parents, levels, base_self, spike_rate, extra_self=None):
+    """Inclusive times of every function for n frames, shape (n, functions)"""
+    self_time = base_self * rng.lognormal(0.0, 0.35, size=(n, len(parents)))
+    if extra_self is not None:
+        self_time += extra_self
+    spikes = rng.random(size=self_time.shape) < spike_rate
+    self_time[spikes] *= rng.uniform(4, 12, size=int(spikes.sum()))
+    inclusive = self_time.copy()
+    # Children are always listed after their parents, so one bottom-up pass suffices
+    for level in range(levels.max(initial=0), 0, -1):
+        for child in np.flatnonzero(levels == level):
+            inclusive[:, parents[child]] += inclusive[:, child]
+    return np.round(inclusive, 3)
+
+
+def _entity_counts(start, n, frames, rng):
+    """Particle and crowd counts for frames start..start+n of the trace"""
+    progress = (start + np.arange(n)) / max(frames - 1, 1)
+    particles = np.maximum(0, 3000 + 2500 * np.sin(progress * 40) + rng.normal(0, 300, n)).round()
+    crowd = np.floor(200 * progress)
+    return particles, crowd
+
+
+def generate_trace(path, frames=DEFAULT_FRAMES, depth=DEFAULT_DEPTH, width=DEFAULT_WIDTH, seed=0,
+                   memory=True, spike_rate=0.002, frame_budget_ms=8.0, counters=False):
+    """Write a synthetic trace to `path`; returns the number of functions
+
+    With `counters` frames carry `particles` and `crowd` entity counters;
+    the first root system's cost grows linearly with particles and the
+    last function's quadratically with the crowd.
+    """
+    rng = np.random.default_rng(seed)
+    names, parents, levels = build_call_tree(depth, width)
+    n_functions = len(names)
+    children = [[] for _ in names]
+    for child, parent in enumerate(parents.tolist()):
+        if parent >= 0:
+            children[parent].append(child)
+
+    # Spread the frame budget over the tree, most of it in the leaves
+    base_self = rng.lognormal(0.0, 0.8, size=n_functions)
+    base_self *= frame_budget_ms / base_self.sum()
+    calls = rng.integers(1, 4, size=n_functions)
+    calls[levels == 0] = 1
+
+    start_time = 1000.0
+    timestamp = start_time
+    heap = 40e6
+    heap_total = 80e6
+    total_time = 0.0
+    function_totals = np.zeros(n_functions)
+    function_calls = np.zeros(n_functions, dtype=np.int64)
+    memory_stats = array('d')
+
+    with open(path, 'w', encoding='utf-8') as f:
+        # Metadata must precede frameData for streaming readers, but its
+        # averages are only known at the end: reserve space and patch it in
+        f.write('{"metadata": ')
+        metadata_pos = f.tell()
+        f.write(' ' * _METADATA_SPACE)
+        f.write(',\n"frameData": [\n')
+        first = True
+        for batch_start in range(0, frames, _BATCH):
+            n = min(_BATCH, frames - batch_start)
+            extra_self = None
+            if counters:
+                particles, crowd = _entity_counts(batch_start, n, frames, rng)
+                extra_self = np.zeros((n, n_functions))
+                extra_self[:, 0] = 0.0002 * particles
+                extra_self[:, -1] = 2e-5 * crowd ** 2
+            inclusive = _inclusive_batch(rng, n, parents, levels, base_self, spike_rate, extra_self)
+            unprofiled = rng.gamma(2.0, 0.25, size=n)
+            root_total = inclusive[:, levels == 0].sum(axis=1)
+            frame_times = np.round(root_total + unprofiled, 3)
+            allocations = rng.gamma(2.0, 25e3, size=n)
+            function_totals += inclusive.sum(axis=0)
+            function_calls += calls * n
+            per_call = inclusive / calls
+            call_buckets = bucket_index(np.maximum(per_call, MIN_VALUE)).tolist()
+            per_call = np.round(per_call, 3).tolist()
+            for i in range(n):
+                row = inclusive[i].tolist()
+                functions = {}
+                for j, name in enumerate(names):
+                    entry = {
+                        'totalTime': row[j],
+                        'timePerFrame': per_call[i][j],
+                        'calls': int(calls[j]),
+                        # Every call of a function takes the same time within a frame
+                        'callHistogram': {str(call_buckets[i][j]): int(calls[j])} if row[j] > MIN_VALUE else {},
+                        'maxCallTime': per_call[i][j],
+                        'children': [names[c] for c in children[j]],
+                        'parents': [names[parents[j]]] if parents[j] >= 0 else [],
+                    }
+                    if children[j]:
+                        entry['childTimes'] = {names[c]: row[c] for c in children[j]}
+                    functions[name] = entry
+                frame = {
+                    'timestamp': round(timestamp, 3),
+                    'totalTime': float(frame_times[i]),
+                    'functions': functions,
+                    'memory': None,
+                }
+                if counters:
+                    frame['counters'] = {'particles': int(particles[i]), 'crowd': int(crowd[i])}
+                if memory:
+                    heap += allocations[i]
+                    if heap > 0.9 * heap_total:
+                        heap = 40e6 + rng.normal(0, 1e6)
+                    frame['memory'] = {'usedJSHeapSize': int(heap), 'totalJSHeapSize': int(heap_total)}
+                    memory_stats.extend((frame['timestamp'], int(heap), heap_total))
+                if not first:
+                    f.write(',\n')
+                f.write(json.dumps(frame, separators=(',', ':')))
+                first = False
+                timestamp += max(frame_times[i], 16.667)
+                total_time += frame_times[i]
+
+        function_stats = {
+            name: {
+                'totalTime': round(float(function_totals[j]), 3),
+                'calls': int(function_calls[j]),
+                'averageTimePerFrame': round(float(function_totals[j]) / max(frames, 1), 3),
+                'children': [names[c] for c in children[j]],
+                'parents': [names[parents[j]]] if parents[j] >= 0 else [],
+            }
+            for j, name in enumerate(names)
+        }
+        f.write('\n],\n"functionStats": ')
+        f.write(json.dumps(function_stats))
+        f.write(',\n"memoryStats": [\n')
+        samples = np.frombuffer(memory_stats, dtype=np.float64).reshape(-1, 3)
+        f.write(',\n'.join(
+            json.dumps({'timestamp': t, 'used': int(used), 'total': int(total)}) for t, used, total in samples.tolist()
+        ))
+        f.write('\n]}\n')
+
+        call_count = int(function_calls.sum()) * 2
+        metadata = json.dumps({
+            'startTime': start_time,
+            'endTime': round(timestamp, 3),
+            'totalFrames': frames,
+            'averageFrameTime': total_time / frames if frames else 0.0,
+            'profilerOverhead': call_count * 0.0007,
+            'profilerCallCount': call_count,
+            'averageOverheadPerCall': 0.0007,
+            'config': _CONFIG,
+        })
+        if len(metadata) > _METADATA_SPACE:
+            raise ValueError('Synthetic metadata does not fit its reserved space')
+        f.seek(metadata_pos)
+        f.write(metadata.ljust(_METADATA_SPACE))
+    return n_functions
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description='Write a synthetic GameProfiler trace')
+    p.add_argument('output', help='Output JSON path')
+    p.add_argument('--frames', type=int, default=DEFAULT_FRAMES)
+    p.add_argument('--depth', type=int, default=DEFAULT_DEPTH, help='Call tree depth (default: %(default)s)')
+    p.add_argument('--width', type=int, default=DEFAULT_WIDTH,
+                   help='Root systems and children per function (default: %(default)s)')
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--no-memory', action='store_true', help='Omit heap samples')
+    p.add_argument('--counters', action='store_true',
+                   help='Add particle and crowd entity counters that drive some functions\' cost')
+    return p.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    n_functions = generate_trace(args.output, args.frames, args.depth, args.width, args.seed, not args.no_memory,
+                                 counters=args.counters)
+    print(f'Wrote {args.frames} frames x {n_functions} functions to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
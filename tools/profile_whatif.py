@@ -0,0 +1,77 @@
+"""Estimate what speeding up a single function would do to frame times.
+
+Making a function k times faster saves (1 - 1/k) of its self time in every
+frame it runs. The saving is subtracted from each recorded frame and the
+slow-frame share and tail percentiles are recomputed. This is done for
+every function with self time and every speedup factor, on the frame x
+function exclusive-time matrix, a batch of columns at a time so the
+simulated frame times stay within a fixed number of elements. Self time is used rather
+than inclusive time, so a speedup never double-counts time spent in
+callees. Callees are their own candidates.
+"""
+import numpy as np
+
+SPEEDUP_FACTORS = (1.5, 2.0, np.inf)
+# Speedup whose simulated slow-frame share ranks the targets
+RANK_FACTOR = 2.0
+# Simulated frame times held at once (frames x functions per batch)
+BATCH_ELEMENTS = 4_000_000
+
+
+def speedup_label(factor):
+    return 'removed' if np.isinf(factor) else f'{factor:g}x'
+
+
+def _frame_stats(frame_times, threshold_ms):
+    """(slow frame %, p95, p99) along axis 0"""
+    p95, p99 = np.percentile(frame_times, [95, 99], axis=0)
+    return np.mean(frame_times > threshold_ms, axis=0) * 100, p95, p99
+
+
+def simulate_speedups(matrix, threshold_ms, factors=SPEEDUP_FACTORS, batch_elements=BATCH_ELEMENTS):
+    """Frame-time statistics if each function with self time were faster.
+
+    Returns {'baseline', 'factors', 'rows'}: baseline is a dict (slowPercent,
+    p95, p99, mean) of the recorded frames. Rows are one per function,
+    sorted by the slow-frame reduction at RANK_FACTOR (then by p99). Each
+    row holds name and selfPerFrame, plus 'results': one dict (slowPercent,
+    p95, p99, mean) per factor, aligned with `factors`.
+    """
+    result = {'baseline': None, 'factors': list(factors), 'rows': []}
+    frame_times = np.asarray(matrix.frame_times, dtype=np.float64)
+    if not len(frame_times):
+        return result
+    slow, p95, p99 = _frame_stats(frame_times, threshold_ms)
+    result['baseline'] = {'slowPercent': float(slow), 'p95': float(p95), 'p99': float(p99),
+                          'mean': float(frame_times.mean())}
+
+    exclusive = matrix.exclusive()
+    self_totals = exclusive.sum(axis=0, dtype=np.float64)
+    top = np.flatnonzero(self_totals > 0)
+    if not len(top):
+        return result
+
+    # Per factor: slow %, p95, p99 and mean, each gathered batch by batch
+    per_factor = [([], [], [], []) for _ in factors]
+    batch = max(1, batch_elements // len(frame_times))
+    for start in range(0, len(top), batch):
+        self_time = np.asarray(exclusive[:, top[start:start + batch]], dtype=np.float64)
+        for factor, parts in zip(factors, per_factor):
+            simulated = frame_times[:, None] - self_time * (1 - 1 / factor)
+            slow, p95, p99 = _frame_stats(simulated, threshold_ms)
+            for part, values in zip(parts, (slow, p95, p99, simulated.mean(axis=0))):
+                part.append(values)
+    per_factor = [tuple(np.concatenate(part) for part in parts) for parts in per_factor]
+
+    rank = factors.index(RANK_FACTOR) if RANK_FACTOR in factors else len(factors) - 1
+    order = np.lexsort((per_factor[rank][2], per_factor[rank][0]))
+    for j in order:
+        result['rows'].append({
+            'name': matrix.names[top[j]],
+            'selfPerFrame': float(self_totals[top[j]] / len(frame_times)),
+            'results': [
+                {'slowPercent': float(slow[j]), 'p95': float(p95[j]), 'p99': float(p99[j]), 'mean': float(mean[j])}
+                for slow, p95, p99, mean in per_factor
+            ],
+        })
+    return result